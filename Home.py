@@ -2,8 +2,11 @@ import streamlit as st
 from pathlib import Path
 from dotenv import load_dotenv
 import os
+import time
 from components.ui_helpers import apply_custom_css, sidebar_navigation, card, info_box
 from utils.session_tracker import initialize_session_tracker
+from utils.corpus_search import list_documents, embeddings_for_corpus, search_corpus
+from chains.rag_chain import build_corpus_qa_chain
 
 # Load environment variables
 load_dotenv()
@@ -36,6 +39,61 @@ st.markdown("<p class='subtext' style='text-align: center; font-size: 1.2rem; co
 
 st.markdown("<hr class='section-divider'>", unsafe_allow_html=True)
 
+# Search across every document decoded, chatted about or bulk-ingested so far
+st.markdown("## Search All Documents")
+corpus_documents = list_documents()
+if not corpus_documents:
+    info_box("Search a corpus built with <code>python -m utils.bulk_ingest</code>. Documents you decode or chat about are added too when <code>CORPUS_ADD_UPLOADS=1</code> is set.")
+else:
+    search_col, filter_col = st.columns([2, 1])
+    with search_col:
+        corpus_query = st.text_input(
+            f"Search {len(corpus_documents)} stored documents",
+            placeholder="e.g. Which policies mention premium tax credits?",
+            key="corpus_query"
+        )
+    with filter_col:
+        names = {document["hash"]: document["name"] for document in corpus_documents}
+        selected_documents = st.multiselect("Only these documents", options=list(names), format_func=names.get,
+                                            key="corpus_filter_documents")
+        formats = sorted({document["format"] for document in corpus_documents})
+        selected_formats = st.multiselect("Formats", options=formats, key="corpus_filter_formats")
+
+    if corpus_query:
+        filters = {"hash": selected_documents or None, "format": selected_formats or None}
+        try:
+            corpus_embeddings = embeddings_for_corpus(openai_api_key=st.session_state.get("openai_key", openai_api_key))
+            start = time.perf_counter()
+            results = search_corpus(corpus_query, corpus_embeddings, k=20, filters=filters)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            st.error(f"Could not search the stored documents: {e}")
+            results = []
+            elapsed_ms = 0.0
+
+        if results:
+            # One entry per document, in order of its best match
+            by_document = {}
+            for chunk in results:
+                by_document.setdefault(chunk.metadata["document_id"], []).append(chunk)
+            st.caption(f"{len(results)} passages in {len(by_document)} documents ({elapsed_ms:.0f} ms)")
+            for document_id, chunks in by_document.items():
+                with st.expander(f"📄 {chunks[0].metadata['document_name']} ({len(chunks)} passages)", expanded=len(by_document) == 1):
+                    for chunk in chunks[:3]:
+                        location = chunk.metadata.get("heading") or (f"Page {chunk.metadata['page'] + 1}" if "page" in chunk.metadata else "")
+                        if location:
+                            st.markdown(f"**{location}**")
+                        st.write(chunk.page_content[:500] + ("..." if len(chunk.page_content) > 500 else ""))
+            if st.button("✨ Answer from these documents", key="corpus_answer"):
+                with st.spinner("Reading the matching passages..."):
+                    get_answer = build_corpus_qa_chain(st.session_state.get("openai_key", openai_api_key), filters=filters)
+                    answer, _ = get_answer(corpus_query)
+                st.markdown(answer)
+        elif corpus_query.strip():
+            st.info("No matching passages in the stored documents.")
+
+st.markdown("<hr class='section-divider'>", unsafe_allow_html=True)
+
 # Create a dashboard layout with feature cards
 st.markdown("## Start Exploring")
 
@@ -0,0 +1,63 @@
+"""Check that spilled ingestion keeps peak memory under budget on a large synthetic rule
+
+Run from the project root:
+    python -m benchmarks.bench_bounded_ingestion [pages] [budget_mb]
+
+Exits with status 1 if the peak Python heap growth of bounded ingestion exceeds the budget.
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from utils.document_parser import load_and_split_document
+from utils.spill_store import ingest_bounded, current_rss_bytes
+
+MB = 1024 * 1024
+
+
+def measure(fn):
+    """Run fn and return (result, seconds, peak heap growth in bytes)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    budget_mb = float(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        print(f"{pages} pages, {os.path.getsize(path) // 1024} KB PDF, process RSS {current_rss_bytes() // MB} MB before parsing")
+
+        documents, elapsed, in_memory_peak = measure(
+            lambda: load_and_split_document(path, use_cache=False, max_chars=None))
+        text_bytes = sum(len(d.page_content.encode("utf-8")) for d in documents)
+        print(f"in memory: {elapsed:.2f}s, peak heap growth {in_memory_peak / MB:.1f} MB for {text_bytes / MB:.1f} MB of text")
+        del documents
+
+        store, elapsed, bounded_peak = measure(
+            lambda: ingest_bounded(path, rss_budget_mb=budget_mb, spill_path=os.path.join(tmp_dir, "spill.txt")))
+        with store:
+            same_pages = len(store) == pages
+            # Consuming the spilled pages one at a time should not grow the heap either
+            _, _, read_peak = measure(lambda: sum(len(d.page_content) for d in store.iter_documents()))
+        print(f"spilled: {elapsed:.2f}s, peak heap growth {bounded_peak / MB:.1f} MB "
+              f"(reading back {read_peak / MB:.1f} MB), all pages kept={same_pages}")
+
+    peak = max(bounded_peak, read_peak)
+    if peak > budget_mb * MB or not same_pages:
+        print(f"FAIL: peak heap growth {peak / MB:.1f} MB is over the {budget_mb} MB budget")
+        sys.exit(1)
+    print(f"OK: peak heap growth {peak / MB:.1f} MB is within the {budget_mb} MB budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Measure index build time of a 200-page rule against the number of embedding requests in flight
+
+The embeddings API is faked: each request takes a fixed round trip plus time per
+token, and more than `server_limit` concurrent requests get a 429 like the real
+API, so the adaptive backoff is exercised at high in-flight limits.
+
+Run from the project root:
+    python -m benchmarks.bench_concurrent_embedding [pages] [server_limit]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from chains.indexing import build_vectorstore
+from utils.chunking import get_splitter
+from utils.document_parser import load_and_split_document
+from utils.token_counter import count_tokens
+
+ROUND_TRIP_SECONDS = 0.15
+SECONDS_PER_1K_TOKENS = 0.02
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+class FakeApiEmbeddings(Embeddings):
+    """Stand-in for OpenAIEmbeddings with token-proportional latency and a concurrency limit"""
+
+    model = "benchmark-fake"
+    server_limit = 6
+    lock = threading.Lock()
+    active = 0
+    requests = 0
+    rejected = 0
+
+    def embed_documents(self, texts):
+        cls = FakeApiEmbeddings
+        with cls.lock:
+            cls.requests += 1
+            if cls.active >= cls.server_limit:
+                cls.rejected += 1
+                raise RateLimitError("Rate limit reached for requests")
+            cls.active += 1
+        try:
+            time.sleep(ROUND_TRIP_SECONDS + SECONDS_PER_1K_TOKENS * sum(map(count_tokens, texts)) / 1000)
+            return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()] for t in texts]
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    FakeApiEmbeddings.server_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 6
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        documents = load_and_split_document(path, use_cache=False, max_chars=None, by_section=True)
+
+    baseline = None
+    for in_flight in (1, 2, 4, 8, 16):
+        FakeApiEmbeddings.requests = FakeApiEmbeddings.rejected = 0
+        start = time.perf_counter()
+        vectorstore, chunks = build_vectorstore(documents, get_splitter(), FakeApiEmbeddings(),
+                                                reuse_versions=False, max_in_flight=in_flight)
+        elapsed = time.perf_counter() - start
+        baseline = baseline or elapsed
+        print(f"{in_flight:>2} in flight: {len(chunks)} chunks in {elapsed:.2f}s ({baseline / elapsed:.1f}x), "
+              f"{FakeApiEmbeddings.requests} requests, {FakeApiEmbeddings.rejected} rate limited")
+
+
+if __name__ == "__main__":
+    main()
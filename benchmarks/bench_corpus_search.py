@@ -0,0 +1,101 @@
+"""Measure cross-document search latency over a corpus of uploaded and bulk-ingested policies
+
+Synthetic chunks are embedded with the offline hashing backend (1024 dimensions),
+so no API key is needed. Latency includes embedding the query, the index search,
+the document filters and the docstore lookups, as the Home page search box does.
+
+Run from the project root:
+    python -m benchmarks.bench_corpus_search [chunks] [documents]
+"""
+import random
+import sys
+import tempfile
+import time
+import faiss
+import numpy as np
+from langchain.schema import Document
+from utils.corpus import (CORPUS_CHUNK_SIZE, CORPUS_CHUNK_OVERLAP, build_corpus_index, read_manifest,
+                          write_manifest, write_shard)
+from utils.corpus_search import search_corpus
+from utils.embedding_providers import HashingEmbeddings
+
+TOPICS = [
+    "premium tax credits for marketplace coverage", "medicaid expansion and eligibility redeterminations",
+    "clean energy investment tax credits", "prescription drug price negotiation", "student loan repayment plans",
+    "broadband deployment grants", "child tax credit refundability", "individual coverage health reimbursement arrangements",
+    "wildfire mitigation funding", "small business lending programs",
+]
+FILLER = ("the secretary shall issue guidance within one hundred eighty days of enactment and report to the "
+          "appropriate committees of congress on the implementation of this section including amounts obligated").split()
+
+QUERIES = [
+    "Which policies mention premium tax credits?",
+    "eligibility redeterminations for medicaid",
+    "solar and wind investment credit",
+    "negotiated prices for prescription drugs",
+    "grants to expand broadband access",
+    "refundable child tax credit",
+    "ICHRA employer reimbursement",
+    "loans to small businesses",
+]
+
+
+def synthetic_chunk(rng, topic, number):
+    words = [rng.choice(FILLER) for _ in range(110)]
+    return f"Sec. {number}. Provisions on {topic}. " + " ".join(words)
+
+
+def time_queries(embeddings, corpus_dir, filters=None, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            search_corpus(query, embeddings, k=10, filters=filters, corpus_dir=corpus_dir)
+            timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000, np.percentile(timings, 95) * 1000
+
+
+def main():
+    total_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    documents = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    faiss.omp_set_num_threads(1)
+    rng = random.Random(0)
+    embeddings = HashingEmbeddings()
+    per_document = total_chunks // documents
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        start = time.perf_counter()
+        manifest = read_manifest(corpus_dir)
+        manifest["settings"] = {"chunk_size": CORPUS_CHUNK_SIZE, "chunk_overlap": CORPUS_CHUNK_OVERLAP,
+                                "embedding_model": embeddings.model}
+        names = []
+        for d in range(documents):
+            topic = TOPICS[d % len(TOPICS)]
+            name = f"bill_{d:04d}.{'xml' if d % 3 == 0 else 'pdf'}"
+            chunks = [Document(page_content=synthetic_chunk(rng, topic, n), metadata={"source": name, "page": n})
+                      for n in range(per_document)]
+            write_shard(corpus_dir, f"{d:064x}", chunks, embeddings.embed_documents([c.page_content for c in chunks]))
+            manifest["documents"][f"{d:064x}"] = {"path": name, "chunks": len(chunks), "ingested_at": time.time()}
+            names.append(name)
+        write_manifest(corpus_dir, manifest)
+        print(f"Embedded {per_document * documents:,} chunks of {documents} documents in {time.perf_counter() - start:.1f}s")
+
+        build_corpus_index(corpus_dir, embeddings)
+
+        # The first query opens the index; later ones reuse it
+        start = time.perf_counter()
+        search_corpus(QUERIES[0], embeddings, corpus_dir=corpus_dir)
+        print(f"First query (opens the index): {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        for label, filters in (
+            ("all documents", None),
+            ("one document (exact scan)", {"name": names[7]}),
+            ("xml documents (filtered ANN)", {"format": "xml"}),
+            ("ingested in the last half", {"ingested_after": read_manifest(corpus_dir)["documents"][f"{documents // 2:064x}"]["ingested_at"]}),
+        ):
+            p50, p95 = time_queries(embeddings, corpus_dir, filters)
+            print(f"  {label:<30} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare chunk throughput of the embedding backends
+
+The local backends run on the CPU with no network. The OpenAI path is measured
+for real when OPENAI_API_KEY is set; otherwise it is simulated with a fixed
+latency per request of EMBED_BATCH_SIZE chunks, the way build_vectorstore sends them.
+No cache is used, so every chunk is embedded.
+
+Run from the project root:
+    python -m benchmarks.bench_embedding_providers [pages] [api_latency_ms]
+"""
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from chains.indexing import EMBED_BATCH_SIZE
+from utils.chunking import get_splitter
+from utils.document_parser import load_and_split_document
+from utils.embedding_providers import HashingEmbeddings, LocalEmbeddings, local_model_available
+
+
+class SimulatedApiEmbeddings(Embeddings):
+    """Stand-in for OpenAIEmbeddings with a fixed round-trip latency per request"""
+
+    latency = 0.3
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [[0.0] * 1536 for _ in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def measure(label, embeddings, texts):
+    start = time.perf_counter()
+    for i in range(0, len(texts), EMBED_BATCH_SIZE):
+        embeddings.embed_documents(texts[i:i + EMBED_BATCH_SIZE])
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {len(texts)} chunks in {elapsed:.2f}s, {len(texts) / elapsed:,.0f} chunks/s")
+    return elapsed
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    SimulatedApiEmbeddings.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 300) / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        documents = load_and_split_document(path, use_cache=False, max_chars=None, by_section=True)
+    texts = [chunk.page_content for chunk in get_splitter().split_documents(documents)]
+
+    if os.getenv("OPENAI_API_KEY"):
+        api = measure("OpenAI API", OpenAIEmbeddings(), texts)
+    else:
+        api = measure(f"OpenAI API (simulated, {SimulatedApiEmbeddings.latency * 1000:.0f} ms per request)",
+                      SimulatedApiEmbeddings(), texts)
+
+    hashing = measure("offline hashing", HashingEmbeddings(), texts)
+    print(f"hashing is {api / hashing:.0f}x the API throughput")
+
+    if local_model_available():
+        embeddings = LocalEmbeddings()
+        # Load the model before timing
+        embeddings.embed_documents(texts[:1])
+        local = measure(f"local model ({embeddings.model})", embeddings, texts)
+        print(f"local model is {api / local:.1f}x the API throughput")
+    else:
+        print("local model: skipped (pip install sentence-transformers)")
+
+
+if __name__ == "__main__":
+    main()
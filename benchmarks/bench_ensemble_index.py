@@ -0,0 +1,92 @@
+"""Compare building the ensemble's vector index per member model against one shared index
+
+Embeddings are faked with a fixed per-request latency, so no API key is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_ensemble_index [pages] [latency_ms]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI
+import chains.ensemble_chain as ensemble_chain
+from utils.embedding_cache import CachedEmbeddings
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from utils.document_parser import load_and_split_document
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic stand-in for OpenAIEmbeddings that counts requests and texts"""
+
+    model = "benchmark-fake"
+    latency = 0.05
+    requests = 0
+    texts = 0
+
+    def __init__(self, **kwargs):
+        pass
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.requests += 1
+        CountingEmbeddings.texts += len(texts)
+        time.sleep(self.latency)
+        return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()[:32]] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def run(label, build):
+    # Fresh caches so neither approach starts with the other's embeddings
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(cache_dir, "embeddings.sqlite")
+        os.environ["DOCUMENT_VERSIONS_DIR"] = os.path.join(cache_dir, "versions")
+        CountingEmbeddings.requests = CountingEmbeddings.texts = 0
+        start = time.perf_counter()
+        build()
+        elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.2f}s, {CountingEmbeddings.requests} embedding requests, {CountingEmbeddings.texts} texts embedded")
+    return elapsed, CountingEmbeddings.texts
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    CountingEmbeddings.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        documents = load_and_split_document(path, use_cache=False, max_chars=None, by_section=True)
+
+    members = [ChatOpenAI(model_name="gpt-3.5-turbo", openai_api_key="benchmark"),
+               ChatOpenAI(model_name="gpt-3.5-turbo", openai_api_key="benchmark")]
+
+    def per_member():
+        for llm in members:
+            ensemble_chain.build_single_qa_chain(documents, llm, openai_api_key="benchmark")
+
+    def shared():
+        vectorstore = ensemble_chain.build_document_index(documents, openai_api_key="benchmark")
+        for llm in members:
+            ensemble_chain.build_single_qa_chain(documents, llm, openai_api_key="benchmark", vectorstore=vectorstore)
+
+    build_vectorstore = ensemble_chain.build_vectorstore
+    for caches in (False, True):
+        if caches:
+            ensemble_chain.get_embeddings = lambda provider=None, api_key=None: CachedEmbeddings(CountingEmbeddings())
+            ensemble_chain.build_vectorstore = build_vectorstore
+        else:
+            # What every member build cost before the embedding cache and section reuse existed
+            ensemble_chain.get_embeddings = lambda provider=None, api_key=None: CountingEmbeddings()
+            ensemble_chain.build_vectorstore = lambda *args: build_vectorstore(*args, reuse_versions=False)
+        print(f"-- {'with' if caches else 'without'} the embedding cache and section reuse")
+        before, before_texts = run("index per member", per_member)
+        after, after_texts = run("shared index", shared)
+        print(f"build latency {after / before:.0%} of before, texts embedded {after_texts / max(1, before_texts):.0%} of before")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Measure the lexical stage of hybrid retrieval on a 10k-chunk corpus
+
+Chunks are generated from a Zipf-distributed vocabulary with one unique
+citation each, roughly the size of the 800-character chunks the chains use.
+Dense vectors come from the offline hashing backend, so no API key is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_hybrid_retrieval [chunks] [queries]
+"""
+import random
+import sys
+import time
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from utils.embedding_providers import HashingEmbeddings
+from utils.hybrid_search import HybridRetriever, LexicalIndex
+
+WORDS_PER_CHUNK = 120
+
+
+def synthetic_chunks(count, vocabulary_size=20000, seed=7):
+    rng = random.Random(seed)
+    vocabulary = [f"term{i}" for i in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    chunks = []
+    for i in range(count):
+        words = rng.choices(vocabulary, weights=weights, k=WORDS_PER_CHUNK)
+        words.insert(rng.randrange(len(words)), f"26 CFR 54.{9800 + i}-{i % 7}")
+        chunks.append(" ".join(words))
+    return chunks
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return f"p50 {np.percentile(samples, 50):.2f} ms, p95 {np.percentile(samples, 95):.2f} ms"
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    query_count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    texts = synthetic_chunks(count)
+    rng = random.Random(11)
+    targets = [rng.randrange(count) for _ in range(query_count)]
+    queries = [f"What does 26 CFR 54.{9800 + i}-{i % 7} require for term3 and term250?" for i in targets]
+
+    start = time.perf_counter()
+    lexical = LexicalIndex(texts)
+    build = time.perf_counter() - start
+    print(f"{count} chunks: inverted index built in {build:.2f}s, {len(lexical.vocabulary):,} terms, "
+          f"{lexical.nbytes / 1024 / 1024:.1f} MB of postings")
+
+    timings = []
+    hits = 0
+    for query, target in zip(queries, targets):
+        start = time.perf_counter()
+        results = lexical.search(query, 20)
+        timings.append(time.perf_counter() - start)
+        hits += any(chunk_id == target for chunk_id, _ in results[:5])
+    print(f"lexical stage (BM25, top 20): {percentiles(timings)}; exact citation in top 5 for {hits}/{query_count} queries")
+
+    embeddings = HashingEmbeddings()
+    vectorstore = FAISS.from_embeddings(list(zip(texts, embeddings.embed_documents(texts))), embeddings)
+    retriever = HybridRetriever(vectorstore=vectorstore, lexical=lexical,
+                                chunks=[vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(count)])
+
+    dense, hybrid = [], []
+    for query in queries:
+        start = time.perf_counter()
+        vectorstore.similarity_search(query, k=20)
+        dense.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        retriever.invoke(query)
+        hybrid.append(time.perf_counter() - start)
+    print(f"dense stage (flat FAISS, top 20, incl. query embedding): {percentiles(dense)}")
+    print(f"hybrid retrieval (both stages + rank fusion): {percentiles(hybrid)}")
+
+
+if __name__ == "__main__":
+    main()
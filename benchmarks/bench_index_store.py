@@ -0,0 +1,65 @@
+"""Compare building a document's chat index against reopening it from the index store
+
+Embeddings are faked with a fixed per-request latency, so no API key is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_index_store [pages] [latency_ms]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import Embeddings
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from chains.indexing import load_or_build_vectorstore
+from utils.chunking import get_splitter
+from utils.document_parser import iter_document_pages
+from utils.embedding_cache import CachedEmbeddings
+from utils.parse_cache import hash_file
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic stand-in for OpenAIEmbeddings with a fixed latency per request"""
+
+    model = "benchmark-fake"
+    latency = 0.05
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    FakeEmbeddings.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in ("EMBEDDING_CACHE_PATH", "DOCUMENT_VERSIONS_DIR", "INDEX_STORE_DIR", "PARSE_CACHE_DIR"):
+            os.environ[name] = os.path.join(tmp_dir, name.lower())
+        os.environ["EMBEDDING_CACHE_PATH"] += ".sqlite"
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        document_hash = hash_file(path)
+
+        def open_index():
+            splitter = get_splitter()
+            start = time.perf_counter()
+            vectorstore, chunks = load_or_build_vectorstore(
+                document_hash, iter_document_pages(path, max_chars=None), splitter, CachedEmbeddings(FakeEmbeddings()))
+            return time.perf_counter() - start, len(chunks)
+
+        built, chunk_count = open_index()
+        reopened, reopened_count = open_index()
+
+    print(f"{pages} pages, {chunk_count} chunks")
+    print(f"first build: {built * 1000:.0f} ms")
+    print(f"reopen from the index store: {reopened * 1000:.1f} ms ({reopened_count} chunks)")
+    print(f"reopen is {built / reopened:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
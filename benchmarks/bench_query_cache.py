@@ -0,0 +1,68 @@
+"""Measure query-embedding latency for a follow-up click: API, persistent cache, in-memory LRU
+
+The embeddings API is faked with a fixed latency per call, so no API key is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_query_cache [latency_ms]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import Embeddings
+import utils.embedding_cache as embedding_cache
+from chains.ensemble_chain import FOLLOW_UP_QUESTIONS
+from utils.embedding_cache import CachedEmbeddings
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic stand-in for OpenAIEmbeddings that counts calls"""
+
+    model = "benchmark-fake"
+    latency = 0.1
+    calls = 0
+
+    def embed_documents(self, texts):
+        FakeEmbeddings.calls += 1
+        time.sleep(self.latency)
+        return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()] * 48 for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def time_clicks(embeddings, questions):
+    start = time.perf_counter()
+    for question in questions:
+        embeddings.embed_query(question)
+    return (time.perf_counter() - start) / len(questions) * 1000
+
+
+def main():
+    FakeEmbeddings.latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 100) / 1000
+    questions = [question for mode in FOLLOW_UP_QUESTIONS.values() for question in mode]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(cache_dir, "embeddings.sqlite")
+        embeddings = CachedEmbeddings(FakeEmbeddings())
+
+        print(f"first click, embeddings API: {time_clicks(embeddings, questions):.2f} ms per question")
+        # A new server process: the persistent cache has the vectors, memory does not
+        embedding_cache._query_cache.clear()
+        print(f"persistent cache (SQLite): {time_clicks(embeddings, questions):.2f} ms per question")
+        print(f"in-memory LRU: {time_clicks(embeddings, questions):.3f} ms per question")
+
+        embedding_cache.clear_cache()
+        FakeEmbeddings.calls = 0
+        start = time.perf_counter()
+        embeddings.warm_queries(questions)
+        warm = time.perf_counter() - start
+        calls = FakeEmbeddings.calls
+        click = time_clicks(embeddings, questions)
+        print(f"pre-embedding {len(questions)} follow-ups at index time: {warm * 1000:.0f} ms, {calls} API calls; "
+              f"a click then costs {click:.3f} ms and {FakeEmbeddings.calls - calls} API calls")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Measure how many prompt tokens the two-stage reranker saves, and what it costs
+
+A synthetic bill of distinct sections is indexed with the offline hashing
+embeddings. For each question on a fixed list, the context the chains would send
+to the LLM is compared with and without reranking:
+- the Decoder and Chat chains: 5 hybrid chunks, or at most 3 reranked from 20;
+- the Ensemble Decoder: 5 parent passages, or at most 3 reranked from 8.
+"Answer kept" counts the questions whose context still holds the sentence
+that answers them.
+
+Run from the project root:
+    python -m benchmarks.bench_reranker [scorer] [filler_sections]
+    e.g. python -m benchmarks.bench_reranker cross-encoder 60
+"""
+import random
+import sys
+import time
+import numpy as np
+from langchain.schema import Document
+from chains.indexing import build_vectorstore
+from utils.chunking import ParentChunkRetriever, get_splitter
+from utils.hybrid_search import HybridRetriever
+from utils.reranker import RerankRetriever
+from utils.embedding_providers import HashingEmbeddings
+from utils.token_counter import count_tokens
+
+# (section heading, sentence answering the question, question)
+FACTS = [
+    ("Premium Tax Credits", "The applicable percentage for premium tax credits is capped at 8.5 percent of household income.",
+     "What is the cap on the applicable percentage for premium tax credits?"),
+    ("Notice Requirements", "Employers must give each participant a written notice at least 90 calendar days before the plan year.",
+     "How many days before the plan year must employers send the written notice?"),
+    ("Integration Conditions", "An individual coverage HRA may be integrated with individual coverage if 26 CFR 54.9802-4 is satisfied.",
+     "Which regulation governs integration of an individual coverage HRA?"),
+    ("Medicaid Redeterminations", "States must complete eligibility redeterminations within 12 months after the continuous enrollment condition ends.",
+     "How long do states have to complete Medicaid eligibility redeterminations?"),
+    ("Penalties", "A plan sponsor that fails to comply is subject to a civil penalty of $100 per day per affected participant.",
+     "What is the penalty for non-compliance?"),
+    ("Effective Date", "The amendments made by this section apply to plan years beginning on or after January 1, 2020.",
+     "When do the amendments take effect?"),
+    ("Special Enrollment", "Employees newly offered an individual coverage HRA have a 60-day special enrollment period in the Exchange.",
+     "How long is the special enrollment period for employees newly offered an ICHRA?"),
+    ("Excepted Benefits", "Excepted benefit HRAs are limited to $1,800 per plan year, indexed for inflation.",
+     "What is the annual limit of an excepted benefit HRA?"),
+    ("Reporting", "Exchanges shall report enrollment in qualified health plans to the Secretary on a quarterly basis.",
+     "How often must Exchanges report enrollment to the Secretary?"),
+    ("Same Terms Requirement", "An HRA must be offered on the same terms to all participants within a class of employees.",
+     "What does the same terms requirement say about classes of employees?"),
+]
+
+FILLER = ("The Departments received comments on this provision and considered alternatives, including the approach in "
+          "the proposed rules. After consideration of the comments, the Departments are finalizing the provision with "
+          "clarifications. Commenters generally supported flexibility for employers and participants, while others "
+          "raised concerns about market stability and the administrative burden on plan sponsors.").split(". ")
+
+QUESTIONS = [question for _, _, question in FACTS] + [
+    "Tell me about this policy",
+    "Give me an overview of this policy",
+]
+
+
+def synthetic_bill(filler_sections, seed=0):
+    rng = random.Random(seed)
+    sections = []
+    for number, (heading, answer, _) in enumerate(FACTS, start=1):
+        body = [rng.choice(FILLER) + "." for _ in range(6)] + [answer] + [rng.choice(FILLER) + "." for _ in range(6)]
+        sections.append((f"SEC. {number}. {heading.upper()}.", " ".join(body)))
+    for number in range(filler_sections):
+        sections.append((f"SEC. {len(FACTS) + number + 1}. TECHNICAL AMENDMENTS.",
+                         " ".join(rng.choice(FILLER) + "." for _ in range(14))))
+    rng.shuffle(sections)
+    return [Document(page_content=f"{heading}\n{body}", metadata={"source": "synthetic_bill.pdf", "page": i, "heading": heading})
+            for i, (heading, body) in enumerate(sections)]
+
+
+def evaluate(retriever, label):
+    tokens, passages, kept, timings = [], [], 0, []
+    for question in QUESTIONS:
+        start = time.perf_counter()
+        documents = retriever.invoke(question)
+        timings.append(time.perf_counter() - start)
+        context = "\n\n".join(document.page_content for document in documents)
+        tokens.append(count_tokens(context))
+        passages.append(len(documents))
+        answer = next((a for _, a, q in FACTS if q == question), None)
+        kept += answer is not None and answer in context
+    print(f"  {label:<34} {np.mean(passages):4.1f} passages {np.mean(tokens):6.0f} tokens  answer kept {kept}/{len(FACTS)}  "
+          f"p50 {np.percentile(timings, 50) * 1000:6.2f} ms")
+    return np.mean(tokens)
+
+
+def main():
+    scorer = sys.argv[1] if len(sys.argv) > 1 else "lexical"
+    filler_sections = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+
+    vectorstore, chunks = build_vectorstore(synthetic_bill(filler_sections), get_splitter(), HashingEmbeddings(),
+                                            reuse_versions=False)
+    print(f"{len(chunks)} chunks, {len(QUESTIONS)} questions, {scorer} reranking")
+
+    print("Decoder / Chat context")
+    hybrid = HybridRetriever.from_vectorstore(vectorstore, k=5)
+    baseline = evaluate(hybrid, "hybrid, 5 chunks")
+    reranked = evaluate(RerankRetriever.from_vectorstore(vectorstore, scorer=scorer), "reranked, up to 3 of 20")
+    print(f"  prompt tokens saved: {100 * (1 - reranked / baseline):.0f}%")
+
+    print("Ensemble context (parent passages)")
+    chunk_retriever = HybridRetriever.from_vectorstore(vectorstore, k=20, fetch_k=40)
+    parents = ParentChunkRetriever.from_vectorstore(vectorstore, k=5, chunk_retriever=chunk_retriever)
+    baseline = evaluate(parents, "parents, 5 passages")
+    candidates = ParentChunkRetriever.from_vectorstore(vectorstore, k=8, chunk_retriever=chunk_retriever)
+    reranked = evaluate(RerankRetriever.wrap(candidates, scorer=scorer, lexical=chunk_retriever.lexical),
+                        "reranked, up to 3 of 8 passages")
+    print(f"  prompt tokens saved: {100 * (1 - reranked / baseline):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
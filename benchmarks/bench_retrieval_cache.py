@@ -0,0 +1,119 @@
+"""Measure retrieval time for repeated questions with and without the retrieval cache
+
+Questions are replayed from temp_session.json when it exists, otherwise from a
+built-in list with the same repeats. Each question is retrieved three times, as
+in the Ensemble Decoder: once per member model and once for the fallback
+answer. The embeddings API is faked with a fixed latency per call.
+
+Run from the project root:
+    python -m benchmarks.bench_retrieval_cache [pages] [latency_ms]
+"""
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import Embeddings
+import utils.embedding_cache as embedding_cache
+import utils.retrieval_cache as retrieval_cache
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from chains.indexing import build_vectorstore
+from utils.chunking import ParentChunkRetriever, get_splitter
+from utils.document_parser import load_and_split_document
+from utils.embedding_cache import CachedEmbeddings
+from utils.hybrid_search import HybridRetriever
+from utils.retrieval_cache import CachedRetriever
+
+SESSION_FILE = "temp_session.json"
+DEFAULT_QUESTIONS = [
+    "tell me about this policy", "Tell me what this policy is about.", "tell me about this policy",
+    "How can state exchanges benefit from the policy?", "tell me about this policy",
+    "Are state exchanges the only organizations that can sell ICHRAs?", "tell me about  this policy",
+    "Give me an overview of this policy", "How can state exchanges benefit from the policy?",
+]
+RETRIEVALS_PER_QUESTION = 3
+
+
+class FakeEmbeddings(Embeddings):
+    """Deterministic stand-in for OpenAIEmbeddings with a fixed latency per call"""
+
+    model = "benchmark-fake"
+    latency = 0.1
+    calls = 0
+
+    def embed_documents(self, texts):
+        FakeEmbeddings.calls += 1
+        time.sleep(self.latency)
+        return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()] * 48 for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def session_questions():
+    if not os.path.exists(SESSION_FILE):
+        return DEFAULT_QUESTIONS
+    with open(SESSION_FILE, "r") as f:
+        activities = json.load(f).get("user_activities", [])
+    questions = [a["details"]["query"] for a in activities if isinstance(a.get("details"), dict) and a["details"].get("query")]
+    return questions or DEFAULT_QUESTIONS
+
+
+def replay(retriever, questions):
+    calls = FakeEmbeddings.calls
+    start = time.perf_counter()
+    for question in questions:
+        for _ in range(RETRIEVALS_PER_QUESTION):
+            retriever.invoke(question)
+    elapsed = time.perf_counter() - start
+    return elapsed / len(questions) * 1000, FakeEmbeddings.calls - calls
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    FakeEmbeddings.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 100) / 1000
+    questions = session_questions()
+    distinct = len({embedding_cache.normalize_query(q) for q in questions})
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(tmp_dir, "embeddings.sqlite")
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        documents = load_and_split_document(path, use_cache=False, max_chars=None, by_section=True)
+        FakeEmbeddings.latency, latency = 0.0, FakeEmbeddings.latency
+        vectorstore, chunks = build_vectorstore(documents, get_splitter(), CachedEmbeddings(FakeEmbeddings()), reuse_versions=False)
+        FakeEmbeddings.latency = latency
+        print(f"{len(chunks)} chunks; replaying {len(questions)} questions ({distinct} distinct), "
+              f"{RETRIEVALS_PER_QUESTION} retrievals each")
+
+        retriever = ParentChunkRetriever.from_vectorstore(
+            vectorstore, k=5, chunk_retriever=HybridRetriever.from_vectorstore(vectorstore, k=20, fetch_k=40))
+
+        embedding_cache._query_cache.clear()
+        embedding_cache.clear_cache()
+        ms, calls = replay(retriever, questions)
+        print(f"without retrieval cache: {ms:7.2f} ms per question, {calls} embedding calls")
+
+        embedding_cache.clear_cache()
+        retrieval_cache.clear_cache()
+        ms, calls = replay(CachedRetriever.wrap(retriever, vectorstore), questions)
+        stats = retrieval_cache.cache_stats()
+        print(f"with retrieval cache:    {ms:7.2f} ms per question, {calls} embedding calls, "
+              f"{stats['hits']} hits / {stats['misses']} misses")
+
+        # Questions asked again later in the session, with their query vectors already in memory
+        cached = CachedRetriever.wrap(retriever, vectorstore)
+        timings = {}
+        for label, r in (("searching", retriever), ("retrieval cache", cached)):
+            start = time.perf_counter()
+            for _ in range(20):
+                for question in questions:
+                    r.invoke(question)
+            timings[label] = (time.perf_counter() - start) / (20 * len(questions)) * 1000
+        print(f"repeated question: {timings['searching']:.2f} ms searching with a cached query vector, "
+              f"{timings['retrieval cache']:.3f} ms from the retrieval cache")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Compare indexing a document per chunk size against one shared chunk store with parents
+
+Before, the Q&A and chat chains split at 800/150 and the ensemble at 1500/200, so a
+document opened on both pages was split and embedded twice. Embeddings are faked
+with a fixed per-request latency, so no API key is needed.
+
+Run from the project root:
+    python -m benchmarks.bench_shared_chunks [pages] [latency_ms]
+"""
+import hashlib
+import os
+import sys
+import tempfile
+import time
+from langchain_core.embeddings import Embeddings
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from chains.indexing import build_vectorstore
+from utils.chunking import ParentChunkRetriever, get_splitter
+from utils.document_parser import load_and_split_document
+from utils.embedding_cache import CachedEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Deterministic stand-in for OpenAIEmbeddings that counts the texts it embeds"""
+
+    model = "benchmark-fake"
+    latency = 0.05
+    texts = 0
+
+    def embed_documents(self, texts):
+        CountingEmbeddings.texts += len(texts)
+        time.sleep(self.latency)
+        return [[b / 255 for b in hashlib.sha256(t.encode("utf-8")).digest()] for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def run(label, build):
+    with tempfile.TemporaryDirectory() as cache_dir:
+        os.environ["EMBEDDING_CACHE_PATH"] = os.path.join(cache_dir, "embeddings.sqlite")
+        os.environ["DOCUMENT_VERSIONS_DIR"] = os.path.join(cache_dir, "versions")
+        CountingEmbeddings.texts = 0
+        start = time.perf_counter()
+        passages = build()
+        elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.2f}s, {CountingEmbeddings.texts} texts embedded, "
+          f"{passages} passages of up to 1500 characters for the ensemble")
+    return elapsed, CountingEmbeddings.texts
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    CountingEmbeddings.latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 50) / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "synthetic_rule.pdf")
+        write_synthetic_pdf(path, pages=pages)
+        documents = load_and_split_document(path, use_cache=False, max_chars=None, by_section=True)
+
+    def per_chunk_size():
+        embeddings = CachedEmbeddings(CountingEmbeddings())
+        build_vectorstore(documents, RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150), embeddings)
+        vectorstore, chunks = build_vectorstore(
+            documents, RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200), embeddings)
+        return len(chunks)
+
+    def shared():
+        embeddings = CachedEmbeddings(CountingEmbeddings())
+        build_vectorstore(documents, get_splitter(), embeddings)
+        # The ensemble opens the same document: units and embeddings are reused
+        vectorstore, chunks = build_vectorstore(documents, get_splitter(), embeddings)
+        return len(ParentChunkRetriever.from_vectorstore(vectorstore).parents)
+
+    before, before_texts = run("index per chunk size", per_chunk_size)
+    after, after_texts = run("shared chunks with parents", shared)
+    print(f"latency {after / before:.0%} of before, texts embedded {after_texts / max(1, before_texts):.0%} of before")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Compare the adaptive corpus index against exact flat search as the corpus grows
+
+Vectors are synthetic: clusters with most of their variance in a few directions,
+in the dimension of a small local embedding model, standing in for chunks of
+many related documents.
+
+Run from the project root:
+    python -m benchmarks.bench_vector_index [sizes] [dimensions]
+    e.g. python -m benchmarks.bench_vector_index 5000,50000,250000 384
+"""
+import sys
+import time
+import faiss
+import numpy as np
+from utils.vector_index import build_index, index_bytes, recall_at_k
+
+QUERIES = 200
+
+
+def clustered_vectors(count, dimensions, clusters=200, latent=48, seed=3):
+    # Like real embeddings, most of the variance lies in a few directions
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimensions)).astype(np.float32)
+    basis = rng.normal(size=(latent, dimensions)).astype(np.float32) / np.sqrt(latent)
+    labels = rng.integers(clusters, size=count)
+    spread = rng.normal(size=(count, latent)).astype(np.float32) @ basis
+    noise = 0.05 * rng.normal(size=(count, dimensions)).astype(np.float32)
+    return centers[labels] + spread + noise
+
+
+def query_latency(index, queries):
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query[None, :], 10)
+        timings.append(time.perf_counter() - start)
+    return np.percentile(timings, 50) * 1000
+
+
+def report(label, index, info, vectors, queries):
+    print(f"  {label:<22} {info['build_seconds']:7.1f}s build {info['bytes'] / 1024 / 1024:8.1f} MB "
+          f"{query_latency(index, queries):7.3f} ms p50  recall@10 {recall_at_k(index, vectors):.3f}")
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(",")] if len(sys.argv) > 1 else [5000, 50000, 250000]
+    dimensions = int(sys.argv[2]) if len(sys.argv) > 2 else 384
+    faiss.omp_set_num_threads(1)
+
+    for size in sizes:
+        vectors = clustered_vectors(size, dimensions)
+        queries = vectors[np.random.default_rng(1).choice(size, QUERIES, replace=False)] + 0.05
+        print(f"{size:,} vectors x {dimensions} dimensions")
+
+        flat = faiss.IndexFlatL2(dimensions)
+        start = time.perf_counter()
+        flat.add(vectors)
+        report("exact flat", flat, {"build_seconds": time.perf_counter() - start, "bytes": index_bytes(flat)}, vectors, queries)
+
+        index, info = build_index(vectors)
+        report(f"auto: {info['kind']}", index, info, vectors, queries)
+        if info["kind"] != "ivfpq":
+            index, info = build_index(vectors, kind=info["kind"], int8=True)
+            report(f"{info['kind']} + int8", index, info, vectors, queries)
+            index, info = build_index(vectors, kind=info["kind"], dimensions=dimensions // 3)
+            report(f"{info['kind']} + PCA {dimensions // 3}", index, info, vectors, queries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Write text-only PDFs for benchmarks without any PDF-authoring dependency"""
+
+HEADER_LINE = "Federal Register / Vol. 84, No. 119 / Thursday, June 20, 2019 / Rules and Regulations"
+
+BODY_LINES = [
+    "The Departments are finalizing rules that expand the flexibility and use of",
+    "health reimbursement arrangements (HRAs) and other account-based group health",
+    "plans. An individual coverage HRA may be integrated with individual health",
+    "insurance coverage if the conditions in 26 CFR 54.9802-4 are satisfied, and",
+    "a participant may use the arrangement to pay premiums for such coverage.",
+    "Employers offering an individual coverage HRA must provide a written notice",
+    "to each participant at least 90 calendar days before the plan year begins.",
+]
+
+
+def page_lines(page_number, lines_per_page=45):
+    """Return the text lines of one synthetic Federal Register page"""
+    lines = [f"{28888 + page_number} {HEADER_LINE}"]
+    if page_number % 10 == 0:
+        lines.append(f"SEC. {page_number // 10 + 1}. SPECIAL RULES FOR ACCOUNT-BASED PLANS.")
+    for i in range(lines_per_page):
+        lines.append(BODY_LINES[(page_number + i) % len(BODY_LINES)])
+    return lines
+
+
+def write_synthetic_pdf(path, pages=300, lines_per_page=45):
+    """Write a multi-page PDF whose pages carry real, extractable text
+
+    Args:
+        path (str): Output file path
+        pages (int, optional): Number of pages
+        lines_per_page (int, optional): Body lines per page
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    pages_id = add(None)  # filled in once the page ids are known
+    page_ids = []
+    for page_number in range(pages):
+        ops = ["BT", "/F1 9 Tf", "11 TL", "40 760 Td"]
+        for line in page_lines(page_number, lines_per_page):
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content_id = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        page_ids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 %d 0 R >> >> >>" % (pages_id, content_id, font_id)
+        ))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[pages_id - 1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+    catalog_id = add(b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id)
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog_id, xref_offset)
+
+    with open(path, "wb") as f:
+        f.write(out)
@@ -0,0 +1,35 @@
+"""Write the USLM XML counterpart of the synthetic PDF from benchmarks.synthetic_pdf"""
+from xml.sax.saxutils import escape
+from benchmarks.synthetic_pdf import page_lines
+
+USLM_NAMESPACE = "http://schemas.gpo.gov/xml/uslm"
+
+
+def write_synthetic_bill_xml(path, pages=300, lines_per_page=45):
+    """Write a USLM bill carrying the same sections and body text as write_synthetic_pdf
+
+    Args:
+        path (str): Output file path
+        pages (int, optional): Number of printed pages the text would fill
+        lines_per_page (int, optional): Body lines per page
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<bill xmlns="{USLM_NAMESPACE}">\n<main>\n')
+        section_open = False
+        for page_number in range(pages):
+            # The first line is the running header, which XML does not have
+            lines = page_lines(page_number, lines_per_page)[1:]
+            if page_number % 10 == 0:
+                if section_open:
+                    f.write("</content>\n</section>\n")
+                number = page_number // 10 + 1
+                # "SEC. 1. SPECIAL RULES ..." -> "SPECIAL RULES ..."
+                heading = lines.pop(0).split(". ", 2)[2]
+                f.write(f'<section identifier="/us/bill/s{number}">\n<num value="{number}">SEC. {number}.</num>\n'
+                        f"<heading>{escape(heading)}</heading>\n<content>\n")
+                section_open = True
+            for line in lines:
+                f.write(f"<p>{escape(line)}</p>\n")
+        if section_open:
+            f.write("</content>\n</section>\n")
+        f.write("</main>\n</bill>\n")
@@ -1,9 +1,14 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chains.indexing import build_vectorstore
+from utils.chunking import PageLookupRetriever, ParentChunkRetriever, get_splitter
+from utils.corpus_search import add_to_corpus
+from utils.embedding_providers import get_embeddings
+from utils.hybrid_search import HybridRetriever
+from utils.reranker import RerankRetriever
+from utils.retrieval_cache import CachedRetriever
 from langchain.prompts import PromptTemplate
 import asyncio
 import streamlit as st
@@ -13,6 +18,31 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
+# Suggested follow-up questions per Analysis Mode on the Ensemble Decoder page;
+# embedded ahead of time so a click goes straight to the vector search
+FOLLOW_UP_QUESTIONS = {
+    "General Overview": [
+        "What are the key objectives?",
+        "Who are the main stakeholders?",
+        "What is the timeline for implementation?"
+    ],
+    "Implementation Details": [
+        "What are the specific steps for implementation?",
+        "What resources are required?",
+        "What are the key milestones?"
+    ],
+    "Impact Analysis": [
+        "What are the expected outcomes?",
+        "Are there any potential challenges?",
+        "How will success be measured?"
+    ],
+    "Compliance Check": [
+        "What are the compliance requirements?",
+        "Are there any reporting obligations?",
+        "What are the penalties for non-compliance?"
+    ]
+}
+
 # Initialize models - only actually create them when needed
 def get_openai_llm(api_key=None):
     """Get OpenAI LLM with proper API key prioritization"""
@@ -35,22 +65,50 @@ def get_claude_llm(api_key=None):
         print(f"Claude setup failed: {e}")
         return None
 
-def build_single_qa_chain(documents, llm, high_school_level=False):
-    """Build a QA chain for a single LLM"""
+def build_document_index(documents, openai_api_key=None, embedding_provider=None, document_hash=None):
+    """Split and embed a document once into the vector store shared by every ensemble member"""
+    # The shared fine-grained chunks, so chunks and embeddings indexed by the other
+    # chains are reused; members retrieve their parent passages
+    splitter = get_splitter()
+    # Background ingestion threads have no session state, so prefer the key passed in
+    api_key = openai_api_key or st.session_state.get("openai_key", OPENAI_API_KEY)
+    embeddings = get_embeddings(embedding_provider, api_key)
+    vectorstore, chunks = build_vectorstore(documents, splitter, embeddings)
+    # Searchable later from the Home page alongside every other document
+    try:
+        add_to_corpus(vectorstore, embeddings, document_key=document_hash)
+    except Exception as e:
+        print(f"Could not add the document to the corpus: {e}")
+    return vectorstore
+
+NO_CONTENT_MESSAGE = "I couldn't extract any readable content from the document you provided. Please try uploading a different PDF or pasting the text directly."
+
+def build_document_retriever(vectorstore, page_index=None):
+    """Build the retriever shared by every ensemble member over the document's vector store"""
+    # Search the fine-grained chunks lexically and by embedding, but answer from
+    # their ~1500 character parents; of 8 candidate parents, only the few that
+    # clear the reranker are put in the prompt
+    chunk_retriever = HybridRetriever.from_vectorstore(vectorstore, k=20, fetch_k=40)
+    retriever = RerankRetriever.wrap(ParentChunkRetriever.from_vectorstore(vectorstore, k=8, chunk_retriever=chunk_retriever),
+                                     lexical=chunk_retriever.lexical)
+    # A question asked of one model is searched once for all of them, and the
+    # chains' fallbacks reuse the results
+    retriever = CachedRetriever.wrap(retriever, vectorstore)
+    if page_index is not None:
+        # Questions about a page or section number get those pages in full
+        retriever = PageLookupRetriever(retriever=retriever, page_index=page_index)
+    return retriever
+
+def build_single_qa_chain(documents, llm, high_school_level=False, openai_api_key=None, vectorstore=None, embedding_provider=None, page_index=None, retriever=None):
+    """Build a QA chain for a single LLM, on a shared vector store and retriever when they are passed in"""
+    if vectorstore is None:
+        vectorstore = build_document_index(documents, openai_api_key, embedding_provider)
+
     # Check if we have any content in the documents
-    if not documents or all(not doc.page_content.strip() for doc in documents):
+    if vectorstore is None:
         def no_content_answer(query):
-            return "I couldn't extract any readable content from the document you provided. Please try uploading a different PDF or pasting the text directly."
+            return NO_CONTENT_MESSAGE
         return no_content_answer
-        
-    # Split documents into chunks
-    splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
-    chunks = splitter.split_documents(documents)
-
-    # Create vector database
-    api_key = st.session_state.get("openai_key", OPENAI_API_KEY)
-    embeddings = OpenAIEmbeddings(openai_api_key=api_key)
-    vectorstore = FAISS.from_documents(chunks, embeddings)
     
     # Create custom prompt for better context understanding
     qa_prompt_template = """You are an expert policy analyst tasked with analyzing a policy document. Your goal is to provide clear, accurate, and helpful information based on the document content.
@@ -90,15 +148,13 @@ def build_single_qa_chain(documents, llm, high_school_level=False):
         input_variables=["context", "query"]
     )
     
+    if retriever is None:
+        retriever = build_document_retriever(vectorstore, page_index)
+
     # Create the QA chain with improved retrieval
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm, 
-        retriever=vectorstore.as_retriever(
-            search_kwargs={
-                "k": 5,
-                "fetch_k": 8
-            }
-        ),
+        retriever=retriever,
         chain_type="stuff",
         return_source_documents=True,
         chain_type_kwargs={"prompt": prompt}
@@ -121,11 +177,7 @@ def build_single_qa_chain(documents, llm, high_school_level=False):
                     "cannot find"
                 ]):
                     # Get more context and try a focused approach
-                    relevant_docs = vectorstore.similarity_search(
-                        query,
-                        k=4,
-                        fetch_k=8
-                    )
+                    relevant_docs = retriever.invoke(query)[:4]
                     
                     context = "\n\n".join([doc.page_content for doc in relevant_docs])
                     focused_prompt = f"""Based on this specific question: "{query}"
@@ -157,7 +209,7 @@ def build_single_qa_chain(documents, llm, high_school_level=False):
         except Exception as e:
             # Enhanced error handling with more helpful response
             try:
-                relevant_docs = vectorstore.similarity_search(query, k=3)
+                relevant_docs = retriever.invoke(query)[:3]
                 error_context = "\n\n".join([doc.page_content for doc in relevant_docs])
                 
                 error_prompt = f"""I encountered an error while analyzing this document. 
@@ -196,7 +248,7 @@ def build_single_qa_chain(documents, llm, high_school_level=False):
 
     return get_answer
 
-def build_ensemble_qa_chain(documents, openai_api_key=None, anthropic_api_key=None, high_school_level=False, ensemble_with="openai"):
+def build_ensemble_qa_chain(documents, openai_api_key=None, anthropic_api_key=None, high_school_level=False, ensemble_with="openai", embedding_provider=None, page_index=None, document_hash=None):
     """
     Build an ensemble QA chain that uses multiple models and combines their responses.
     """
@@ -204,13 +256,40 @@ def build_ensemble_qa_chain(documents, openai_api_key=None, anthropic_api_key=No
     openai_llm = get_openai_llm(openai_api_key)
     claude_llm = get_claude_llm(anthropic_api_key)
     
+    # One index serves every member model, so the document is split and embedded
+    # once and a page stream can be consumed directly
+    vectorstore = build_document_index(documents, openai_api_key, embedding_provider, document_hash)
+
+    # The page stream is used up, so the members cannot index it again
+    if vectorstore is None:
+        def no_content_answer(query):
+            return {
+                "openai_response": NO_CONTENT_MESSAGE,
+                "claude_response": None,
+                "ensemble_response": NO_CONTENT_MESSAGE,
+                "models_used": []
+            }
+        return no_content_answer
+
+    # Pre-embed the suggested follow-ups while the document is still being prepared
+    try:
+        vectorstore.embedding_function.warm_queries(
+            [question for questions in FOLLOW_UP_QUESTIONS.values() for question in questions])
+    except Exception as e:
+        print(f"Could not pre-embed follow-up questions: {e}")
+
+    # Every member answers from the same retriever, built once over the shared index
+    retriever = build_document_retriever(vectorstore, page_index)
+
     # Build individual chains
-    openai_chain = build_single_qa_chain(documents, openai_llm, high_school_level)
+    openai_chain = build_single_qa_chain(documents, openai_llm, high_school_level, openai_api_key, vectorstore=vectorstore,
+                                         retriever=retriever)
     
     # Only build Claude chain if API key is available
     claude_chain = None
     if claude_llm:
-        claude_chain = build_single_qa_chain(documents, claude_llm, high_school_level)
+        claude_chain = build_single_qa_chain(documents, claude_llm, high_school_level, openai_api_key, vectorstore=vectorstore,
+                                             retriever=retriever)
     
     # Choose which model to use for ensemble synthesis
     ensemble_llm = openai_llm
@@ -0,0 +1,135 @@
+from concurrent.futures import Future
+from langchain.schema import Document
+from langchain_community.vectorstores import FAISS
+from utils.chunking import assign_parents
+from utils.document_versions import DocumentVersions
+from utils.embedding_pipeline import EmbeddingDispatcher, get_batch_tokens
+from utils.index_store import index_key, load_index, save_index
+from utils.token_counter import count_tokens
+
+# Most chunks sent to the embeddings API in one request; requests are also
+# capped by tokens (EMBED_BATCH_TOKENS)
+EMBED_BATCH_SIZE = 64
+
+def build_vectorstore(documents, splitter, embeddings, batch_size=EMBED_BATCH_SIZE, reuse_versions=True, version_info=None,
+                      batch_tokens=None, max_in_flight=None):
+    """Split and embed documents into a FAISS index as pages arrive
+
+    Pages are split as soon as they are yielded and chunks are packed into
+    batches by token count. Several batches are embedded concurrently, backing
+    off on rate limits, so a streamed document is parsed and embedded at the same
+    time instead of one after the other. Pages or sections
+    that were indexed before, e.g. the unchanged parts of an amended bill, reuse
+    their stored chunks and embeddings instead of being split and embedded again.
+    Chunks are labelled with their parent passage (utils.chunking.assign_parents),
+    so chains can retrieve coarser passages from the same index.
+
+    Args:
+        documents (iterable): Document objects, either a list or a page stream
+        splitter: Text splitter used to chunk each page
+        embeddings: LangChain embeddings object
+        batch_size (int, optional): Most chunks per embedding request
+        reuse_versions (bool, optional): Reuse and record chunks per page or section
+            content hash, and append this ingestion to the document's version record
+        version_info (dict, optional): Receives the version entry (version number,
+            reused_units, new_units, ...) once the index is built
+        batch_tokens (int, optional): Token budget per embedding request (default from EMBED_BATCH_TOKENS)
+        max_in_flight (int, optional): Concurrent embedding requests (default from EMBED_MAX_IN_FLIGHT)
+
+    Returns:
+        tuple: (FAISS vectorstore, list of chunks). The vectorstore is None when
+            the documents contained no readable text.
+    """
+    versions = DocumentVersions(splitter, embeddings) if reuse_versions else None
+    batch_tokens = batch_tokens or get_batch_tokens()
+    chunks = []
+    pending = []
+    pending_tokens = 0
+    batches = []
+    new_units = []  # (unit, first chunk index, chunk count) of units embedded in this run
+
+    with EmbeddingDispatcher(embeddings, max_in_flight) as dispatcher:
+        def submit(batch):
+            texts = [chunk.page_content for chunk in batch]
+            batches.append((batch, dispatcher.submit(texts)))
+
+        for page in documents:
+            if not page.page_content.strip():
+                continue
+            stored = versions.lookup(page) if versions else None
+            if stored is not None:
+                texts, vectors = stored
+                # Stored chunks take the metadata of the new version (page numbers may have moved)
+                page_chunks = [Document(page_content=text, metadata=dict(page.metadata)) for text in texts]
+                assign_parents(page, page_chunks)
+                done = Future()
+                done.set_result(vectors)
+                batches.append((page_chunks, done))
+                chunks.extend(page_chunks)
+                continue
+            page_chunks = splitter.split_documents([page])
+            assign_parents(page, page_chunks)
+            new_units.append((page, len(chunks), len(page_chunks)))
+            chunks.extend(page_chunks)
+            for chunk in page_chunks:
+                tokens = count_tokens(chunk.page_content)
+                if pending and (pending_tokens + tokens > batch_tokens or len(pending) >= batch_size):
+                    submit(pending)
+                    pending, pending_tokens = [], 0
+                pending.append(chunk)
+                pending_tokens += tokens
+
+        if pending:
+            submit(pending)
+
+        vectorstore = None
+        vectors_by_chunk = {}
+        for batch, future in batches:
+            vectors = future.result()
+            text_embeddings = list(zip([chunk.page_content for chunk in batch], vectors))
+            metadatas = [chunk.metadata for chunk in batch]
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas)
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+            if versions:
+                vectors_by_chunk.update(zip(map(id, batch), vectors))
+
+    if versions:
+        for unit, start, count in new_units:
+            unit_chunks = chunks[start:start + count]
+            versions.store(unit, [chunk.page_content for chunk in unit_chunks], [vectors_by_chunk[id(chunk)] for chunk in unit_chunks])
+        entry = versions.commit()
+        if version_info is not None and entry is not None:
+            version_info.update(entry)
+
+    return vectorstore, chunks
+
+
+def load_or_build_vectorstore(document_hash, documents, splitter, embeddings, **build_kwargs):
+    """Open the stored index of a document, or build it and store it for next time
+
+    A stored index is memory-mapped from the index store without reading, parsing
+    or embedding anything, so the page stream is left unconsumed.
+
+    Args:
+        document_hash (str): Content hash of the source document (e.g. from document_key)
+        documents (iterable): Document objects, only read when the index is not stored
+        splitter: Text splitter used to chunk each page
+        embeddings: LangChain embeddings object
+        **build_kwargs: Extra arguments for build_vectorstore
+
+    Returns:
+        tuple: (FAISS vectorstore, list of chunks), as from build_vectorstore.
+    """
+    key = index_key(document_hash, splitter, embeddings)
+    vectorstore = load_index(key, embeddings)
+    if vectorstore is not None:
+        print(f"Opened stored index {key[:12]} ({vectorstore.index.ntotal} chunks)")
+        chunks = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(vectorstore.index.ntotal)]
+        return vectorstore, chunks
+
+    vectorstore, chunks = build_vectorstore(documents, splitter, embeddings, **build_kwargs)
+    if vectorstore is not None:
+        save_index(key, vectorstore)
+    return vectorstore, chunks
@@ -1,11 +1,15 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain.chains import ConversationalRetrievalChain
-from langchain_community.vectorstores import FAISS
+from chains.indexing import build_vectorstore, load_or_build_vectorstore
+from utils.chunking import PageLookupRetriever, get_splitter
+from utils.corpus_search import add_to_corpus
+from utils.embedding_providers import get_embeddings
+from utils.reranker import RerankRetriever
+from utils.retrieval_cache import CachedRetriever
 from langchain.memory import ChatMessageHistory
 from langchain.memory import ConversationBufferMemory
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.prompts import PromptTemplate
 
 # Load environment variables
@@ -13,12 +17,21 @@ load_dotenv()
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
-def build_chat_chain(documents, openai_api_key=OPENAI_API_KEY, reading_level="High School (Ages 14-17)"):
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-    chunks = splitter.split_documents(documents)
-
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-    vectorstore = FAISS.from_documents(chunks, embeddings)
+def build_chat_chain(documents, openai_api_key=OPENAI_API_KEY, reading_level="High School (Ages 14-17)", document_hash=None, embedding_provider=None, page_index=None):
+    splitter = get_splitter()
+    embeddings = get_embeddings(embedding_provider, openai_api_key)
+    if document_hash:
+        # A document chatted about before reopens its stored index instead of being re-indexed
+        vectorstore, chunks = load_or_build_vectorstore(document_hash, documents, splitter, embeddings)
+    else:
+        vectorstore, chunks = build_vectorstore(documents, splitter, embeddings)
+    if vectorstore is None:
+        raise ValueError("No readable content could be extracted from the document")
+    # Searchable later from the Home page alongside every other document
+    try:
+        add_to_corpus(vectorstore, embeddings, document_key=document_hash)
+    except Exception as e:
+        print(f"Could not add the document to the corpus: {e}")
 
     memory_key = "chat_history"
     memory = ConversationBufferMemory(memory_key=memory_key, return_messages=True)
@@ -57,10 +70,15 @@ def build_chat_chain(documents, openai_api_key=OPENAI_API_KEY, reading_level="Hi
         template=qa_prompt_template
     )
     
+    retriever = CachedRetriever.wrap(RerankRetriever.from_vectorstore(vectorstore), vectorstore)
+    if page_index is not None:
+        # Questions about a page or section number get those pages in full
+        retriever = PageLookupRetriever(retriever=retriever, page_index=page_index)
+
     # Create the conversational chain with our custom prompt
     chain = ConversationalRetrievalChain.from_llm(
         llm=llm,
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 5}),
+        retriever=retriever,
         memory=memory,
         combine_docs_chain_kwargs={"prompt": qa_prompt}
     )
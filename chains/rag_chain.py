@@ -1,9 +1,13 @@
 import os
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from langchain_openai import ChatOpenAI
 from langchain.chains import RetrievalQA
-from langchain_community.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from chains.indexing import build_vectorstore
+from utils.chunking import PageLookupRetriever, get_splitter
+from utils.corpus_search import CorpusRetriever, add_to_corpus, embeddings_for_corpus
+from utils.embedding_providers import get_embeddings
+from utils.reranker import RerankRetriever
+from utils.retrieval_cache import CachedRetriever
 from langchain.prompts import PromptTemplate
 
 # Load environment variables
@@ -21,19 +25,25 @@ if ANTHROPIC_API_KEY:
         print("Claude setup failed:", e)
 
 
-def build_qa_chain(documents, openai_api_key=OPENAI_API_KEY, eli5=False):
+def build_qa_chain(documents, openai_api_key=OPENAI_API_KEY, eli5=False, embedding_provider=None, page_index=None, document_hash=None):
+    # Documents may be a list or a page stream from iter_document_pages;
+    # chunks are embedded while the rest of the stream is still parsing
+    splitter = get_splitter()
+    # Cached across chains and sessions, so a known document is never embedded twice
+    embeddings = get_embeddings(embedding_provider, openai_api_key)
+    vectorstore, chunks = build_vectorstore(documents, splitter, embeddings)
+    # Searchable later from the Home page alongside every other document
+    try:
+        add_to_corpus(vectorstore, embeddings, document_key=document_hash)
+    except Exception as e:
+        print(f"Could not add the document to the corpus: {e}")
+
     # Check if we have any content in the documents
-    if not documents or all(not doc.page_content.strip() for doc in documents):
+    if vectorstore is None:
         # Return a function that explains there's no content
         def no_content_answer(query):
             return "I couldn't extract any readable content from the document you provided. Please try uploading a different PDF or pasting the text directly."
         return no_content_answer
-        
-    splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-    chunks = splitter.split_documents(documents)
-
-    embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
-    vectorstore = FAISS.from_documents(chunks, embeddings)
 
     llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.3, openai_api_key=openai_api_key)
     
@@ -56,10 +66,18 @@ def build_qa_chain(documents, openai_api_key=OPENAI_API_KEY, eli5=False):
         input_variables=["context", "query"]
     )
     
+    # Exact legal terms and citations are matched lexically as well as by embedding, and
+    # only the few candidates that clear the reranker reach the prompt; a repeated question
+    # reuses its earlier results
+    retriever = CachedRetriever.wrap(RerankRetriever.from_vectorstore(vectorstore), vectorstore)
+    if page_index is not None:
+        # Questions about a page or section number get those pages in full
+        retriever = PageLookupRetriever(retriever=retriever, page_index=page_index)
+
     # Use chain_type="stuff" to make sure all retrieved documents are passed to the LLM
     qa_chain = RetrievalQA.from_chain_type(
         llm=llm, 
-        retriever=vectorstore.as_retriever(search_kwargs={"k": 5}),
+        retriever=retriever,
         chain_type="stuff",  # Use "stuff" to include all documents in the prompt
         return_source_documents=True,  # Include source documents in response
         chain_type_kwargs={"prompt": prompt}  # Use our custom prompt
@@ -95,4 +113,58 @@ def build_qa_chain(documents, openai_api_key=OPENAI_API_KEY, eli5=False):
             return f"I encountered an error processing your request, but here's the document content:\n\n{doc_content[:1500]}"
 
     # Return the wrapper function
-    return get_answer
\ No newline at end of file
+    return get_answer
+
+
+def build_corpus_qa_chain(openai_api_key=OPENAI_API_KEY, filters=None, corpus_dir=None, k=5):
+    """
+    Answer questions across every document in the corpus instead of one upload.
+
+    Args:
+        openai_api_key (str, optional): OpenAI API key for the LLM (and corpus embeddings).
+        filters (dict, optional): Document filters for utils.corpus_search.search_corpus.
+        corpus_dir (str, optional): Corpus directory (default from POLICY_CORPUS_DIR).
+        k (int, optional): Chunks passed to the LLM.
+
+    Returns:
+        callable: Takes a question and returns (answer, source chunk Documents).
+    """
+    embeddings = embeddings_for_corpus(corpus_dir, openai_api_key)
+    if embeddings is None:
+        def no_corpus_answer(query):
+            return "No documents have been added to the corpus yet.", []
+        return no_corpus_answer
+
+    llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.3, openai_api_key=openai_api_key)
+    prompt = PromptTemplate(
+        template="""You are an expert policy analyst answering a question across several policy documents.
+
+    Excerpts, each labelled with its document:
+    {context}
+
+    Question: {query}
+
+    Name the documents your answer relies on. If the excerpts don't answer the question, say so.
+    """,
+        input_variables=["context", "query"]
+    )
+    qa_chain = RetrievalQA.from_chain_type(
+        llm=llm,
+        retriever=CorpusRetriever(embeddings=embeddings, k=k, filters=filters, corpus_dir=corpus_dir),
+        chain_type="stuff",
+        return_source_documents=True,
+        chain_type_kwargs={
+            "prompt": prompt,
+            "document_prompt": PromptTemplate(template="[{document_name}]\n{page_content}",
+                                              input_variables=["document_name", "page_content"]),
+        }
+    )
+
+    def get_answer(query):
+        try:
+            response = qa_chain.invoke({"query": query})
+            return response.get("result", ""), response.get("source_documents", [])
+        except Exception as e:
+            return f"I encountered an error searching the stored documents: {e}", []
+
+    return get_answer
@@ -669,6 +669,41 @@ def info_box(message):
     """Display an info message box"""
     st.markdown(f"<div class='info-box'>{message}</div>", unsafe_allow_html=True)
 
+def _failed_ingestion(job):
+    error_box(job.message)
+    if st.button("Retry", key=f"retry_ingestion_{job.job_id}"):
+        from utils.ingestion_worker import discard_job
+        discard_job(job.job_id)
+        st.rerun()
+
+def ingestion_progress(job, poll_seconds=1.0):
+    """Show the progress of a background ingestion job, refreshing until it finishes.
+
+    Only this progress block reruns while the job is working, so the rest of the
+    page stays usable; the whole page reruns once when the job is ready. A
+    failed job shows its error and a Retry button instead of rerunning.
+
+    Args:
+        job: IngestionJob from utils.ingestion_worker.submit_ingestion
+        poll_seconds (float, optional): How often to refresh the progress bar
+    """
+    if job.status == "failed":
+        _failed_ingestion(job)
+        return
+    if job.ready:
+        return
+
+    @st.fragment(run_every=poll_seconds)
+    def _job_progress():
+        if job.ready:
+            st.rerun()
+        if job.status == "failed":
+            _failed_ingestion(job)
+            return
+        st.progress(job.progress, text=job.message)
+
+    _job_progress()
+
 def ai_response(content):
     """Format AI response with consistent styling"""
     return f"""
@@ -1,11 +1,10 @@
 import streamlit as st
 from chains.rag_chain import build_qa_chain
-from utils.document_parser import load_and_split_document
+from utils.ingestion_worker import submit_ingestion, document_key, PREVIEW_SECTIONS
 from utils.session_tracker import track_activity, store_policy_content
-import tempfile
 import os
 from dotenv import load_dotenv
-from components.ui_helpers import setup_page_config, card, success_box, error_box, info_box, ai_response, sidebar_navigation
+from components.ui_helpers import setup_page_config, card, success_box, error_box, info_box, ai_response, sidebar_navigation, ingestion_progress
 from datetime import datetime
 
 # Load .env file
@@ -64,7 +63,7 @@ card_content = """
 """
 card(card_content)
 
-uploaded_file = st.file_uploader("Upload a PDF document", type="pdf")
+uploaded_file = st.file_uploader("Upload a PDF or USLM / Federal Register XML document", type=["pdf", "xml"])
 manual_text = st.text_area("Or paste policy content below:", height=150)
 
 # Question input with improved styling
@@ -75,8 +74,34 @@ query = st.text_input("What would you like to know about this policy?",
 col1, col2 = st.columns([3, 1])
 with col1:
     eli5_mode = st.toggle("Explain Like I'm 5", help="Simplifies explanations for easier understanding")
+
+# Get API key from session state if available
+if st.session_state.get("openai_key"):
+    openai_api_key = st.session_state.get("openai_key")
+
+# Parse and index the document in the background as soon as it is provided,
+# so the page stays responsive and reruns pick up the same job
+ingest_job = None
+if (uploaded_file or manual_text) and openai_api_key:
+    pasted_text = None if uploaded_file else manual_text
+    embedding_provider = st.session_state.get("embedding_provider")
+    # Jobs are shared by every session; the chain holds this API key, so it is part of
+    # the key (document_key only keeps a hash of it)
+    ingest_job = submit_ingestion(
+        document_key(uploaded_file, pasted_text, "decoder", eli5_mode, embedding_provider, openai_api_key),
+        lambda pages, page_index, api_key=openai_api_key, eli5=eli5_mode, provider=embedding_provider,
+               doc_hash=document_key(uploaded_file, pasted_text): build_qa_chain(
+            pages, api_key, eli5=eli5, embedding_provider=provider, page_index=page_index, document_hash=doc_hash),
+        source=uploaded_file,
+        raw_text=pasted_text,
+        label=uploaded_file.name if uploaded_file else "pasted text",
+        by_section=True
+    )
+    st.session_state.decoder_ingest_job = ingest_job.job_id
+    ingestion_progress(ingest_job)
+
 with col2:
-    analyze_btn = st.button("Analyze", type="primary", disabled=not ((uploaded_file or manual_text) and query))
+    analyze_btn = st.button("Analyze", type="primary", disabled=not ((uploaded_file or manual_text) and query and (ingest_job is None or ingest_job.ready)))
 
 # Analysis section
 if analyze_btn:
@@ -89,29 +114,24 @@ if analyze_btn:
     else:
         with st.spinner("Analyzing policy document..."):
             try:
-                # Load document content
+                # The background job has already parsed and indexed the document
+                chain = ingest_job.result
+                # PDF pages are read on demand, so only the ones shown are extracted again
+                documents = ingest_job.preview(PREVIEW_SECTIONS)
+
                 if uploaded_file:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        tmp_file.write(uploaded_file.read())
-                        tmp_file_path = tmp_file.name
-                    documents = load_and_split_document(tmp_file_path)
-                    os.remove(tmp_file_path)
+                    normalize_stats = ingest_job.normalize_stats
+                    if normalize_stats.get("tokens_saved"):
+                        st.caption(f"Removed repeated headers and formatting noise: {normalize_stats['tokens_saved']:,} of {normalize_stats['tokens_before']:,} tokens saved before embedding.")
                     
                     # Show extracted content in an expander
                     with st.expander("View Extracted Content", expanded=False):
                         st.markdown("### Document Content:")
                         for i, doc in enumerate(documents):
-                            st.markdown(f"**Page {i+1}:**")
+                            st.markdown(f"**{doc.metadata.get('heading') or f'Section {i+1}'}:**")
                             st.markdown(f"```{doc.page_content[:300]}... (truncated)```")
-                else:
-                    documents = load_and_split_document(None, manual_text)
-
-                # Get API key from session state if available
-                if st.session_state.get("openai_key"):
-                    openai_api_key = st.session_state.get("openai_key")
 
-                # Build chain and query
-                chain = build_qa_chain(documents, openai_api_key, eli5=eli5_mode)
+                # Query the chain
                 answer = chain(query)
                 
                 # Save to history
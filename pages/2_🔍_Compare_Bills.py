@@ -5,11 +5,11 @@ from langchain.prompts import PromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from utils.document_parser import load_and_split_document
+from utils.spill_store import ingest_bounded, leading_text
 from utils.session_tracker import track_activity, store_policy_content
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains import create_retrieval_chain
 from langchain_core.documents import Document
-import tempfile
 from datetime import datetime
 from components.ui_helpers import setup_page_config, card, success_box, error_box, info_box, ai_response, sidebar_navigation, apply_custom_css
 
@@ -62,17 +62,18 @@ def compare_policies(docs1, docs2, openai_api_key=OPENAI_API_KEY):
         
     llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=0.3, openai_api_key=openai_api_key)
 
-    content1 = "\n".join([d.page_content for d in docs1])
-    content2 = "\n".join([d.page_content for d in docs2])
-    
     # Check for large documents and limit size if necessary
     MAX_CHARS = 10000  # Limiting each document to about 10K characters to avoid token limits
     
-    if len(content1) > MAX_CHARS:
-        content1 = content1[:MAX_CHARS] + f"\n\n[Note: Document 1 was truncated from {len(content1)} characters to {MAX_CHARS} characters due to size limits.]"
+    # Only the pages within the limit are read; the rest are just measured
+    content1, length1 = leading_text(docs1, MAX_CHARS)
+    content2, length2 = leading_text(docs2, MAX_CHARS)
+    
+    if length1 > MAX_CHARS:
+        content1 += f"\n\n[Note: Document 1 was truncated from {length1} characters to {MAX_CHARS} characters due to size limits.]"
     
-    if len(content2) > MAX_CHARS:
-        content2 = content2[:MAX_CHARS] + f"\n\n[Note: Document 2 was truncated from {len(content2)} characters to {MAX_CHARS} characters due to size limits.]"
+    if length2 > MAX_CHARS:
+        content2 += f"\n\n[Note: Document 2 was truncated from {length2} characters to {MAX_CHARS} characters due to size limits.]"
     
     # Create a single document with both bills
     combined_content = f"BILL 1:\n{content1}\n\nBILL 2:\n{content2}"
@@ -142,12 +143,12 @@ col1, col2 = st.columns(2)
 
 with col1:
     card(card_content1)
-    uploaded_file1 = st.file_uploader("Upload first policy document (PDF)", type="pdf", key="file1")
+    uploaded_file1 = st.file_uploader("Upload first policy document (PDF or XML)", type=["pdf", "xml"], key="file1")
     manual_text1 = st.text_area("Or paste first policy text:", height=200, key="text1")
 
 with col2:
     card(card_content2)
-    uploaded_file2 = st.file_uploader("Upload second policy document (PDF)", type="pdf", key="file2")
+    uploaded_file2 = st.file_uploader("Upload second policy document (PDF or XML)", type=["pdf", "xml"], key="file2")
     manual_text2 = st.text_area("Or paste second policy text:", height=200, key="text2")
 
 compare_btn = st.button("Compare Documents", type="primary")
@@ -161,24 +162,20 @@ if compare_btn:
         error_box("Please provide content for both documents to compare.")
     else:
         with st.spinner("Analyzing and comparing documents..."):
+            spill_stores = []
             try:
+                # Large bills are spilled to disk so the whole text never sits in memory
                 # Process document 1
                 if uploaded_file1:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                        tmp.write(uploaded_file1.read())
-                        tmp_path = tmp.name
-                    docs1 = load_and_split_document(tmp_path)
-                    os.remove(tmp_path)
+                    spill_stores.append(ingest_bounded(uploaded_file1))
+                    docs1 = spill_stores[-1].views()
                 else:
                     docs1 = load_and_split_document(None, manual_text1)
                     
                 # Process document 2
                 if uploaded_file2:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                        tmp.write(uploaded_file2.read())
-                        tmp_path = tmp.name
-                    docs2 = load_and_split_document(tmp_path)
-                    os.remove(tmp_path)
+                    spill_stores.append(ingest_bounded(uploaded_file2))
+                    docs2 = spill_stores[-1].views()
                 else:
                     docs2 = load_and_split_document(None, manual_text2)
                 
@@ -239,6 +236,9 @@ if compare_btn:
                 
             except Exception as e:
                 error_box(f"An error occurred during comparison: {str(e)}")
+            finally:
+                for spill_store in spill_stores:
+                    spill_store.close()
 else:
     info_box("Upload or paste two policy documents to compare them side by side.")
 
@@ -1,11 +1,11 @@
 import streamlit as st
 from chains.memory_chain import build_chat_chain
-from utils.document_parser import load_and_split_document
+from utils.ingestion_worker import submit_ingestion, document_key
 from utils.session_tracker import track_activity
-import tempfile
 import os
+import uuid
 from datetime import datetime
-from components.ui_helpers import setup_page_config, sidebar_navigation, card, info_box, success_box
+from components.ui_helpers import setup_page_config, sidebar_navigation, card, info_box, success_box, ingestion_progress
 
 # Setup page with consistent styling
 setup_page_config("Chat Memory")
@@ -24,7 +24,7 @@ card_content = """
 """
 card(card_content)
 
-uploaded_file = st.file_uploader("Upload a policy document (PDF)", type="pdf")
+uploaded_file = st.file_uploader("Upload a policy document (PDF or XML)", type=["pdf", "xml"])
 manual_text = st.text_area("Or paste policy content below:", height=200)
 
 # Add reading level selector
@@ -40,20 +40,30 @@ if 'chat_history' not in st.session_state:
     st.session_state.chat_history = []
 
 if uploaded_file or manual_text:
-    with st.spinner("Setting up chat session..."):
-        if uploaded_file:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                tmp.write(uploaded_file.read())
-                tmp_path = tmp.name
-            docs = load_and_split_document(tmp_path)
-            os.remove(tmp_path)
-        else:
-            docs = load_and_split_document(None, manual_text)
+    # Get OpenAI API key from session state if available
+    openai_api_key = st.session_state.get("openai_key", os.getenv("OPENAI_API_KEY"))
 
-        # Get OpenAI API key from session state if available
-        openai_api_key = st.session_state.get("openai_key", os.getenv("OPENAI_API_KEY"))
-        
-        chain = build_chat_chain(docs, openai_api_key, reading_level=reading_level)
+    # Build the chat chain once in the background; reruns for each message reuse it.
+    # The chain holds this user's conversation memory, so the job is per session.
+    if "chat_session_id" not in st.session_state:
+        st.session_state.chat_session_id = uuid.uuid4().hex
+    pasted_text = None if uploaded_file else manual_text
+    # The index itself is shared by every session and kept on disk for later visits
+    content_hash = document_key(uploaded_file, pasted_text)
+    embedding_provider = st.session_state.get("embedding_provider")
+    ingest_job = submit_ingestion(
+        document_key(uploaded_file, pasted_text, "chat", reading_level, st.session_state.chat_session_id, embedding_provider),
+        lambda pages, page_index, api_key=openai_api_key, level=reading_level, doc_hash=content_hash, provider=embedding_provider: build_chat_chain(
+            pages, api_key, reading_level=level, document_hash=doc_hash, embedding_provider=provider, page_index=page_index),
+        source=uploaded_file,
+        raw_text=pasted_text,
+        label=uploaded_file.name if uploaded_file else "pasted text"
+    )
+    st.session_state.chat_ingest_job = ingest_job.job_id
+    ingestion_progress(ingest_job)
+
+    if ingest_job.ready:
+        chain = ingest_job.result
 
         user_input = st.chat_input("Ask something about the policy...")
         if user_input:
@@ -1,9 +1,9 @@
 import streamlit as st
 from utils.document_parser import load_and_split_document
 from utils.civic_data import simulate_impact_by_zip
+from utils.spill_store import ingest_bounded
 from utils.session_tracker import track_activity, store_policy_content
 from components.charts import display_impact_chart
-import tempfile
 import os
 from dotenv import load_dotenv
 from components.ui_helpers import setup_page_config, card, success_box, error_box, info_box, sidebar_navigation
@@ -58,7 +58,7 @@ card_content = """
 """
 card(card_content)
 
-uploaded_file = st.file_uploader("Upload a bill to simulate its local impact (PDF)", type="pdf")
+uploaded_file = st.file_uploader("Upload a bill to simulate its local impact (PDF or XML)", type=["pdf", "xml"])
 manual_text = st.text_area("Or paste bill content below:", height=200)
 simulate_btn = st.button("Simulate Impact", type="primary", disabled=not (user_zip and (uploaded_file or manual_text)))
 
@@ -93,13 +93,12 @@ if simulate_btn:
         error_box(f"Missing required inputs: {', '.join(missing_inputs)}")
     else:
         with st.spinner("Simulating potential impacts for your area..."):
+            spill_store = None
             if uploaded_file:
                 try:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                        tmp.write(uploaded_file.read())
-                        tmp_path = tmp.name
-                    documents = load_and_split_document(tmp_path)
-                    os.remove(tmp_path)
+                    # Large bills are spilled to disk so the whole text never sits in memory
+                    spill_store = ingest_bounded(uploaded_file)
+                    documents = spill_store.iter_documents() if len(spill_store) else []
                 except Exception as e:
                     error_box(f"Error processing PDF: {e}")
                     documents = []
@@ -224,6 +223,9 @@ if simulate_btn:
                             
                 except Exception as e:
                     error_box(f"An error occurred during simulation: {str(e)}")
+
+            if spill_store is not None:
+                spill_store.close()
 else:
     info_box("Enter your ZIP code and personal information, then upload a bill to simulate its impact on you.")
 
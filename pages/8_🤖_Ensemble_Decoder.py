@@ -1,11 +1,10 @@
 import streamlit as st
-from chains.ensemble_chain import build_ensemble_qa_chain
-from utils.document_parser import load_and_split_document
+from chains.ensemble_chain import build_ensemble_qa_chain, FOLLOW_UP_QUESTIONS
+from utils.ingestion_worker import submit_ingestion, document_key, PREVIEW_SECTIONS
 from utils.session_tracker import track_activity, store_policy_content
-import tempfile
 import os
 from dotenv import load_dotenv
-from components.ui_helpers import setup_page_config, card, success_box, error_box, info_box, ai_response, sidebar_navigation
+from components.ui_helpers import setup_page_config, card, success_box, error_box, info_box, ai_response, sidebar_navigation, ingestion_progress
 from datetime import datetime
 
 # Load .env file
@@ -81,7 +80,7 @@ card_content = """
 """
 card(card_content)
 
-uploaded_file = st.file_uploader("Upload a PDF document", type="pdf")
+uploaded_file = st.file_uploader("Upload a PDF or USLM / Federal Register XML document", type=["pdf", "xml"])
 manual_text = st.text_area("Or paste policy content below:", height=150)
 
 # Question input with improved styling
@@ -110,32 +109,8 @@ if documents := st.session_state.get('last_analyzed_documents'):
         st.markdown("**Based on your document:**")
         follow_up_cols = st.columns(2)
         
-        # Define follow-up questions based on analysis mode
-        follow_up_questions = {
-            "General Overview": [
-                "What are the key objectives?",
-                "Who are the main stakeholders?",
-                "What is the timeline for implementation?"
-            ],
-            "Implementation Details": [
-                "What are the specific steps for implementation?",
-                "What resources are required?",
-                "What are the key milestones?"
-            ],
-            "Impact Analysis": [
-                "What are the expected outcomes?",
-                "Are there any potential challenges?",
-                "How will success be measured?"
-            ],
-            "Compliance Check": [
-                "What are the compliance requirements?",
-                "Are there any reporting obligations?",
-                "What are the penalties for non-compliance?"
-            ]
-        }
-        
         # Display relevant follow-up questions
-        questions = follow_up_questions.get(analysis_mode, follow_up_questions["General Overview"])
+        questions = FOLLOW_UP_QUESTIONS.get(analysis_mode, FOLLOW_UP_QUESTIONS["General Overview"])
         for i, q in enumerate(questions):
             col = follow_up_cols[i % 2]
             if col.button(q, key=f"follow_up_{i}"):
@@ -162,10 +137,38 @@ with col2:
         disabled=not claude_key_available
     )
 
+# Parse and index the document in the background as soon as it is provided,
+# so the page stays responsive and reruns pick up the same job
+ingest_job = None
+if uploaded_file or manual_text:
+    pasted_text = None if uploaded_file else manual_text
+    ensemble_settings = {
+        "openai_api_key": st.session_state.get("openai_key", openai_api_key),
+        "anthropic_api_key": st.session_state.get("anthropic_key", anthropic_api_key),
+        "high_school_level": high_school_mode,
+        "ensemble_with": ensemble_method.lower(),
+        "embedding_provider": st.session_state.get("embedding_provider")
+    }
+    # Jobs are shared by every session; the chain holds these API keys, so they are part of
+    # the key (document_key only keeps a hash of them)
+    ingest_job = submit_ingestion(
+        document_key(uploaded_file, pasted_text, "ensemble", high_school_mode, ensemble_method, claude_key_available,
+                     ensemble_settings["embedding_provider"], ensemble_settings["openai_api_key"],
+                     ensemble_settings["anthropic_api_key"]),
+        lambda pages, page_index, settings=ensemble_settings, doc_hash=document_key(uploaded_file, pasted_text): build_ensemble_qa_chain(
+            pages, page_index=page_index, document_hash=doc_hash, **settings),
+        source=uploaded_file,
+        raw_text=pasted_text,
+        label=uploaded_file.name if uploaded_file else "pasted text",
+        by_section=True
+    )
+    st.session_state.ensemble_ingest_job = ingest_job.job_id
+    ingestion_progress(ingest_job)
+
 # Analyze button
 analyze_btn = st.button("Analyze with Ensemble", 
                        type="primary", 
-                       disabled=not ((uploaded_file or manual_text) and query))
+                       disabled=not ((uploaded_file or manual_text) and query and ingest_job and ingest_job.ready))
 
 # Only show results when the button is clicked
 if analyze_btn:
@@ -176,31 +179,18 @@ if analyze_btn:
     else:
         with st.spinner("Analyzing policy document with multiple models..."):
             try:
-                # Load document content
+                # The background job has already parsed the document and built the ensemble chain
+                ensemble_chain = ingest_job.result
+                # PDF pages are read on demand, so only the ones shown are extracted again
+                documents = ingest_job.preview(PREVIEW_SECTIONS)
+
                 if uploaded_file:
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-                        tmp_file.write(uploaded_file.read())
-                        tmp_file_path = tmp_file.name
-                    documents = load_and_split_document(tmp_file_path)
-                    os.remove(tmp_file_path)
-                    
                     # Show extracted content in an expander
                     with st.expander("View Extracted Content", expanded=False):
                         st.markdown("### Document Content:")
                         for i, doc in enumerate(documents):
-                            st.markdown(f"**Page {i+1}:**")
+                            st.markdown(f"**{doc.metadata.get('heading') or f'Section {i+1}'}:**")
                             st.markdown(f"```{doc.page_content[:300]}... (truncated)```")
-                else:
-                    documents = load_and_split_document(None, manual_text)
-
-                # Build ensemble chain and query
-                ensemble_chain = build_ensemble_qa_chain(
-                    documents, 
-                    openai_api_key=st.session_state.get("openai_key", openai_api_key),
-                    anthropic_api_key=st.session_state.get("anthropic_key", anthropic_api_key),
-                    high_school_level=high_school_mode,
-                    ensemble_with=ensemble_method.lower()
-                )
                 
                 # Get ensemble response
                 ensemble_result = ensemble_chain(query)
@@ -2,6 +2,7 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 from utils.session_tracker import track_activity
+from utils.embedding_providers import EMBEDDING_PROVIDERS, get_default_provider, local_model_available
 from components.ui_helpers import setup_page_config, sidebar_navigation, card, success_box
 
 # Load environment variables
@@ -126,6 +127,40 @@ st.info("Keys configured in the .env file will be used as fallbacks if no key is
 
 st.markdown("<hr class='section-divider'>", unsafe_allow_html=True)
 
+# Embedding backend
+card_content = """
+<div>
+    <h3>🧮 Document Embeddings</h3>
+    <p>Choose how documents are embedded for search. Local backends work offline and make no API calls.</p>
+</div>
+"""
+card(card_content)
+
+if "embedding_provider" not in st.session_state:
+    st.session_state.embedding_provider = get_default_provider()
+
+provider_names = list(EMBEDDING_PROVIDERS)
+embedding_provider = st.radio(
+    "Embedding backend:",
+    provider_names,
+    index=provider_names.index(st.session_state.embedding_provider),
+    format_func=lambda name: EMBEDDING_PROVIDERS[name]
+)
+if embedding_provider != st.session_state.embedding_provider:
+    st.session_state.embedding_provider = embedding_provider
+    track_activity(
+        action="changed the embedding backend",
+        page_name="Settings",
+        details={"embedding_provider": EMBEDDING_PROVIDERS[embedding_provider]}
+    )
+    success_box(f"Documents will be embedded with: {EMBEDDING_PROVIDERS[embedding_provider]}")
+
+if embedding_provider == "local" and not local_model_available():
+    st.warning("sentence-transformers is not installed (pip install -r requirements-local.txt), so the offline hashing backend will be used instead.")
+st.caption("Documents already open are re-indexed with the new backend the next time they are analyzed. Answers still need an OpenAI or Anthropic key.")
+
+st.markdown("<hr class='section-divider'>", unsafe_allow_html=True)
+
 # Theme Preferences
 card_content = """
 <div>
@@ -0,0 +1,22 @@
+import os
+
+from utils.bulk_ingest import ingest_directory
+from utils.corpus import read_manifest
+
+
+def test_unreadable_document_is_failed_not_indexed(tmp_path, monkeypatch):
+    monkeypatch.setenv("DOCUMENT_VERSIONS_DIR", str(tmp_path / "versions"))
+    input_dir = tmp_path / "bills"
+    input_dir.mkdir()
+    (input_dir / "broken.pdf").write_bytes(b"not a pdf at all")
+    (input_dir / "act.txt").write_text("SEC. 1. SHORT TITLE.\nThis Act may be cited as the Test Act.\n")
+    corpus_dir = str(tmp_path / "corpus")
+
+    result = ingest_directory(str(input_dir), corpus_dir, 1, None, provider="hashing")
+
+    assert result["ingested"] == 1
+    assert result["failed"] == 1
+    paths = [entry["path"] for entry in read_manifest(corpus_dir)["documents"].values()]
+    assert paths == [str(input_dir / "act.txt")]
+    shards = {name.split(".")[0] for name in os.listdir(os.path.join(corpus_dir, "shards"))}
+    assert shards == set(read_manifest(corpus_dir)["documents"])
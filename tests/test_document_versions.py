@@ -0,0 +1,57 @@
+import pytest
+from langchain.schema import Document
+
+import utils.document_versions as document_versions
+from utils.document_versions import DocumentVersions, get_document_record
+
+
+class Splitter:
+    _chunk_size = 100
+    _chunk_overlap = 0
+
+
+class Embeddings:
+    model = "test"
+
+
+@pytest.fixture(autouse=True)
+def store_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("DOCUMENT_VERSIONS_DIR", str(tmp_path))
+
+
+def ingest(source, texts):
+    versions = DocumentVersions(Splitter(), Embeddings())
+    for text in texts:
+        unit = Document(page_content=text, metadata={"source": source})
+        if versions.lookup(unit) is None:
+            versions.store(unit, [text], [[0.0, 1.0]])
+    return versions.commit()
+
+
+def test_amendment_joins_the_record_without_listing_records(monkeypatch):
+    first = ingest("hr1.pdf", ["sec 1", "sec 2", "sec 3", "sec 4"])
+    ingest("other.pdf", ["unrelated"])
+
+    def list_everything():
+        raise AssertionError("matching should read the records index, not every record")
+    monkeypatch.setattr(document_versions, "list_document_records", list_everything)
+
+    amended = ingest("hr1 amended.pdf", ["sec 1", "sec 2", "sec 3", "sec 4 amended"])
+    assert amended["doc_id"] == first["doc_id"]
+    assert amended["version"] == 2
+    # Under the record's title, sharing one unit of the latest version is enough
+    renamed = ingest("hr1.pdf", ["sec 4 amended", "new 1", "new 2"])
+    assert renamed["doc_id"] == first["doc_id"]
+    assert len(get_document_record(first["doc_id"])["versions"]) == 3
+
+
+def test_same_title_without_shared_units_is_a_new_record():
+    first = ingest("bill.pdf", ["one bill"])
+    second = ingest("bill.pdf", ["another bill"])
+    assert first["doc_id"] != second["doc_id"]
+
+
+def test_index_is_rebuilt_from_records():
+    first = ingest("hr1.pdf", ["sec 1", "sec 2"])
+    document_versions.os.remove(document_versions._records_index_path())
+    assert ingest("hr1.pdf", ["sec 1", "sec 2 amended"])["doc_id"] == first["doc_id"]
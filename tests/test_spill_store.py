@@ -0,0 +1,62 @@
+import os
+import threading
+
+from langchain.schema import Document
+
+from benchmarks.synthetic_pdf import write_synthetic_pdf
+from utils.spill_store import SpillStore, current_rss_bytes, ingest_bounded, leading_text
+
+MB = 1024 * 1024
+
+
+def test_lengths_are_in_characters():
+    pages = ["§ 54.9802–4 “HRA”", "ascii page", "café"]
+    with SpillStore() as store:
+        for page in pages:
+            store.append(page)
+        assert [len(view) for view in store.views()] == [len(page) for page in pages]
+        assert [view.text() for view in store.views()] == pages
+        assert store.total_chars() == sum(len(page) for page in pages)
+        assert store.total_bytes() == sum(len(page.encode("utf-8")) for page in pages)
+
+        joined = "\n".join(pages)
+        for max_chars in (5, 17, 20, len(joined), 1000):
+            text, total = leading_text(store.views(), max_chars)
+            assert text == joined[:max_chars]
+            assert total == len(joined)
+        assert leading_text([Document(page_content=page) for page in pages], 20) == (joined[:20], len(joined))
+
+
+def peak_rss_growth(fn, interval=0.005):
+    """Run fn while sampling RSS; return (result, peak growth over the RSS before the call)"""
+    baseline = current_rss_bytes()
+    peak = baseline
+    done = threading.Event()
+
+    def sample():
+        nonlocal peak
+        while not done.is_set():
+            peak = max(peak, current_rss_bytes())
+            done.wait(interval)
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    try:
+        result = fn()
+    finally:
+        done.set()
+        sampler.join()
+    return result, max(peak, current_rss_bytes()) - baseline
+
+
+def test_ingest_bounded_stays_within_rss_budget(tmp_path):
+    pages = 1500
+    budget_mb = 16
+    path = str(tmp_path / "synthetic_rule.pdf")
+    write_synthetic_pdf(path, pages=pages)
+
+    store, growth = peak_rss_growth(lambda: ingest_bounded(path, rss_budget_mb=budget_mb,
+                                                           spill_path=str(tmp_path / "spill.txt")))
+    with store:
+        assert len(store) == pages
+    assert growth <= budget_mb * MB, f"RSS grew {growth / MB:.1f} MB against a {budget_mb} MB budget"
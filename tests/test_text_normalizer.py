@@ -0,0 +1,51 @@
+import pytest
+from langchain.schema import Document
+
+from utils.text_normalizer import detect_running_headers, normalize_text
+
+HEADER = "Federal Register / Vol. 84, No. 119 / Thursday, June 20, 2019 / Rules and Regulations"
+BODY = [
+    "insurance coverage if the conditions in 26 CFR 54.9802-4 are satisfied, and",
+    "health reimbursement arrangements and other account-based group health plans",
+    "that are integrated with individual health insurance coverage or Medicare.",
+]
+
+
+@pytest.mark.parametrize("text", [
+    "10:30 a.m.",
+    "ratio of 3:1 applies",
+    "items 1,2 and 3",
+    "section 501(c)3 organizations",
+    "see p.12 of the rule",
+    "under sec.4 of the Act",
+])
+def test_numbers_are_kept(text):
+    assert normalize_text(text)[0] == text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("the plans.2 The", "the plans. The"),
+    ("Executive Order 13813,1 ‘‘Promoting", "Executive Order 13813,1 ‘‘Promoting"),
+    ("the Order,1 ‘‘Promoting", "the Order, ‘‘Promoting"),
+    ("coverage”3 and", "coverage” and"),
+])
+def test_footnote_markers(text, expected):
+    assert normalize_text(text)[0] == expected
+
+
+def test_running_header_removed_and_body_kept():
+    pages = []
+    for number in range(20):
+        lines = [f"{28888 + number} {HEADER}"] + [BODY[(number + i) % len(BODY)] for i in range(len(BODY))]
+        pages.append(Document(page_content="\n".join(lines)))
+    shapes = detect_running_headers(pages)
+    text, removed = normalize_text(pages[0].page_content, shapes)
+    assert removed == 1
+    assert HEADER not in text
+    for line in BODY:
+        assert line in text
+
+
+def test_line_on_some_pages_is_not_a_header():
+    pages = [Document(page_content=f"Table {n}\n{BODY[n % 3]}" if n % 2 else BODY[n % 3]) for n in range(20)]
+    assert "table #" not in detect_running_headers(pages)
@@ -0,0 +1,190 @@
+"""Ingest a directory of policy documents into a local corpus the app pages can open
+
+Run from the project root:
+    python -m utils.bulk_ingest path/to/bills [--corpus policy_corpus] [--workers 4] [--embeddings openai]
+                                [--index auto] [--dimensions 256] [--int8]
+
+Finished documents are recorded in the corpus manifest as they complete, so an
+interrupted run picks up where it stopped when started again.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from dotenv import load_dotenv
+from langchain.schema import Document
+from chains.indexing import build_vectorstore
+from utils.chunking import get_splitter
+from utils.embedding_providers import EMBEDDING_PROVIDERS, get_default_provider, get_embeddings
+from utils.corpus import (CORPUS_CHUNK_SIZE, CORPUS_CHUNK_OVERLAP, get_corpus_dir, read_manifest,
+                          write_manifest, write_shard, build_corpus_index, indexed_documents)
+from utils.document_parser import iter_document_pages
+from utils.legal_sections import iter_sections
+from utils.parse_cache import hash_file
+from utils.vector_index import INDEX_KINDS
+
+SUPPORTED_EXTENSIONS = (".pdf", ".xml", ".txt")
+
+
+def find_documents(input_dir):
+    """Return the supported files under a directory, in a stable order"""
+    paths = []
+    for dir_path, _, names in os.walk(input_dir):
+        for name in names:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(dir_path, name))
+    return sorted(paths)
+
+
+def _make_embeddings(api_key, provider=None):
+    return get_embeddings(provider, api_key)
+
+
+def _corpus_settings(api_key, provider=None):
+    return {"chunk_size": CORPUS_CHUNK_SIZE, "chunk_overlap": CORPUS_CHUNK_OVERLAP,
+            "embedding_model": _make_embeddings(api_key, provider).model}
+
+
+def _ingest_file(task):
+    """Parse, chunk and embed one document in a worker process and write its shard"""
+    path, content_hash, corpus_dir, api_key, provider = task
+    start = time.perf_counter()
+    try:
+        if path.lower().endswith(".txt"):
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                pages = iter_sections([Document(page_content=f.read(), metadata={"source": path, "page": 0})])
+        else:
+            # Pool workers are daemonic and cannot start the parser's own extraction pool. A parse
+            # error raises so it is counted as failed instead of embedding the error message
+            pages = iter_document_pages(path, max_chars=None, workers=1, by_section=True, raise_errors=True)
+
+        splitter = get_splitter()
+        # Version records are per uploaded bill; bulk runs are resumed through the manifest instead
+        vectorstore, _ = build_vectorstore(pages, splitter, _make_embeddings(api_key, provider), reuse_versions=False)
+
+        chunks, vectors = [], []
+        if vectorstore is not None:
+            # Read back in index order; reused and new chunks are not added in document order
+            vectors = vectorstore.index.reconstruct_n(0, vectorstore.index.ntotal)
+            chunks = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(vectorstore.index.ntotal)]
+        write_shard(corpus_dir, content_hash, chunks, vectors)
+        return {"path": path, "hash": content_hash, "chunks": len(chunks),
+                "seconds": time.perf_counter() - start, "error": None}
+    except Exception as e:
+        return {"path": path, "hash": content_hash, "chunks": 0,
+                "seconds": time.perf_counter() - start, "error": str(e)}
+
+
+def ingest_directory(input_dir, corpus_dir, workers, api_key, provider=None, index_options=None):
+    """
+    Ingest every new document under input_dir into the corpus.
+
+    Args:
+        input_dir (str): Directory of PDF, XML and text files.
+        corpus_dir (str): Corpus directory, created if needed.
+        workers (int): Documents processed in parallel.
+        api_key (str): OpenAI API key for embeddings.
+        provider (str, optional): Embedding backend, "openai", "local" or "hashing".
+        index_options (dict, optional): Corpus index kind, dimensions and int8
+            (see utils.corpus.build_corpus_index); the index is rebuilt when they change.
+
+    Returns:
+        dict: ingested, skipped and failed counts, seconds and docs_per_minute.
+    """
+    os.makedirs(corpus_dir, exist_ok=True)
+    manifest = read_manifest(corpus_dir)
+    settings = _corpus_settings(api_key, provider)
+    if manifest["documents"] and manifest["settings"] != settings:
+        raise ValueError(f"{corpus_dir} was built with {manifest['settings']}, not {settings}; use a new corpus directory")
+    manifest["settings"] = settings
+
+    tasks = []
+    seen = set(manifest["documents"])
+    paths = find_documents(input_dir)
+    for path in paths:
+        content_hash = hash_file(path)
+        # Already in the corpus, or the same bytes under another name
+        if content_hash in seen:
+            continue
+        seen.add(content_hash)
+        tasks.append((path, content_hash, corpus_dir, api_key, provider))
+
+    skipped = len(paths) - len(tasks)
+    print(f"Found {len(paths)} documents, {len(tasks)} to ingest ({skipped} already in the corpus or duplicates)")
+
+    ingested = failed = 0
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(processes=max(1, min(workers, len(tasks) or 1)))
+    try:
+        for result in pool.imap_unordered(_ingest_file, tasks):
+            elapsed = time.perf_counter() - start
+            if result["error"]:
+                failed += 1
+                print(f"FAILED {result['path']}: {result['error']}")
+                continue
+            ingested += 1
+            manifest["documents"][result["hash"]] = {"path": result["path"], "chunks": result["chunks"],
+                                                     "ingested_at": time.time()}
+            # Written after every document so an interrupted run resumes from here
+            write_manifest(corpus_dir, manifest)
+            print(f"[{ingested + failed}/{len(tasks)}] {result['path']}: {result['chunks']} chunks in "
+                  f"{result['seconds']:.1f}s ({60 * ingested / elapsed:.1f} docs/min)")
+        pool.close()
+    except KeyboardInterrupt:
+        print(f"Interrupted after {ingested} documents; run the same command again to resume")
+        pool.terminate()
+        raise
+    finally:
+        pool.join()
+
+    elapsed = time.perf_counter() - start
+    options_changed = index_options is not None and index_options != manifest.get("index_options", {})
+    if ingested or options_changed or manifest.get("index_hashes") != indexed_documents(manifest):
+        print("Building the corpus index...")
+        build_corpus_index(corpus_dir, _make_embeddings(api_key, provider), index_options)
+
+    docs_per_minute = 60 * ingested / elapsed if elapsed > 0 else 0.0
+    print(f"Ingested {ingested} documents ({failed} failed, {skipped} skipped) in {elapsed:.1f}s: "
+          f"{docs_per_minute:.1f} docs/min. Corpus: {corpus_dir} ({len(manifest['documents'])} documents)")
+    return {"ingested": ingested, "skipped": skipped, "failed": failed, "seconds": elapsed,
+            "docs_per_minute": docs_per_minute}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingest a directory of PDF, XML and text policy documents into a local corpus.")
+    parser.add_argument("input_dir", help="Directory to scan recursively for .pdf, .xml and .txt files")
+    parser.add_argument("--corpus", default=get_corpus_dir(), help="Corpus directory (default: POLICY_CORPUS_DIR or ./policy_corpus)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Documents processed in parallel")
+    parser.add_argument("--embeddings", choices=list(EMBEDDING_PROVIDERS), default=None,
+                        help="Embedding backend (default: EMBEDDING_PROVIDER or openai); local and hashing run offline")
+    parser.add_argument("--index", choices=("auto",) + INDEX_KINDS, default="auto",
+                        help="Corpus index type (default: flat, HNSW or IVF-PQ by corpus size)")
+    parser.add_argument("--dimensions", type=int, default=None, help="Reduce vectors to this many dimensions with PCA")
+    parser.add_argument("--int8", action="store_true", help="Store vectors as 8-bit scalars")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+    provider = args.embeddings or get_default_provider()
+    if provider == "openai" and not api_key:
+        print("OPENAI_API_KEY is not set; it is needed to embed the corpus (or use --embeddings local)")
+        return 1
+    if not os.path.isdir(args.input_dir):
+        print(f"{args.input_dir} is not a directory")
+        return 1
+
+    try:
+        index_options = {"kind": None if args.index == "auto" else args.index,
+                         "dimensions": args.dimensions, "int8": args.int8}
+        result = ingest_directory(args.input_dir, args.corpus, args.workers, api_key, provider, index_options)
+    except KeyboardInterrupt:
+        return 130
+    except ValueError as e:
+        print(e)
+        return 1
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
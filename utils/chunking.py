@@ -0,0 +1,193 @@
+import re
+from typing import Any
+from langchain.schema import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.retrievers import BaseRetriever
+from utils.document_versions import unit_hash
+
+# Every chain, the corpus and the version store share these fine-grained chunks
+CHUNK_SIZE = 800
+CHUNK_OVERLAP = 150
+
+# Coarser parents are runs of consecutive chunks of one page or section up to this size
+PARENT_SIZE = 1500
+
+# Questions that point at a page or a numbered section of the PDF
+PAGE_REFERENCE = re.compile(r"\bpages?\s+(\d{1,4})\b", re.IGNORECASE)
+SECTION_REFERENCE = re.compile(r"(?:\bsec(?:tion)?\.?|§)\s*(\d+(?:[.-]\d+)*)", re.IGNORECASE)
+
+# Pages a page or section reference adds to the retrieved context at most
+LOOKUP_MAX_PAGES = 2
+
+
+def get_splitter():
+    """Return the splitter that produces the shared fine-grained chunks"""
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+
+def assign_parents(unit, chunks, parent_size=PARENT_SIZE):
+    """
+    Group the chunks of one page or section into parents.
+
+    Each chunk gets parent_id and parent_text_start/parent_text_end metadata, so
+    parents can be rebuilt from the chunks alone, e.g. from a stored index.
+
+    Args:
+        unit: The page or section Document the chunks were split from.
+        chunks (list): Its chunk Documents, in order.
+        parent_size (int, optional): Approximate maximum parent length in characters.
+    """
+    text = unit.page_content
+    prefix = unit_hash(text)[:16]
+    parent = 0
+    parent_start = None
+    cursor = 0
+    for chunk in chunks:
+        start = text.find(chunk.page_content, cursor)
+        if start < 0:
+            # Not a verbatim substring (whitespace collapsed by the splitter)
+            start = cursor
+        end = start + len(chunk.page_content)
+        if parent_start is not None and end - parent_start > parent_size:
+            parent += 1
+            parent_start = None
+        if parent_start is None:
+            parent_start = start
+        chunk.metadata["parent_id"] = f"{prefix}:{parent}"
+        chunk.metadata["parent_text_start"] = start
+        chunk.metadata["parent_text_end"] = end
+        # Overlapping chunks start before the previous one ends
+        cursor = start + 1
+
+
+def build_parents(chunks):
+    """
+    Rebuild parent Documents from chunks labelled by assign_parents.
+
+    Overlapping chunk text is merged by its offsets in the page or section, so a
+    parent reads like the original passage. Chunks without a parent are their
+    own parent.
+
+    Args:
+        chunks (iterable): Chunk Documents.
+
+    Returns:
+        dict: parent_id -> parent Document (metadata from its first chunk).
+    """
+    grouped = {}
+    for chunk in chunks:
+        parent_id = chunk.metadata.get("parent_id")
+        if parent_id is None:
+            parent_id = f"chunk:{id(chunk)}"
+        grouped.setdefault(parent_id, []).append(chunk)
+
+    parents = {}
+    for parent_id, members in grouped.items():
+        members.sort(key=lambda c: c.metadata.get("parent_text_start", 0))
+        text = ""
+        end = None
+        for chunk in members:
+            start = chunk.metadata.get("parent_text_start")
+            if end is not None and start is not None and start < end:
+                # Skip the part already covered by the previous chunk
+                text += chunk.page_content[end - start:]
+            else:
+                text += ("\n" if text else "") + chunk.page_content
+            chunk_end = chunk.metadata.get("parent_text_end")
+            end = max(end or 0, chunk_end) if chunk_end is not None else None
+        metadata = {k: v for k, v in members[0].metadata.items() if not k.startswith("parent_text_")}
+        parents[parent_id] = Document(page_content=text, metadata=metadata)
+    return parents
+
+
+class ParentChunkRetriever(BaseRetriever):
+    """
+    Searches the fine-grained chunks and returns their parents.
+
+    Chains that want longer passages than the shared chunks use this on the same
+    index instead of splitting and embedding the document a second time.
+    """
+
+    chunk_retriever: BaseRetriever
+    parents: dict
+    k: int = 4
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, k=4, fetch_k=20, chunk_retriever=None):
+        """
+        Build the retriever over every chunk in a FAISS vectorstore.
+
+        Args:
+            vectorstore: FAISS vectorstore of chunks labelled by assign_parents.
+            k (int, optional): Parents returned per query.
+            fetch_k (int, optional): Chunks searched for those parents.
+            chunk_retriever (optional): Retriever returning chunks, e.g. a HybridRetriever
+                (default: similarity search for fetch_k chunks).
+
+        Returns:
+            ParentChunkRetriever
+        """
+        chunks = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(vectorstore.index.ntotal)]
+        if chunk_retriever is None:
+            chunk_retriever = vectorstore.as_retriever(search_kwargs={"k": fetch_k})
+        return cls(chunk_retriever=chunk_retriever, parents=build_parents(chunks), k=k)
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        results = []
+        seen = set()
+        for chunk in self.chunk_retriever.invoke(query):
+            parent_id = chunk.metadata.get("parent_id")
+            if parent_id is None:
+                results.append(chunk)
+            elif parent_id in seen:
+                continue
+            else:
+                seen.add(parent_id)
+                results.append(self.parents.get(parent_id, chunk))
+            if len(results) >= self.k:
+                break
+        return results
+
+
+class PageLookupRetriever(BaseRetriever):
+    """
+    Puts the pages a question points at ahead of the retrieved passages.
+
+    "What does page 12 say..." or "Explain Sec. 5" is answered from the pages
+    themselves, read on demand from a PDFPageIndex, so pages past the streaming
+    budget (never embedded) can still be asked about. Numbered sections are found
+    through the PDF outline, without extracting any text to search.
+    """
+
+    retriever: BaseRetriever
+    page_index: Any
+    max_pages: int = LOOKUP_MAX_PAGES
+
+    def lookup(self, query):
+        """Return the pages referenced by a question, or []"""
+        pages = []
+        try:
+            for match in PAGE_REFERENCE.finditer(query):
+                page_number = int(match.group(1)) - 1
+                if 0 <= page_number < len(self.page_index) and len(pages) < self.max_pages:
+                    pages.append(self.page_index.get_page(page_number))
+            for match in SECTION_REFERENCE.finditer(query):
+                if len(pages) >= self.max_pages:
+                    break
+                pages.extend(self.page_index.find_numbered_section_pages(match.group(1), self.max_pages - len(pages)))
+        except Exception as e:
+            print(f"Page lookup failed: {e}")
+        return pages[:self.max_pages]
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        pages = self.lookup(query)
+        looked_up = {page.metadata["page"] for page in pages}
+        retrieved = []
+        for document in self.retriever.invoke(query):
+            start = document.metadata.get("page_start", document.metadata.get("page"))
+            end = document.metadata.get("page_end", start)
+            # Passages from pages already included in full would only repeat them
+            if start is not None and all(page in looked_up for page in range(start, end + 1)):
+                continue
+            retrieved.append(document)
+        return pages + retrieved
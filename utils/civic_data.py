@@ -1,12 +1,15 @@
 import random
 from langchain_openai import ChatOpenAI
 import streamlit as st
+from utils.spill_store import find_terms
 
 def simulate_impact_by_zip(documents, user_data, api_key):
     # Add debug print to help identify issues
     print(f"Starting simulation with: ZIP={user_data.get('zip', '')}, API key length={len(api_key) if api_key else 0}")
     
-    policy_text = "\n".join([doc.page_content for doc in documents])
+    # Scan page by page instead of joining the document, which may be a spilled stream
+    mentions = find_terms(documents, ["healthcare", "medical", "housing", "rent", "mortgage",
+                                      "tax", "income", "employment", "subsidy", user_data.get("occupation", "")])
     
     # Extract user data
     zip_code = user_data.get("zip", "")
@@ -41,37 +44,37 @@ def simulate_impact_by_zip(documents, user_data, api_key):
     if "Healthcare" in impact_categories:
         insurance_status = "having" if has_health_insurance else "not having"
         healthcare_impact = f"As someone {insurance_status} health insurance, this policy could affect your healthcare costs by approximately {impact_categories['Healthcare']}%. "
-        if "healthcare" in policy_text.lower() or "medical" in policy_text.lower():
+        if mentions["healthcare"] or mentions["medical"]:
             healthcare_impact += "The policy specifically mentions healthcare provisions that may apply to your situation."
         impact_details["Healthcare"] = healthcare_impact
     
     # Housing impact details
     if "Housing" in impact_categories:
         housing_impact = f"As a {housing_status.lower()}, this policy could affect your housing costs by approximately {impact_categories['Housing']}%. "
-        if "housing" in policy_text.lower() or "rent" in policy_text.lower() or "mortgage" in policy_text.lower():
+        if mentions["housing"] or mentions["rent"] or mentions["mortgage"]:
             housing_impact += "The policy contains specific housing provisions that may impact your situation."
         impact_details["Housing"] = housing_impact
     
     # Income/Tax impact details
     if "Taxes" in impact_categories:
         tax_impact = f"Based on your income range of {income}, this policy could affect your tax burden by approximately {impact_categories['Taxes']}%. "
-        if "tax" in policy_text.lower() or "income" in policy_text.lower():
+        if mentions["tax"] or mentions["income"]:
             tax_impact += "The policy contains specific tax provisions that may impact your financial situation."
         impact_details["Taxes"] = tax_impact
     
     # Occupation impact details
     if "Employment" in impact_categories:
         employment_impact = f"As someone working in {occupation}, this policy could affect your employment conditions by approximately {impact_categories['Employment']}%. "
-        if occupation.lower() in policy_text.lower() or "employment" in policy_text.lower():
+        if mentions.get(occupation, False) or mentions["employment"]:
             employment_impact += "The policy references your industry specifically."
         impact_details["Employment"] = employment_impact
     
     # Generate personalized summary
     summary = f"Based on your profile (ZIP code {zip_code}, household of {household_size}, income {income}, {occupation} occupation), this policy is predicted to have the most significant impact on your {max(impact_categories, key=impact_categories.get)} costs. "
     
-    if "tax" in policy_text.lower() and income == "More than $150,000":
+    if mentions["tax"] and income == "More than $150,000":
         summary += "As someone in a higher income bracket, you may see larger tax implications. "
-    elif "subsidy" in policy_text.lower() and income == "Less than $25,000":
+    elif mentions["subsidy"] and income == "Less than $25,000":
         summary += "You may qualify for subsidies or assistance programs mentioned in this policy. "
     
     if household_size > 4:
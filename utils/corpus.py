@@ -0,0 +1,160 @@
+import json
+import os
+import time
+import uuid
+import numpy as np
+from langchain.schema import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from utils.chunking import CHUNK_SIZE, CHUNK_OVERLAP
+from utils.vector_index import build_index, configure_search, recall_at_k
+
+# Corpus built by utils.bulk_ingest, at the project root unless overridden
+DEFAULT_CORPUS_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "policy_corpus")
+
+# Chunking shared with the chains so corpus and upload answers see the same chunks
+CORPUS_CHUNK_SIZE = CHUNK_SIZE
+CORPUS_CHUNK_OVERLAP = CHUNK_OVERLAP
+
+MANIFEST_NAME = "manifest.json"
+
+
+def get_corpus_dir():
+    """Return the corpus directory from POLICY_CORPUS_DIR"""
+    return os.getenv("POLICY_CORPUS_DIR", DEFAULT_CORPUS_DIR)
+
+
+def _shard_paths(corpus_dir, content_hash):
+    base = os.path.join(corpus_dir, "shards", content_hash)
+    return base + ".json", base + ".npy"
+
+
+def read_manifest(corpus_dir):
+    """Return the corpus manifest, or an empty one for a new corpus"""
+    path = os.path.join(corpus_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"documents": {}, "settings": {}, "index_hashes": []}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def write_manifest(corpus_dir, manifest):
+    """Save the manifest atomically, so an interrupted run never leaves it half-written"""
+    path = os.path.join(corpus_dir, MANIFEST_NAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(path + ".tmp", path)
+
+
+def write_shard(corpus_dir, content_hash, chunks, vectors):
+    """
+    Save the chunks and embeddings of one document.
+
+    Args:
+        corpus_dir (str): Corpus directory.
+        content_hash (str): Hash of the source document, the shard's name.
+        chunks (list): Chunk Documents.
+        vectors (list): One embedding per chunk.
+    """
+    os.makedirs(os.path.join(corpus_dir, "shards"), exist_ok=True)
+    texts_path, vectors_path = _shard_paths(corpus_dir, content_hash)
+    np.save(vectors_path + ".tmp.npy", np.asarray(vectors, dtype=np.float32))
+    os.replace(vectors_path + ".tmp.npy", vectors_path)
+    with open(texts_path + ".tmp", "w") as f:
+        json.dump([{"page_content": c.page_content, "metadata": c.metadata} for c in chunks], f)
+    os.replace(texts_path + ".tmp", texts_path)
+
+
+def read_shard_vectors(corpus_dir, content_hash):
+    """Return the float32 embedding matrix of one document, memory-mapped"""
+    return np.load(_shard_paths(corpus_dir, content_hash)[1], mmap_mode="r")
+
+
+def indexed_documents(manifest):
+    """Return the hashes of the documents with chunks, in manifest order; these are the ones in the index"""
+    return [content_hash for content_hash, entry in manifest["documents"].items() if entry.get("chunks")]
+
+
+def read_shard(corpus_dir, content_hash):
+    """Return (chunk Documents, float32 embedding matrix) of one document"""
+    texts_path, vectors_path = _shard_paths(corpus_dir, content_hash)
+    with open(texts_path, "r") as f:
+        chunks = [Document(page_content=c["page_content"], metadata=c["metadata"]) for c in json.load(f)]
+    return chunks, np.load(vectors_path, mmap_mode="r")
+
+
+def build_corpus_index(corpus_dir, embeddings, index_options=None):
+    """
+    Build the FAISS index over every shard in the manifest and save it in the corpus.
+
+    The index type follows the corpus size (utils.vector_index.choose_index_kind):
+    exact search for small corpora, HNSW and then IVF-PQ as it grows. Its recall@10
+    against exact search is recorded in the manifest.
+
+    Args:
+        corpus_dir (str): Corpus directory.
+        embeddings: The embeddings object used for queries (same model as the shards).
+        index_options (dict, optional): kind ("flat", "hnsw" or "ivfpq"), dimensions (PCA)
+            and int8 for build_index; defaults to the options the corpus was last built with.
+
+    Returns:
+        FAISS vectorstore, or None if the corpus is empty.
+    """
+    manifest = read_manifest(corpus_dir)
+    if index_options is None:
+        index_options = manifest.get("index_options", {})
+    all_chunks = []
+    all_vectors = []
+    hashes = []
+    for content_hash in manifest["documents"]:
+        chunks, vectors = read_shard(corpus_dir, content_hash)
+        if not chunks:
+            continue
+        all_chunks.extend(chunks)
+        all_vectors.append(vectors)
+        hashes.append(content_hash)
+
+    vectorstore = None
+    if all_chunks:
+        vectors = np.concatenate(all_vectors).astype(np.float32)
+        index, info = build_index(vectors, **index_options)
+        info["recall_at_10"] = recall_at_k(index, vectors)
+        ids = [str(uuid.uuid4()) for _ in all_chunks]
+        vectorstore = FAISS(embeddings, index, InMemoryDocstore(dict(zip(ids, all_chunks))), dict(enumerate(ids)))
+        vectorstore.save_local(os.path.join(corpus_dir, "index"))
+        manifest["index_info"] = info
+        print(f"Corpus index: {info['kind']} over {info['vectors']:,} vectors ({info['dimensions']} dimensions"
+              f"{', int8' if info['int8'] else ''}), {info['bytes'] / 1024 / 1024:.1f} MB, "
+              f"recall@10 {info['recall_at_10']:.3f} against exact search")
+    manifest["index_options"] = index_options
+    manifest["index_hashes"] = hashes
+    manifest["index_built"] = time.time()
+    write_manifest(corpus_dir, manifest)
+    return vectorstore
+
+
+def load_corpus(embeddings, corpus_dir=None):
+    """
+    Open the corpus as a FAISS vectorstore for the app pages.
+
+    The saved index is used when it covers every document in the manifest;
+    otherwise it is rebuilt from the shards first (e.g. after an interrupted run).
+
+    Args:
+        embeddings: Embeddings object for queries, same model the corpus was built with.
+        corpus_dir (str, optional): Corpus directory (default from POLICY_CORPUS_DIR).
+
+    Returns:
+        FAISS vectorstore, or None if there is no corpus.
+    """
+    corpus_dir = corpus_dir or get_corpus_dir()
+    manifest = read_manifest(corpus_dir)
+    if not manifest["documents"]:
+        return None
+    index_dir = os.path.join(corpus_dir, "index")
+    if sorted(manifest.get("index_hashes", [])) == sorted(indexed_documents(manifest)) and os.path.exists(index_dir):
+        # The docstore pickle was written by build_corpus_index, not downloaded
+        vectorstore = FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+        configure_search(vectorstore.index, manifest.get("index_info", {}).get("kind", "flat"))
+        return vectorstore
+    return build_corpus_index(corpus_dir, embeddings)
@@ -0,0 +1,360 @@
+import bisect
+import os
+import threading
+import time
+from typing import Optional
+import faiss
+import numpy as np
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from utils.corpus import (CORPUS_CHUNK_SIZE, CORPUS_CHUNK_OVERLAP, MANIFEST_NAME, get_corpus_dir, read_manifest,
+                          write_manifest, write_shard, read_shard_vectors, indexed_documents, load_corpus,
+                          build_corpus_index)
+from utils.document_versions import unit_hash
+from utils.embedding_providers import get_embeddings
+from utils.retrieval_cache import cache_key, index_id, lookup, store
+from utils.vector_index import choose_index_kind
+
+# Filtered searches over at most this many chunks scan the shards exactly;
+# larger selections are filtered inside the ANN index
+EXACT_SEARCH_MAX_CHUNKS = 5000
+
+# One open corpus per directory per process, shared by every session
+_lock = threading.RLock()
+_open = {}
+
+
+def add_uploads_enabled():
+    """Return True when CORPUS_ADD_UPLOADS=1 opts in to adding uploaded documents to the corpus"""
+    return os.getenv("CORPUS_ADD_UPLOADS", "0") == "1"
+
+
+def document_fields(content_hash, entry):
+    """
+    Return the filterable metadata of a corpus document.
+
+    Args:
+        content_hash (str): The document's key in the manifest.
+        entry (dict): Its manifest entry.
+
+    Returns:
+        dict: hash, name, format, origin ("bulk" or "upload"), chunks and ingested_at.
+    """
+    path = entry.get("path", "")
+    name = entry.get("name") or os.path.basename(path) or content_hash[:12]
+    return {
+        "hash": content_hash,
+        "name": name,
+        "format": entry.get("format") or os.path.splitext(name)[1].lstrip(".").lower() or "text",
+        "origin": entry.get("origin", "bulk"),
+        "chunks": entry.get("chunks", 0),
+        "ingested_at": entry.get("ingested_at", 0.0),
+    }
+
+
+def list_documents(corpus_dir=None):
+    """Return the document_fields of every indexed corpus document, newest first"""
+    manifest = read_manifest(corpus_dir or get_corpus_dir())
+    documents = [document_fields(h, manifest["documents"][h]) for h in indexed_documents(manifest)]
+    return sorted(documents, key=lambda d: d["ingested_at"], reverse=True)
+
+
+def matches_filters(fields, filters):
+    """
+    Check a document against metadata filters.
+
+    Args:
+        fields (dict): From document_fields.
+        filters (dict): Field name to a value or a list of accepted values, plus
+            "ingested_after" / "ingested_before" timestamps.
+
+    Returns:
+        bool: True if every filter accepts the document.
+    """
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if key == "ingested_after":
+            if fields["ingested_at"] < value:
+                return False
+        elif key == "ingested_before":
+            if fields["ingested_at"] >= value:
+                return False
+        elif isinstance(value, (list, tuple, set)):
+            if fields.get(key) not in value:
+                return False
+        elif fields.get(key) != value:
+            return False
+    return True
+
+
+def embeddings_for_corpus(corpus_dir=None, openai_api_key=None):
+    """
+    Create query embeddings matching the model the corpus was built with.
+
+    Args:
+        corpus_dir (str, optional): Corpus directory (default from POLICY_CORPUS_DIR).
+        openai_api_key (str, optional): API key, for a corpus embedded with OpenAI.
+
+    Returns:
+        CachedEmbeddings, or None for an empty corpus.
+
+    Raises:
+        ValueError: If the corpus model is not available in this process.
+    """
+    model = read_manifest(corpus_dir or get_corpus_dir())["settings"].get("embedding_model")
+    if not model:
+        return None
+    if model.startswith("hashing-"):
+        provider = "hashing"
+    elif model.startswith("text-embedding"):
+        provider = "openai"
+    else:
+        provider = "local"
+    embeddings = get_embeddings(provider, openai_api_key)
+    if embeddings.model != model:
+        raise ValueError(f"The corpus was embedded with {model}, but {embeddings.model} is available")
+    return embeddings
+
+
+def _manifest_stamp(corpus_dir):
+    try:
+        return os.stat(os.path.join(corpus_dir, MANIFEST_NAME)).st_mtime_ns
+    except OSError:
+        return None
+
+
+def open_corpus(embeddings, corpus_dir=None):
+    """
+    Return the corpus vectorstore and manifest, loading them once per process.
+
+    The open index is reused until the manifest changes, e.g. when bulk_ingest
+    adds documents from another process.
+
+    Args:
+        embeddings: Embeddings object of the corpus model.
+        corpus_dir (str, optional): Corpus directory (default from POLICY_CORPUS_DIR).
+
+    Returns:
+        tuple: (FAISS vectorstore or None for an empty corpus, manifest dict)
+    """
+    corpus_dir = corpus_dir or get_corpus_dir()
+    with _lock:
+        stamp = _manifest_stamp(corpus_dir)
+        cached = _open.get(corpus_dir)
+        if cached is not None and cached["stamp"] == stamp and cached["model"] == embeddings.model:
+            return cached["vectorstore"], cached["manifest"]
+        vectorstore = load_corpus(embeddings, corpus_dir)
+        # load_corpus may have rebuilt the index and rewritten the manifest
+        manifest = read_manifest(corpus_dir)
+        _open[corpus_dir] = {"stamp": _manifest_stamp(corpus_dir), "model": embeddings.model,
+                             "vectorstore": vectorstore, "manifest": manifest}
+        return vectorstore, manifest
+
+
+def _ranges(manifest):
+    # (first index id, chunk count, hash) per document; documents are added to the index in this order
+    ranges = []
+    start = 0
+    for content_hash in manifest.get("index_hashes", []):
+        count = manifest["documents"][content_hash]["chunks"]
+        ranges.append((start, count, content_hash))
+        start += count
+    return ranges
+
+
+def _search_params(index, selector):
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+    if isinstance(inner, faiss.IndexHNSW):
+        params = faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+    elif isinstance(inner, faiss.IndexIVF):
+        params = faiss.SearchParametersIVF(sel=selector, nprobe=inner.nprobe)
+    else:
+        params = faiss.SearchParameters(sel=selector)
+    if inner is not index:
+        wrapped = faiss.SearchParametersPreTransform()
+        wrapped.index_params = params
+        # The wrapper does not own the inner parameters; keep them referenced
+        wrapped.referenced_params = params
+        return wrapped
+    return params
+
+
+def search_corpus(query, embeddings, k=10, filters=None, corpus_dir=None):
+    """
+    Search every document in the corpus, optionally restricted by document metadata.
+
+    Filters select documents before the search, not results after it: a small
+    selection is scanned exactly from the shards, a large one is searched in the
+    ANN index with the other documents' ids excluded. Results are cached per
+    (index, query, k, filters) in utils.retrieval_cache.
+
+    Args:
+        query (str): Search text.
+        embeddings: Embeddings object of the corpus model (see embeddings_for_corpus).
+        k (int, optional): Chunks returned.
+        filters (dict, optional): Document filters (see matches_filters), e.g.
+            {"name": ["hr1.pdf"], "format": "xml"}.
+        corpus_dir (str, optional): Corpus directory (default from POLICY_CORPUS_DIR).
+
+    Returns:
+        list: Chunk Documents, best first, with document_id, document_name and score
+            (L2 distance, lower is closer) added to their metadata.
+    """
+    corpus_dir = corpus_dir or get_corpus_dir()
+    vectorstore, manifest = open_corpus(embeddings, corpus_dir)
+    if vectorstore is None or not query.strip():
+        return []
+    key = cache_key(f"corpus:{corpus_dir}:{index_id(vectorstore)}", query, k, filters)
+    cached = lookup(key)
+    if cached is not None:
+        return cached
+    ranges = _ranges(manifest)
+    selected = [r for r in ranges if matches_filters(document_fields(r[2], manifest["documents"][r[2]]), filters)]
+    if not selected:
+        return []
+
+    vector = np.asarray([embeddings.embed_query(query)], dtype=np.float32)
+    if getattr(vectorstore, "_normalize_L2", False):
+        faiss.normalize_L2(vector)
+
+    hits = []
+    selected_chunks = sum(count for _, count, _ in selected)
+    if len(selected) < len(ranges) and selected_chunks <= EXACT_SEARCH_MAX_CHUNKS:
+        # Exact distances from the full-precision shard vectors
+        for start, count, content_hash in selected:
+            distances = ((read_shard_vectors(corpus_dir, content_hash) - vector) ** 2).sum(axis=1)
+            top = np.argsort(distances)[:k]
+            hits.extend((float(distances[i]), start + int(i)) for i in top)
+        hits = sorted(hits)[:k]
+    else:
+        params = None
+        if len(selected) < len(ranges):
+            ids = np.concatenate([np.arange(start, start + count, dtype=np.int64) for start, count, _ in selected])
+            selector = faiss.IDSelectorBatch(ids)
+            params = _search_params(vectorstore.index, selector)
+        # add_to_corpus appends to the same index
+        with _lock:
+            distances, ids = vectorstore.index.search(vector, min(k, selected_chunks), params=params)
+        hits = [(float(d), int(i)) for d, i in zip(distances[0], ids[0]) if i >= 0]
+
+    starts = [start for start, _, _ in ranges]
+    results = []
+    for distance, position in hits:
+        chunk = vectorstore.docstore.search(vectorstore.index_to_docstore_id[position])
+        content_hash = ranges[bisect.bisect_right(starts, position) - 1][2]
+        fields = document_fields(content_hash, manifest["documents"][content_hash])
+        metadata = dict(chunk.metadata, document_id=content_hash, document_name=fields["name"], score=distance)
+        results.append(Document(page_content=chunk.page_content, metadata=metadata))
+    store(key, results)
+    return results
+
+
+class CorpusRetriever(BaseRetriever):
+    """
+    Retrieves chunks from every document in the corpus, for chains that answer
+    across documents instead of from one upload.
+    """
+
+    embeddings: Embeddings
+    k: int = 5
+    filters: Optional[dict] = None
+    corpus_dir: Optional[str] = None
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        return search_corpus(query, self.embeddings, k=self.k, filters=self.filters, corpus_dir=self.corpus_dir)
+
+
+def add_to_corpus(vectorstore, embeddings, name=None, corpus_dir=None, document_key=None):
+    """
+    Add a document indexed by one of the chains to the corpus, so it can be searched later.
+
+    Only done when CORPUS_ADD_UPLOADS=1. The document is keyed by the hash of its
+    chunk texts. It is skipped when it is already in the corpus or when the corpus
+    was built with another embedding model. The chunks are appended to the open
+    corpus index, so the index is not rebuilt.
+
+    Args:
+        vectorstore: FAISS vectorstore from chains.indexing.build_vectorstore.
+        embeddings: The embeddings object it was built with.
+        name (str, optional): Document name (default: the chunks' source file name).
+        corpus_dir (str, optional): Corpus directory (default from POLICY_CORPUS_DIR).
+        document_key (str, optional): Hash of the uploaded source, e.g. from
+            utils.ingestion_worker.document_key. A document added under this key
+            before is skipped without reading or hashing its chunks.
+
+    Returns:
+        str: The document's hash, or None if it was not added.
+    """
+    if vectorstore is None or not add_uploads_enabled() or not vectorstore.index.ntotal:
+        return None
+    corpus_dir = corpus_dir or get_corpus_dir()
+    if document_key:
+        # Chat rebuilds its chain on every visit; a known upload costs one manifest read
+        known = read_manifest(corpus_dir).get("document_keys", {}).get(document_key)
+        if known:
+            return known
+    name = name or vectorstore.docstore.search(vectorstore.index_to_docstore_id[0]).metadata.get("source")
+    if not name:
+        # Pasted text has no name to find it by later
+        return None
+    count = vectorstore.index.ntotal
+    chunks = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(count)]
+    content_hash = unit_hash("\0".join(chunk.page_content for chunk in chunks))
+    settings = {"chunk_size": CORPUS_CHUNK_SIZE, "chunk_overlap": CORPUS_CHUNK_OVERLAP,
+                "embedding_model": embeddings.model}
+
+    with _lock:
+        manifest = read_manifest(corpus_dir)
+        if content_hash in manifest["documents"]:
+            if document_key:
+                # Already added under another name or by bulk_ingest; find it by key next time
+                manifest.setdefault("document_keys", {})[document_key] = content_hash
+                write_manifest(corpus_dir, manifest)
+                cached = _open.get(corpus_dir)
+                if cached is not None:
+                    # Only the key map changed, so the open index is still current
+                    cached["stamp"] = _manifest_stamp(corpus_dir)
+                    cached["manifest"] = manifest
+            return content_hash
+        if manifest["documents"] and manifest["settings"] != settings:
+            print(f"Not adding {name} to the corpus: it was built with {manifest['settings'].get('embedding_model')}, "
+                  f"not {embeddings.model}")
+            return None
+
+        vectors = vectorstore.index.reconstruct_n(0, count)
+        os.makedirs(corpus_dir, exist_ok=True)
+        write_shard(corpus_dir, content_hash, chunks, vectors)
+        corpus, _ = open_corpus(embeddings, corpus_dir) if manifest["documents"] else (None, None)
+        manifest = read_manifest(corpus_dir)
+        manifest["settings"] = settings
+        manifest["documents"][content_hash] = {"path": name, "name": os.path.basename(name), "chunks": count,
+                                               "origin": "upload", "ingested_at": time.time()}
+        if document_key:
+            manifest.setdefault("document_keys", {})[document_key] = content_hash
+        rebuild_as = None
+        if corpus is not None and manifest.get("index_hashes") == indexed_documents(manifest)[:-1]:
+            # An index type chosen with --index is kept; otherwise it follows the corpus size
+            current = manifest.get("index_info", {}).get("kind", "flat")
+            kind = manifest.get("index_options", {}).get("kind") or choose_index_kind(corpus.index.ntotal + count)
+            if kind != current:
+                rebuild_as = kind
+            else:
+                corpus.add_embeddings(list(zip([c.page_content for c in chunks], vectors)), metadatas=[c.metadata for c in chunks])
+                corpus.save_local(os.path.join(corpus_dir, "index"))
+                manifest["index_hashes"].append(content_hash)
+                manifest["index_built"] = time.time()
+        # Otherwise the index is rebuilt from the shards the next time the corpus is opened
+        write_manifest(corpus_dir, manifest)
+        if rebuild_as is not None:
+            # Appending would keep the old index type past its size threshold
+            print(f"The corpus has outgrown its {current} index; rebuilding it as {rebuild_as}")
+            corpus = build_corpus_index(corpus_dir, embeddings)
+            manifest = read_manifest(corpus_dir)
+        _open.pop(corpus_dir, None)
+        if corpus is not None and manifest["index_hashes"][-1:] == [content_hash]:
+            _open[corpus_dir] = {"stamp": _manifest_stamp(corpus_dir), "model": embeddings.model,
+                                 "vectorstore": corpus, "manifest": manifest}
+    print(f"Added {name} to the corpus ({count} chunks)")
+    return content_hash
@@ -1,47 +1,515 @@
-from langchain_community.document_loaders import PyPDFLoader, PDFPlumberLoader
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.document_loaders.blob_loaders import Blob
+from langchain_community.document_loaders.parsers.pdf import PyPDFParser
 from langchain.schema import Document
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pypdf import PdfReader
+from utils.parse_cache import hash_bytes, hash_file, get_cached_documents, store_documents
+from utils.legal_sections import iter_sections
+from utils.text_normalizer import iter_normalized_pages
+from utils.xml_loader import is_xml_document, iter_xml_sections
+import io
+import multiprocessing
 import os
+import re
+import threading
+import unicodedata
 
-def load_and_split_document(file_path=None, raw_text=None, max_pages=20):
+# Bump whenever extraction output changes so stale cache entries are ignored
+PARSER_VERSION = "3"
+
+# Pages whose share of unreadable characters exceeds this are re-extracted with pdfplumber
+GARBAGE_RATIO_LIMIT = 0.2
+
+# Glyph references that PDF extractors emit when a font has no usable text mapping
+CID_PATTERN = re.compile(r"\(cid:\d+\)")
+
+# Streaming budget in characters (~125k tokens) replacing the old 20-page cut-off
+DEFAULT_CHAR_BUDGET = 500_000
+
+# Documents shorter than this are extracted serially; each fresh worker spends about a
+# second importing this module, which only pays off over a few hundred pages
+PARALLEL_MIN_PAGES = 400
+
+# Pages handed to a worker per task; small enough to keep all workers busy to the end
+PARALLEL_PAGES_PER_TASK = 16
+
+def get_extract_workers():
+    """Return the number of extraction processes from PDF_EXTRACT_WORKERS (default: CPU count, max 4)"""
+    try:
+        return max(1, int(os.getenv("PDF_EXTRACT_WORKERS", min(4, os.cpu_count() or 1))))
+    except ValueError:
+        return 1
+
+def _pool_context():
+    """Start extraction workers fresh rather than forking the app, which runs ingestion on threads"""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _resolve_source(source):
     """
-    Load and split a document from a file path or raw text.
-    
+    Normalize a PDF source into either a file path or in-memory bytes.
+
     Args:
-        file_path: Path to the PDF file.
-        raw_text: Raw text content.
-        max_pages: Maximum number of pages to process from a PDF (to avoid token limits).
-    
+        source: File path, raw bytes, a BytesIO or a Streamlit UploadedFile.
+
     Returns:
-        List of Document objects.
+        Tuple of (path, data, name); exactly one of path and data is set.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        return path, None, path
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return None, bytes(source), "uploaded.pdf"
+    # BytesIO and Streamlit's UploadedFile (a BytesIO subclass) hand back the whole
+    # buffer regardless of the read position left by an earlier rerun
+    data = source.getvalue() if hasattr(source, "getvalue") else source.read()
+    return None, data, getattr(source, "name", "uploaded.pdf")
+
+def _open_pdf_input(path, data):
+    """Return something pypdf and pdfplumber can open: the path or a fresh in-memory stream"""
+    return path if path is not None else io.BytesIO(data)
+
+def _is_xml(path, data):
+    """Sniff whether a resolved source is USLM / Federal Register XML instead of a PDF"""
+    if path is not None:
+        with open(path, "rb") as f:
+            return is_xml_document(f.read(64))
+    return is_xml_document(data[:64])
+
+def is_xml_source(source):
+    """Return True if the source is an XML document rather than a PDF"""
+    path, data, _ = _resolve_source(source)
+    return _is_xml(path, data)
+
+def hash_source(source):
+    """Return the SHA-256 of a PDF source's bytes, the key used by the parse cache"""
+    path, data, _ = _resolve_source(source)
+    return hash_file(path) if path is not None else hash_bytes(data)
+
+def count_pdf_pages(source):
+    """Return the number of pages of a PDF source without extracting any text"""
+    path, data, _ = _resolve_source(source)
+    return len(PdfReader(_open_pdf_input(path, data)).pages)
+
+# Reader opened once per worker process by _init_extract_worker
+_worker_reader = None
+
+def _init_extract_worker(path, data):
+    global _worker_reader
+    _worker_reader = PdfReader(_open_pdf_input(path, data))
+
+def _extract_page_range(start, end):
+    """Extract the text of pages [start, end) in a worker process"""
+    return [(i, _worker_reader.pages[i].extract_text()) for i in range(start, end)]
+
+def _iter_parallel_pages(path, data, name, page_count, workers):
+    """Yield pages in order while page ranges are extracted across a process pool"""
+    starts = list(range(0, page_count, PARALLEL_PAGES_PER_TASK))
+    ends = [min(start + PARALLEL_PAGES_PER_TASK, page_count) for start in starts]
+    print(f"Extracting {page_count} pages with {workers} worker processes")
+    # In-memory PDFs are shipped to each worker once, not once per page range
+    executor = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                   initializer=_init_extract_worker, initargs=(path, data))
+    try:
+        # map returns results in submission order, so pages come back in page order
+        for results in executor.map(_extract_page_range, starts, ends):
+            for page_number, text in results:
+                # Same core metadata PyPDFLoader produces
+                yield Document(page_content=text, metadata={"source": name, "page": page_number, "total_pages": page_count})
+    finally:
+        # Drop queued ranges if the consumer stopped early (e.g. the streaming budget ran out)
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _iter_windowed_pages(path, data, name, window):
+    """Yield pages serially, dropping pypdf's resolved-object cache every window pages"""
+    # pypdf reads a whole file into memory when given its path; an open file is read as needed
+    stream = open(path, "rb") if path is not None else io.BytesIO(data)
+    try:
+        reader = PdfReader(stream)
+        page_count = len(reader.pages)
+        for page_number in range(page_count):
+            yield Document(page_content=reader.pages[page_number].extract_text(), metadata={"source": name, "page": page_number, "total_pages": page_count})
+            if (page_number + 1) % window == 0:
+                # Objects are re-read from the file if a later page refers to them again
+                reader.resolved_objects.clear()
+    finally:
+        stream.close()
+
+def score_page_text(text):
+    """
+    Score how readable the extracted text of a page is.
+
+    Args:
+        text: Text extracted from one page.
+
+    Returns:
+        Float between 0 (empty or pure garbage) and 1 (no unreadable characters).
     """
-    if file_path:
+    stripped = text.strip() if text else ""
+    if not stripped:
+        return 0.0
+
+    # (cid:NN) runs count as garbage in full, not just their digits
+    garbage = sum(len(match) for match in CID_PATTERN.findall(stripped))
+    for char in CID_PATTERN.sub("", stripped):
+        if char == "\ufffd" or (unicodedata.category(char).startswith("C") and char not in "\n\r\t"):
+            garbage += 1
+    return 1.0 - garbage / len(stripped)
+
+def _is_bad_page(score):
+    return score <= 1.0 - GARBAGE_RATIO_LIMIT
+
+class _PlumberFallback:
+    """Re-extracts single pages with pdfplumber, opening the file only if a bad page shows up"""
+
+    def __init__(self, path, data):
+        self.path = path
+        self.data = data
+        self.pdf = None
+        self.unavailable = False
+
+    def extract(self, page_number):
+        if self.unavailable:
+            return None
         try:
-            # Try first with PyPDFLoader
-            print(f"Loading PDF: {file_path}")
-            loader = PyPDFLoader(file_path)
-            documents = loader.load()
-            
-            # If we got empty content, try with PDFPlumberLoader
-            if not documents or all(not doc.page_content.strip() for doc in documents):
-                print("PyPDFLoader returned empty content, trying PDFPlumberLoader")
-                loader = PDFPlumberLoader(file_path)
-                documents = loader.load()
-            
-            # Limit number of pages to avoid token limits
-            if len(documents) > max_pages:
-                print(f"PDF has {len(documents)} pages, limiting to first {max_pages} pages")
-                documents = documents[:max_pages]
-                # Add a note about truncation
-                note = Document(page_content=f"[Note: This document was truncated to {max_pages} pages. The original has {len(documents)} pages.]")
-                documents.append(note)
-                
-            return documents
+            if self.pdf is None:
+                import pdfplumber
+                self.pdf = pdfplumber.open(_open_pdf_input(self.path, self.data))
+            return self.pdf.pages[page_number].extract_text() or ""
+        except ImportError:
+            print("pdfplumber is not installed (pip install -r requirements.txt); unreadable pages are kept as pypdf extracted them")
+            self.unavailable = True
+            return None
         except Exception as e:
-            print(f"Error loading PDF: {e}")
-            # Return a document with error information
-            return [Document(page_content=f"Error loading PDF: {e}")]
-    elif raw_text:
-        # For raw text, create a single document
-        return [Document(page_content=raw_text)]
-    else:
+            print(f"pdfplumber fallback unavailable: {e}")
+            self.unavailable = True
+            return None
+
+    def close(self):
+        if self.pdf is not None:
+            self.pdf.close()
+
+def _stream_pdf_pages(path, data, name, workers=None, reader_window=None):
+    """Yield PDF pages as they are extracted, re-extracting unreadable pages with pdfplumber"""
+    print(f"Loading PDF: {name}")
+    # More processes than cores only adds start-up and pickling
+    workers = min(workers or get_extract_workers(), os.cpu_count() or 1)
+    pages = None
+    if reader_window:
+        # Left alone, the reader keeps every object it has resolved until the parse ends
+        pages = _iter_windowed_pages(path, data, name, reader_window)
+    elif workers > 1:
+        page_count = len(PdfReader(_open_pdf_input(path, data)).pages)
+        if page_count >= PARALLEL_MIN_PAGES:
+            pages = _iter_parallel_pages(path, data, name, page_count, workers)
+    if pages is None:
+        if path is not None:
+            pages = PyPDFLoader(path).lazy_load()
+        else:
+            # Same parser PyPDFLoader uses, fed from memory instead of a temp file
+            pages = PyPDFParser().lazy_parse(Blob.from_data(data, path=name))
+
+    fallback = _PlumberFallback(path, data)
+    try:
+        for index, page in enumerate(pages):
+            score = score_page_text(page.page_content)
+            if _is_bad_page(score):
+                page_number = page.metadata.get("page", index)
+                text = fallback.extract(page_number)
+                # Keep whichever extraction reads better; pdfplumber is not always the winner
+                if text is not None and score_page_text(text) > score:
+                    print(f"Re-extracted page {page_number + 1} with pdfplumber (quality {score:.2f})")
+                    page.page_content = text
+                    page.metadata["extractor"] = "pdfplumber"
+            yield page
+    finally:
+        fallback.close()
+
+class PDFPageIndex:
+    """
+    Page index over a PDF that extracts page text only when it is asked for.
+
+    Opening reads just the cross-reference table, the page tree and the outline,
+    so a 600-page rule opens as fast as a 6-page one. Page text comes from pypdf
+    (with the same pdfplumber fallback for unreadable pages) on first use, and the
+    most recently used pages are kept in memory.
+    """
+
+    def __init__(self, source, max_cached_pages=32):
+        """
+        Args:
+            source: The PDF as a file path, bytes, a BytesIO or a Streamlit UploadedFile.
+            max_cached_pages: Extracted pages kept in memory.
+        """
+        self.path, self.data, self.name = _resolve_source(source)
+        self.reader = PdfReader(_open_pdf_input(self.path, self.data))
+        self.page_count = len(self.reader.pages)
+        self.max_cached_pages = max_cached_pages
+        self._pages = OrderedDict()
+        self._fallback = _PlumberFallback(self.path, self.data)
+        # Pages are read from the Streamlit thread while the worker may still be indexing
+        self._lock = threading.Lock()
+        self.sections = self._outline_ranges()
+
+    def __len__(self):
+        return self.page_count
+
+    def get_page(self, page_number):
+        """Return the Document for one zero-based page, extracting it if needed"""
+        if not 0 <= page_number < self.page_count:
+            raise IndexError(f"Page {page_number} out of range for a {self.page_count}-page document")
+
+        with self._lock:
+            if page_number in self._pages:
+                self._pages.move_to_end(page_number)
+                return self._pages[page_number]
+
+            text = self.reader.pages[page_number].extract_text()
+            metadata = {"source": self.name, "page": page_number, "total_pages": self.page_count}
+            score = score_page_text(text)
+            if _is_bad_page(score):
+                fallback_text = self._fallback.extract(page_number)
+                if fallback_text is not None and score_page_text(fallback_text) > score:
+                    text = fallback_text
+                    metadata["extractor"] = "pdfplumber"
+
+            page = Document(page_content=text, metadata=metadata)
+            self._pages[page_number] = page
+            if len(self._pages) > self.max_cached_pages:
+                self._pages.popitem(last=False)
+            return page
+
+    def get_pages(self, start, end=None):
+        """Return the Documents for pages [start, end)"""
+        end = self.page_count if end is None else min(end, self.page_count)
+        return [self.get_page(i) for i in range(max(start, 0), end)]
+
+    def iter_pages(self, start=0, end=None):
+        """Yield pages [start, end) one at a time"""
+        end = self.page_count if end is None else min(end, self.page_count)
+        for page_number in range(max(start, 0), end):
+            yield self.get_page(page_number)
+
+    def pages_for(self, document):
+        """Return the full pages behind a retrieved chunk or section, using its page metadata"""
+        metadata = document.metadata
+        if "page_start" in metadata:
+            return self.get_pages(metadata["page_start"], metadata.get("page_end", metadata["page_start"]) + 1)
+        if "page" in metadata:
+            return [self.get_page(metadata["page"])]
         return []
+
+    def _outline_ranges(self):
+        """
+        Return the page range of every bookmark in the PDF outline.
+
+        Federal Register and GPO bill PDFs usually carry bookmarks, which makes
+        section lookups possible without extracting any text.
+
+        Returns:
+            List of (title, start_page, end_page) tuples with end_page exclusive.
+        """
+        entries = []
+
+        def walk(items):
+            for item in items:
+                if isinstance(item, list):
+                    walk(item)
+                    continue
+                try:
+                    entries.append((item.title, self.reader.get_destination_page_number(item)))
+                except Exception:
+                    continue
+
+        try:
+            walk(self.reader.outline)
+        except Exception as e:
+            print(f"Could not read PDF outline: {e}")
+        entries.sort(key=lambda entry: entry[1])
+        ranges = []
+        for i, (title, start) in enumerate(entries):
+            end = entries[i + 1][1] if i + 1 < len(entries) else self.page_count
+            ranges.append((title, start, max(end, start + 1)))
+        return ranges
+
+    def find_section_pages(self, heading):
+        """Return the pages of the first outline entry whose title contains heading, or []"""
+        for title, start, end in self.sections:
+            if heading.lower() in title.lower():
+                return self.get_pages(start, end)
+        return []
+
+    def find_numbered_section_pages(self, number, max_pages=None):
+        """Return the first max_pages pages of the outline entry for a section number such as "12" or "54.9802-4", or []"""
+        pattern = re.compile(rf"(?:\bsec(?:tion)?\.?|§)\s*{re.escape(number)}(?![\w.-]*\w)", re.IGNORECASE)
+        for title, start, end in self.sections:
+            if pattern.search(title):
+                return self.get_pages(start, end if max_pages is None else min(end, start + max_pages))
+        return []
+
+    def close(self):
+        self._fallback.close()
+
+def load_page_range(source, start, end=None):
+    """
+    Load only pages [start, end) of a PDF without extracting the rest.
+
+    Args:
+        source: The PDF as a file path, bytes, a BytesIO or a Streamlit UploadedFile.
+        start: First zero-based page to load.
+        end: Page after the last one to load (None for the end of the document).
+
+    Returns:
+        List of Document objects.
+    """
+    index = PDFPageIndex(source)
+    try:
+        return index.get_pages(start, end)
+    finally:
+        index.close()
+
+def _iter_pages(resolved, xml, raw_text, max_chars, max_pages, use_cache, workers, reader_window=None, raise_errors=False):
+    """Yield pages of a resolved (path, data, name) source within the budget, using and filling the parse cache"""
+    if resolved is None:
+        if raw_text:
+            # For raw text, create a single document
+            yield Document(page_content=raw_text)
+        return
+
+    try:
+        path, data, name = resolved
+        content_hash = None
+        pages = None
+        # XML parses faster than the cache can be read back, so it is never cached
+        if use_cache and not xml:
+            content_hash = hash_file(path) if path is not None else hash_bytes(data)
+            pages = get_cached_documents(content_hash, PARSER_VERSION)
+            if pages is not None:
+                print(f"Parse cache hit for {content_hash[:12]}")
+                # The same bytes may arrive under another path or upload name
+                for page in pages:
+                    page.metadata["source"] = name
+
+        # Only a parse that runs to the end is complete enough to cache
+        parsed = []
+        completed = False
+        used_chars = 0
+        count = 0
+        last_page = 0
+        if pages is None:
+            stream = iter_xml_sections(_open_pdf_input(path, data), name) if xml else _stream_pdf_pages(path, data, name, workers, reader_window)
+        for page in pages if pages is not None else stream:
+            if (max_pages is not None and count >= max_pages) or (max_chars is not None and used_chars >= max_chars):
+                unit = "sections" if xml else "pages"
+                print(f"Streaming budget reached after {count} {unit} ({used_chars} characters)")
+                # Numbered like the last page kept, so page-based progress does not jump back
+                yield Document(page_content=f"[Note: This document was truncated after {count} {unit} ({used_chars} characters) because it exceeds the processing budget. Later {unit} were not analyzed.]",
+                               metadata={"source": name, "page": last_page, "truncated": True})
+                break
+            if pages is None and content_hash:
+                parsed.append(page)
+            used_chars += len(page.page_content)
+            count += 1
+            last_page = page.metadata.get("page_end", page.metadata.get("page", last_page))
+            yield page
+        else:
+            completed = True
+
+        if completed and pages is None and content_hash and parsed:
+            store_documents(content_hash, PARSER_VERSION, parsed)
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error loading document: {e}")
+        # Return a document with error information
+        yield Document(page_content=f"Error loading document: {e}")
+
+def iter_document_pages(source=None, raw_text=None, max_chars=DEFAULT_CHAR_BUDGET, max_pages=None, use_cache=True, collect_into=None, workers=None, by_section=False, normalize=True, normalize_stats=None, reader_window=None, raise_errors=False):
+    """
+    Yield a document page by page as it is extracted.
+
+    Downstream chunking and embedding can start on the first page while later pages
+    are still being parsed. When the character or page budget runs out a note
+    Document is yielded so the truncation is visible to the reader and the LLM.
+    USLM and Federal Register XML sources skip PDF extraction and always yield
+    sections (see load_xml_document).
+
+    Args:
+        source: The PDF as a file path, bytes, a BytesIO or a Streamlit UploadedFile.
+        raw_text: Raw text content.
+        max_chars: Stop after this many characters of page text (None for no limit).
+        max_pages: Stop after this many pages (None for no limit).
+        use_cache: Reuse pages parsed earlier from a file with identical bytes.
+        collect_into: Optional list that receives every yielded Document, for callers
+            that need the pages after the stream has been consumed.
+        workers: Extraction processes for large PDFs (default from PDF_EXTRACT_WORKERS).
+        by_section: Yield one Document per bill or Federal Register section (with
+            section_id and heading_path metadata) instead of one per page.
+        normalize: Strip running headers, line-break hyphens, footnote markers and
+            extra whitespace before the text is chunked and embedded.
+        normalize_stats: Optional dict that receives the tokens saved by normalization.
+        reader_window: Extract serially and drop the PDF reader's object cache every
+            this many pages, so memory stays flat on very long documents (None to keep it).
+        raise_errors: Raise parse errors instead of yielding an "Error loading document"
+            Document, for callers that must not index the error text.
+
+    Yields:
+        Document objects.
+    """
+    # Resolved once: reading a file-like source a second time would return nothing
+    try:
+        resolved = _resolve_source(source) if source else None
+        structured = resolved is not None and _is_xml(resolved[0], resolved[1])
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error loading document: {e}")
+        documents = [Document(page_content=f"Error loading document: {e}")]
+    else:
+        documents = _iter_pages(resolved, structured, raw_text, max_chars, max_pages, use_cache, workers, reader_window, raise_errors)
+        # XML arrives as clean sections already, without running headers or page breaks
+        if normalize and not structured:
+            documents = iter_normalized_pages(documents, stats=normalize_stats)
+        if by_section and not structured:
+            documents = iter_sections(documents)
+    for doc in documents:
+        if collect_into is not None:
+            collect_into.append(doc)
+        yield doc
+
+def load_and_split_document(source=None, raw_text=None, max_pages=None, use_cache=True, max_chars=DEFAULT_CHAR_BUDGET, workers=None, by_section=False, normalize=True):
+    """
+    Load and split a document from a file path or raw text.
+
+    Args:
+        source: The PDF as a file path, bytes, a BytesIO or a Streamlit UploadedFile.
+        raw_text: Raw text content.
+        max_pages: Optional hard limit on the number of pages to process from a PDF.
+        use_cache: Reuse pages parsed earlier from a file with identical bytes.
+        max_chars: Character budget for the document (to avoid token limits).
+        workers: Extraction processes for large PDFs (default from PDF_EXTRACT_WORKERS).
+        by_section: Return one Document per legal section instead of one per page.
+        normalize: Strip running headers, line-break hyphens and extra whitespace.
+
+    Returns:
+        List of Document objects.
+    """
+    return list(iter_document_pages(source, raw_text, max_chars=max_chars, max_pages=max_pages, use_cache=use_cache, workers=workers, by_section=by_section, normalize=normalize))
+
+def load_xml_document(source, max_chars=None):
+    """
+    Load a USLM bill or Federal Register XML document as section Documents.
+
+    The XML is streamed with iterparse straight into sections, which is both
+    faster and more faithful than extracting the printed PDF of the same text.
+
+    Args:
+        source: The XML as a file path, bytes, a BytesIO or a Streamlit UploadedFile.
+        max_chars: Character budget for the document (None for no limit).
+
+    Returns:
+        List of Document objects, one per section.
+    """
+    return list(iter_document_pages(source, max_chars=max_chars, use_cache=False, normalize=False))
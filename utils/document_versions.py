@@ -0,0 +1,389 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+import numpy as np
+
+# Store lives next to the parse cache at the project root unless overridden
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".document_versions")
+DEFAULT_MAX_BYTES = 500 * 1024 * 1024
+
+# Share of a new version's units that must match an existing record for it to count as an amendment
+LINEAGE_MIN_OVERLAP = 0.5
+
+# Size and last use of every stored unit, so eviction never has to walk the store
+UNITS_INDEX_NAME = "units_index.json"
+
+# Records by the units of their latest version and by title, so matching a new version reads one record
+RECORDS_INDEX_NAME = "records_index.json"
+
+_index_lock = threading.Lock()
+
+
+def get_store_dir(*parts):
+    """Return a directory of the version store (DOCUMENT_VERSIONS_DIR), creating it if needed"""
+    store_dir = os.path.join(os.getenv("DOCUMENT_VERSIONS_DIR", DEFAULT_STORE_DIR), *parts)
+    os.makedirs(store_dir, exist_ok=True)
+    return store_dir
+
+
+def get_max_bytes():
+    """Return the size limit of the stored chunks and embeddings in bytes"""
+    try:
+        return int(os.getenv("DOCUMENT_VERSIONS_MAX_BYTES", DEFAULT_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def unit_hash(text):
+    """Return the content hash of one page or section"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def pipeline_key(splitter, embeddings):
+    """Identify the chunking and embedding settings that stored chunks were produced with"""
+    settings = [
+        type(splitter).__name__,
+        getattr(splitter, "_chunk_size", None),
+        getattr(splitter, "_chunk_overlap", None),
+        type(embeddings).__name__,
+        getattr(embeddings, "model", None),
+        getattr(embeddings, "dimensions", None),
+    ]
+    return hashlib.sha256(repr(settings).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_title(name):
+    """Return the comparable title of a file name (lowercase words of its stem, e.g. "hr 1 final")"""
+    stem = os.path.splitext(os.path.basename(name))[0].lower()
+    return " ".join(re.findall(r"[a-z0-9]+", stem))
+
+
+def _unit_summary(hash_value, metadata):
+    summary = {"hash": hash_value}
+    for key in ("section_id", "heading", "page", "page_start", "page_end"):
+        if key in metadata:
+            summary[key] = metadata[key]
+    return summary
+
+
+class DocumentVersions:
+    """
+    Reuses the chunks and embeddings of unchanged pages or sections across versions.
+
+    Each unit of a document is hashed as it is indexed. Units seen before (in any
+    earlier version, with the same splitter and embedding model) come back with
+    their chunk texts and vectors, so an amended bill only re-chunks and re-embeds
+    the parts that changed. commit() then appends the version to the document's
+    record.
+    """
+
+    def __init__(self, splitter, embeddings):
+        self.pipeline = pipeline_key(splitter, embeddings)
+        self.units_dir = get_store_dir("units", self.pipeline)
+        self.units = []
+        self.reused = 0
+        self.source = None
+        # Units read or written by this ingestion, recorded in the units index on commit
+        self.used = set()
+        self.added = {}
+
+    def _unit_paths(self, hash_value):
+        base = os.path.join(self.units_dir, hash_value)
+        return base + ".json", base + ".npy"
+
+    def lookup(self, unit):
+        """
+        Look up the chunks of a page or section indexed in an earlier version.
+
+        Args:
+            unit: The page or section Document.
+
+        Returns:
+            tuple: (chunk texts, embedding vectors), or None if the unit is new.
+        """
+        hash_value = unit_hash(unit.page_content)
+        self.units.append(_unit_summary(hash_value, unit.metadata))
+        self.source = self.source or unit.metadata.get("source")
+
+        texts_path, vectors_path = self._unit_paths(hash_value)
+        if not os.path.exists(texts_path) or not os.path.exists(vectors_path):
+            return None
+        try:
+            with open(texts_path, "r") as f:
+                texts = json.load(f)
+            vectors = np.load(vectors_path).tolist()
+        except Exception as e:
+            print(f"Failed to read stored chunks for unit {hash_value[:12]}: {e}")
+            return None
+        if len(texts) != len(vectors):
+            return None
+        self.reused += 1
+        self.used.add(hash_value)
+        return texts, vectors
+
+    def store(self, unit, texts, vectors):
+        """Save the chunk texts and embeddings of a newly indexed unit"""
+        hash_value = unit_hash(unit.page_content)
+        texts_path, vectors_path = self._unit_paths(hash_value)
+        try:
+            # Vectors first, so a unit with a texts file always has its vectors
+            np.save(vectors_path + ".tmp.npy", np.asarray(vectors, dtype=np.float32))
+            os.replace(vectors_path + ".tmp.npy", vectors_path)
+            with open(texts_path + ".tmp", "w") as f:
+                json.dump(texts, f)
+            os.replace(texts_path + ".tmp", texts_path)
+            self.added[hash_value] = os.path.getsize(texts_path) + os.path.getsize(vectors_path)
+        except Exception as e:
+            print(f"Failed to store chunks for unit {os.path.basename(texts_path)}: {e}")
+
+    def commit(self):
+        """
+        Append this ingestion to the versioned record of its document.
+
+        A record is matched by the share of units it has in common with an earlier
+        version, so a re-uploaded amendment with a new name still joins its bill's
+        history. A record with the same normalized title also matches when it
+        shares any unit, but two unrelated uploads both named "bill.pdf" never
+        share a record. New records are keyed by the content of their first version.
+
+        Returns:
+            dict: The version entry (doc_id, version, units, reused_units, ...), or
+                None if nothing was indexed.
+        """
+        if not self.units:
+            return None
+
+        hashes = [unit["hash"] for unit in self.units]
+        record = self._find_record(hashes)
+        if record is None:
+            name = self.source or "pasted text"
+            record = {"doc_id": unit_hash("".join(hashes))[:16], "name": name,
+                      "title": normalize_title(name) if self.source else None, "versions": []}
+
+        previous = set(record["versions"][-1]["unit_hashes"]) if record["versions"] else set()
+        version = {
+            "version": len(record["versions"]) + 1,
+            "content_hash": unit_hash("".join(hashes)),
+            "created": time.time(),
+            "source": self.source,
+            "unit_hashes": hashes,
+            "units": self.units,
+            "reused_units": self.reused,
+            "new_units": len(self.units) - self.reused,
+            "changed_from_previous": sum(1 for h in hashes if h not in previous) if previous else None,
+        }
+        if record["versions"] and record["versions"][-1]["content_hash"] == version["content_hash"]:
+            # Same content indexed again, e.g. by another page of the app
+            version = record["versions"][-1]
+        else:
+            record["versions"].append(version)
+            _write_record(record)
+            _update_records_index(record, previous)
+
+        print(f"Document {record['name']} version {version['version']}: reused {self.reused} of "
+              f"{len(self.units)} sections or pages, processed {len(self.units) - self.reused}")
+        _update_units_index(self.pipeline, self.used, self.added, get_max_bytes())
+        return {"doc_id": record["doc_id"], **{k: v for k, v in version.items() if k != "unit_hashes"}}
+
+    def _find_record(self, hashes):
+        title = normalize_title(self.source) if self.source else None
+        unit_set = set(hashes)
+        with _index_lock:
+            index = _read_records_index()
+        # Units shared with each record's latest version, counted from the index alone
+        shared = Counter(doc_id for hash_value in unit_set for doc_id in index["units"].get(hash_value, ()))
+        same_title = set(index["titles"].get(title, ())) if title else set()
+        best, best_overlap = None, 0.0
+        for doc_id in sorted(shared):
+            overlap = shared[doc_id] / len(unit_set)
+            if doc_id in same_title:
+                # Same title and related content; an amendment may have changed most units
+                overlap += 1.0
+            if overlap > best_overlap:
+                best, best_overlap = doc_id, overlap
+        return get_document_record(best) if best_overlap >= LINEAGE_MIN_OVERLAP else None
+
+
+def _record_path(doc_id):
+    return os.path.join(get_store_dir("records"), f"{doc_id}.json")
+
+
+def _write_record(record):
+    path = _record_path(record["doc_id"])
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump(record, f)
+        os.replace(path + ".tmp", path)
+    except Exception as e:
+        print(f"Failed to write document record {path}: {e}")
+
+
+def get_document_record(doc_id):
+    """Return the versioned record of a document, or None if it was never indexed"""
+    path = _record_path(doc_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"Failed to read document record {path}: {e}")
+        return None
+
+
+def list_document_records():
+    """Return every versioned document record"""
+    records_dir = get_store_dir("records")
+    records = []
+    for name in sorted(os.listdir(records_dir)):
+        if name.endswith(".json"):
+            record = get_document_record(name[:-len(".json")])
+            if record is not None:
+                records.append(record)
+    return records
+
+
+def _records_index_path():
+    return os.path.join(get_store_dir(), RECORDS_INDEX_NAME)
+
+
+def _index_record(index, record, previous=()):
+    """Point the index at the latest version of a record instead of the one before it"""
+    doc_id = record["doc_id"]
+    for hash_value in previous:
+        doc_ids = index["units"].get(hash_value, [])
+        if doc_id in doc_ids:
+            doc_ids.remove(doc_id)
+            if not doc_ids:
+                del index["units"][hash_value]
+    latest = record["versions"][-1]["unit_hashes"] if record["versions"] else []
+    for hash_value in set(latest):
+        doc_ids = index["units"].setdefault(hash_value, [])
+        if doc_id not in doc_ids:
+            doc_ids.append(doc_id)
+    title = record.get("title", normalize_title(record["name"]))
+    if title:
+        doc_ids = index["titles"].setdefault(title, [])
+        if doc_id not in doc_ids:
+            doc_ids.append(doc_id)
+
+
+def _read_records_index():
+    """Return the records index, rebuilding it from the records once if it is missing"""
+    path = _records_index_path()
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Failed to read the records index, rebuilding it: {e}")
+
+    # A store written before the index existed
+    index = {"units": {}, "titles": {}}
+    for record in list_document_records():
+        _index_record(index, record)
+    _write_index(path, index)
+    return index
+
+
+def _update_records_index(record, previous):
+    """Record the latest version of a record; previous holds the unit hashes of the version before"""
+    with _index_lock:
+        index = _read_records_index()
+        _index_record(index, record, previous)
+        _write_index(_records_index_path(), index)
+
+
+def _write_index(path, index):
+    try:
+        with open(path + ".tmp", "w") as f:
+            json.dump(index, f)
+        os.replace(path + ".tmp", path)
+    except Exception as e:
+        print(f"Failed to write {os.path.basename(path)}: {e}")
+
+
+def _units_index_path():
+    return os.path.join(get_store_dir(), UNITS_INDEX_NAME)
+
+
+def _read_units_index():
+    """Return the units index, rebuilding it from the files once if it is missing"""
+    path = _units_index_path()
+    if os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Failed to read the units index, rebuilding it: {e}")
+
+    # A store written before the index existed
+    units = {}
+    units_root = get_store_dir("units")
+    for pipeline in os.listdir(units_root):
+        pipeline_dir = os.path.join(units_root, pipeline)
+        for name in os.listdir(pipeline_dir) if os.path.isdir(pipeline_dir) else []:
+            try:
+                stat = os.stat(os.path.join(pipeline_dir, name))
+            except OSError:
+                continue
+            key = f"{pipeline}/{name.split('.')[0]}"
+            last_used, size = units.get(key, (0.0, 0))
+            units[key] = [max(last_used, stat.st_mtime), size + stat.st_size]
+    return {"total_bytes": sum(size for _, size in units.values()), "units": units}
+
+
+def _write_units_index(index):
+    _write_index(_units_index_path(), index)
+
+
+def _remove_unit(key):
+    pipeline, hash_value = key.split("/")
+    base = os.path.join(get_store_dir("units"), pipeline, hash_value)
+    for path in (base + ".json", base + ".npy"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _evict(index, max_bytes):
+    # Least recently used first; records are kept
+    for key, (_, size) in sorted(index["units"].items(), key=lambda item: item[1][0]):
+        if index["total_bytes"] <= max_bytes:
+            break
+        _remove_unit(key)
+        del index["units"][key]
+        index["total_bytes"] -= size
+
+
+def _update_units_index(pipeline, used, added, max_bytes):
+    """Record the units an ingestion read or wrote, then evict down to max_bytes"""
+    now = time.time()
+    with _index_lock:
+        index = _read_units_index()
+        for hash_value in used:
+            entry = index["units"].get(f"{pipeline}/{hash_value}")
+            if entry is not None:
+                entry[0] = now
+        for hash_value, size in added.items():
+            key = f"{pipeline}/{hash_value}"
+            _, previous = index["units"].get(key, (now, 0))
+            index["units"][key] = [now, size]
+            index["total_bytes"] += size - previous
+        if index["total_bytes"] > max_bytes:
+            _evict(index, max_bytes)
+        _write_units_index(index)
+
+
+def evict_to_size(max_bytes):
+    """Remove the least recently used stored units until they fit in max_bytes (records are kept)"""
+    with _index_lock:
+        index = _read_units_index()
+        if index["total_bytes"] > max_bytes:
+            _evict(index, max_bytes)
+        _write_units_index(index)
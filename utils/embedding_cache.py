@@ -0,0 +1,224 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Cache lives next to the parse cache at the project root unless overridden
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".embedding_cache", "embeddings.sqlite")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+# Keys looked up per SELECT; stays well under SQLite's bound-parameter limit
+LOOKUP_BATCH = 500
+
+# Query vectors kept in memory per process, so repeated questions skip SQLite too
+QUERY_CACHE_SIZE = 2048
+
+_schema_lock = threading.Lock()
+_initialized = set()
+_query_cache = OrderedDict()
+_query_lock = threading.Lock()
+
+
+def get_cache_path():
+    """Return the embedding cache database path from EMBEDDING_CACHE_PATH, creating its directory"""
+    path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_CACHE_PATH)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+
+def get_max_bytes():
+    """Return the size limit of the cached vectors in bytes"""
+    try:
+        return int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def _connect(path):
+    # A connection per call: the cache is used from Streamlit script threads,
+    # the ingestion workers and bulk-ingest processes at the same time
+    conn = sqlite3.connect(path, timeout=30)
+    with _schema_lock:
+        if path not in _initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, "
+                "size INTEGER NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            conn.commit()
+            _initialized.add(path)
+    return conn
+
+
+def normalize_query(text):
+    """Collapse whitespace and case, so trivially different spellings share one query embedding"""
+    return " ".join(text.split()).casefold()
+
+
+def model_key(embeddings):
+    """Identify the embedding model, so vectors of different models never mix"""
+    return f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}:{getattr(embeddings, 'dimensions', '') or ''}"
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed, persistent cache around a LangChain embeddings object.
+
+    Vectors are stored as float32 in SQLite keyed by (embedding model, SHA-256
+    of the text), so a chunk or question that was embedded before, by any chain,
+    session or bulk-ingest run, never goes to the embeddings API again. The least
+    recently used vectors are evicted once the cache outgrows its size limit.
+    Query vectors are also kept in an in-memory LRU keyed by normalized text.
+    """
+
+    def __init__(self, embeddings, path=None, max_bytes=None):
+        """
+        Args:
+            embeddings: The embeddings object to cache (e.g. OpenAIEmbeddings).
+            path (str, optional): SQLite file (default from EMBEDDING_CACHE_PATH).
+            max_bytes (int, optional): Size limit (default from EMBEDDING_CACHE_MAX_BYTES).
+        """
+        self.embeddings = embeddings
+        self.path = path or get_cache_path()
+        self.max_bytes = max_bytes if max_bytes is not None else get_max_bytes()
+        self.namespace = model_key(embeddings)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        return getattr(self.embeddings, "model", None)
+
+    @property
+    def dimensions(self):
+        return getattr(self.embeddings, "dimensions", None)
+
+    def _key(self, text, kind):
+        return hashlib.sha256(f"{self.namespace}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _lookup(self, keys):
+        found = {}
+        try:
+            conn = _connect(self.path)
+            try:
+                for i in range(0, len(keys), LOOKUP_BATCH):
+                    batch = keys[i:i + LOOKUP_BATCH]
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    found.update((key, np.frombuffer(vector, dtype=np.float32).tolist()) for key, vector in rows)
+                if found:
+                    now = time.time()
+                    conn.executemany("UPDATE embeddings SET last_used = ? WHERE key = ?", [(now, key) for key in found])
+                    conn.commit()
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Embedding cache lookup failed: {e}")
+        return found
+
+    def _store(self, entries):
+        try:
+            conn = _connect(self.path)
+            try:
+                now = time.time()
+                rows = []
+                for key, vector in entries:
+                    blob = np.asarray(vector, dtype=np.float32).tobytes()
+                    rows.append((key, self.namespace, blob, len(blob), now))
+                conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", rows)
+                conn.commit()
+                self._evict(conn)
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Embedding cache write failed: {e}")
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM embeddings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        # Drop the least recently used rows until enough bytes are freed
+        keys = []
+        for key, size in conn.execute("SELECT key, size FROM embeddings ORDER BY last_used"):
+            keys.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM embeddings WHERE key = ?", keys)
+        conn.commit()
+        print(f"Evicted {len(keys)} cached embeddings")
+
+    def _embed(self, texts, kind, embed_fn):
+        keys = [self._key(text, kind) for text in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        self.hits += len(keys) - sum(1 for key in keys if key not in found)
+        self.misses += len(missing)
+
+        if missing:
+            by_key = dict(zip(keys, texts))
+            vectors = embed_fn([by_key[key] for key in missing])
+            new_entries = list(zip(missing, vectors))
+            self._store(new_entries)
+            found.update(new_entries)
+        return [list(found[key]) for key in keys]
+
+    def embed_documents(self, texts):
+        return self._embed(list(texts), "document", self.embeddings.embed_documents)
+
+    def _remember_queries(self, keys, vectors):
+        with _query_lock:
+            for key, vector in zip(keys, vectors):
+                _query_cache[key] = vector
+                _query_cache.move_to_end(key)
+            while len(_query_cache) > QUERY_CACHE_SIZE:
+                _query_cache.popitem(last=False)
+
+    def embed_query(self, text):
+        key = (self.namespace, normalize_query(text))
+        with _query_lock:
+            vector = _query_cache.get(key)
+            if vector is not None:
+                _query_cache.move_to_end(key)
+        if vector is not None:
+            self.hits += 1
+            return list(vector)
+        vector = self._embed([" ".join(text.split())], "query", lambda batch: [self.embeddings.embed_query(batch[0])])[0]
+        self._remember_queries([key], [vector])
+        return vector
+
+    def warm_queries(self, texts):
+        """
+        Embed questions ahead of time into the in-memory query cache.
+
+        Questions already in the persistent cache are read in one lookup; only
+        the others are sent to the embeddings model.
+
+        Args:
+            texts (iterable): Questions users are likely to ask, e.g. suggested follow-ups.
+        """
+        texts = list(dict.fromkeys(" ".join(text.split()) for text in texts))
+        if not texts:
+            return
+        vectors = self._embed(texts, "query", lambda batch: [self.embeddings.embed_query(text) for text in batch])
+        self._remember_queries([(self.namespace, normalize_query(text)) for text in texts], vectors)
+
+
+def clear_cache(path=None):
+    """Delete every cached embedding"""
+    with _query_lock:
+        _query_cache.clear()
+    conn = _connect(path or get_cache_path())
+    try:
+        conn.execute("DELETE FROM embeddings")
+        conn.commit()
+    finally:
+        conn.close()
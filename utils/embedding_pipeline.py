@@ -0,0 +1,117 @@
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Tokens packed into one embeddings request; several requests are sent at once
+DEFAULT_BATCH_TOKENS = 8000
+DEFAULT_MAX_IN_FLIGHT = 4
+
+# Backoff after a rate limit, doubled per retry of the same batch
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+MAX_RETRIES = 6
+
+# Successful requests in a row before a throttled dispatcher allows one more in flight
+RECOVERY_SUCCESSES = 8
+
+
+def get_batch_tokens():
+    """Return the token budget of one embeddings request from EMBED_BATCH_TOKENS"""
+    try:
+        return max(1, int(os.getenv("EMBED_BATCH_TOKENS", DEFAULT_BATCH_TOKENS)))
+    except ValueError:
+        return DEFAULT_BATCH_TOKENS
+
+
+def get_max_in_flight():
+    """Return the number of concurrent embeddings requests from EMBED_MAX_IN_FLIGHT"""
+    try:
+        return max(1, int(os.getenv("EMBED_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)))
+    except ValueError:
+        return DEFAULT_MAX_IN_FLIGHT
+
+
+def is_rate_limit_error(error):
+    """Return True for HTTP 429 / rate-limit errors of the OpenAI client or similar SDKs"""
+    if getattr(error, "status_code", None) == 429 or getattr(error, "status", None) == 429:
+        return True
+    return "ratelimit" in type(error).__name__.lower()
+
+
+class EmbeddingDispatcher:
+    """
+    Sends embedding batches concurrently and backs off on rate limits.
+
+    Up to max_in_flight requests run at once. A rate-limited request halves the
+    number allowed in flight and is retried after an exponential, jittered
+    delay; the limit grows back by one after a run of successful requests.
+    """
+
+    def __init__(self, embeddings, max_in_flight=None, max_retries=MAX_RETRIES):
+        """
+        Args:
+            embeddings: LangChain embeddings object.
+            max_in_flight (int, optional): Concurrent requests (default from EMBED_MAX_IN_FLIGHT).
+            max_retries (int, optional): Retries of one batch after rate limits before giving up.
+        """
+        self.embeddings = embeddings
+        self.max_in_flight = max_in_flight or get_max_in_flight()
+        self.max_retries = max_retries
+        self.limit = self.max_in_flight
+        self.in_flight = 0
+        self.successes = 0
+        self.rate_limited = 0
+        self._condition = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embedding")
+
+    def _acquire(self):
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+
+    def _release(self, rate_limited):
+        with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.rate_limited += 1
+                self.successes = 0
+                self.limit = max(1, self.limit // 2)
+            else:
+                self.successes += 1
+                if self.limit < self.max_in_flight and self.successes >= RECOVERY_SUCCESSES:
+                    self.limit += 1
+                    self.successes = 0
+            self._condition.notify_all()
+
+    def _embed(self, texts):
+        for attempt in range(self.max_retries + 1):
+            self._acquire()
+            try:
+                vectors = self.embeddings.embed_documents(texts)
+            except Exception as e:
+                self._release(rate_limited=is_rate_limit_error(e))
+                if not is_rate_limit_error(e) or attempt == self.max_retries:
+                    raise
+                delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"Embeddings rate limited; retrying {len(texts)} chunks in {delay:.1f}s "
+                      f"with {self.limit} requests in flight")
+                time.sleep(delay)
+                continue
+            self._release(rate_limited=False)
+            return vectors
+
+    def submit(self, texts):
+        """Queue one batch of texts and return a Future of their vectors"""
+        return self._executor.submit(self._embed, texts)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
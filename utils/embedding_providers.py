@@ -0,0 +1,144 @@
+import math
+import os
+import re
+import threading
+import zlib
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from utils.embedding_cache import CachedEmbeddings
+
+# Backends selectable in the Settings page and by bulk ingest
+EMBEDDING_PROVIDERS = {
+    "openai": "OpenAI API",
+    "local": "Local model on CPU (sentence-transformers)",
+    "hashing": "Offline hashing (no model download)",
+}
+
+# Small sentence-embedding model that runs at a usable speed on a laptop CPU
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+LOCAL_BATCH_SIZE = 64
+
+HASHING_DIMENSIONS = 1024
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.'-][a-z0-9]+)*")
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def get_default_provider():
+    """Return the embedding provider from EMBEDDING_PROVIDER (openai unless set)"""
+    provider = os.getenv("EMBEDDING_PROVIDER", "openai")
+    return provider if provider in EMBEDDING_PROVIDERS else "openai"
+
+
+def local_model_available():
+    """Return True if sentence-transformers is installed"""
+    try:
+        import sentence_transformers  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _load_model(model_name):
+    # One copy of the model per process, shared by every session and ingestion thread
+    with _model_lock:
+        if model_name not in _models:
+            try:
+                from sentence_transformers import SentenceTransformer
+            except ImportError:
+                raise ImportError("Local embeddings need sentence-transformers: pip install -r requirements-local.txt") from None
+            print(f"Loading local embedding model {model_name}")
+            _models[model_name] = SentenceTransformer(model_name, device="cpu")
+        return _models[model_name]
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    Sentence-transformers model run on the CPU in batches.
+
+    The model is downloaded once on first use (or read from a local path) and
+    needs no network afterwards.
+    """
+
+    def __init__(self, model_name=None, batch_size=LOCAL_BATCH_SIZE):
+        """
+        Args:
+            model_name (str, optional): Model name or path (default from LOCAL_EMBEDDING_MODEL).
+            batch_size (int, optional): Texts encoded per forward pass.
+        """
+        self.model = model_name or os.getenv("LOCAL_EMBEDDING_MODEL", DEFAULT_LOCAL_MODEL)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts):
+        if not texts:
+            return []
+        vectors = _load_model(self.model).encode(list(texts), batch_size=self.batch_size,
+                                                  normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32).tolist()
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class HashingEmbeddings(Embeddings):
+    """
+    Dependency-free embeddings from hashed word and word-pair counts.
+
+    Each text becomes a signed feature-hashing vector of log-scaled term counts,
+    normalized to unit length, so nearest neighbours are the texts sharing the
+    most words. Vectors depend only on the text itself and stay valid in the
+    caches as the corpus grows, which rules out corpus-wide IDF weights.
+    """
+
+    def __init__(self, dimensions=HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.model = f"hashing-{dimensions}"
+
+    def _vector(self, text):
+        words = _TOKEN_RE.findall(text.lower())
+        counts = {}
+        for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+            counts[feature] = counts.get(feature, 0) + 1
+
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for feature, count in counts.items():
+            # crc32 is stable across processes, unlike hash()
+            h = zlib.crc32(feature.encode("utf-8"))
+            vector[h % self.dimensions] += (1.0 + math.log(count)) * (1 if h & 0x80000000 else -1)
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._vector(text)
+
+
+def get_embeddings(provider=None, openai_api_key=None):
+    """
+    Create the embeddings object used by the chains, wrapped in the persistent cache.
+
+    Args:
+        provider (str, optional): "openai", "local" or "hashing" (default from EMBEDDING_PROVIDER).
+        openai_api_key (str, optional): API key for the openai provider.
+
+    Returns:
+        CachedEmbeddings: The selected backend. "local" falls back to "hashing"
+            when sentence-transformers is not installed.
+    """
+    provider = provider or get_default_provider()
+    if provider == "local" and not local_model_available():
+        print("sentence-transformers is not installed; using offline hashing embeddings")
+        provider = "hashing"
+
+    if provider == "local":
+        embeddings = LocalEmbeddings()
+    elif provider == "hashing":
+        embeddings = HashingEmbeddings()
+    else:
+        embeddings = OpenAIEmbeddings(openai_api_key=openai_api_key)
+    return CachedEmbeddings(embeddings)
@@ -0,0 +1,160 @@
+import math
+import re
+import faiss
+import numpy as np
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.vectorstores import VectorStore
+
+# Keeps citations and defined terms whole: "54.9802-4", "u.s.c", "300gg-11", "ichra"
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/§][a-z0-9]+)*")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Reciprocal rank fusion constant; larger values flatten the rank differences
+RRF_K = 60
+
+
+def tokenize(text):
+    """Return the lowercase search terms of a text"""
+    return TOKEN_RE.findall(text.lower())
+
+
+class LexicalIndex:
+    """
+    Compact in-memory inverted index with BM25 scoring.
+
+    Postings are stored in CSR form: one int32 array of chunk ids and one
+    float32 array of term frequencies, sliced per term through an offsets
+    array, so a 10k-chunk document costs a few MB and a query touches only
+    the postings of its own terms.
+    """
+
+    def __init__(self, texts):
+        """
+        Args:
+            texts (list): Chunk texts; a chunk's id is its position in the list.
+        """
+        vocabulary = {}
+        term_ids = []
+        chunk_ids = []
+        counts = []
+        lengths = np.zeros(len(texts), dtype=np.float32)
+        for chunk_id, text in enumerate(texts):
+            tokens = tokenize(text)
+            lengths[chunk_id] = len(tokens)
+            tf = {}
+            for token in tokens:
+                tf[token] = tf.get(token, 0) + 1
+            for token, count in tf.items():
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+                chunk_ids.append(chunk_id)
+                counts.append(count)
+
+        term_ids = np.asarray(term_ids, dtype=np.int32)
+        order = np.argsort(term_ids, kind="stable")
+        self.vocabulary = vocabulary
+        self.chunk_ids = np.asarray(chunk_ids, dtype=np.int32)[order]
+        self.counts = np.asarray(counts, dtype=np.float32)[order]
+        self.offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids, minlength=len(vocabulary)), out=self.offsets[1:])
+        self.size = len(texts)
+        # Precomputed BM25 length normalization per chunk
+        average = lengths.mean() if len(texts) else 0.0
+        self.norms = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average) if average else np.full(len(texts), BM25_K1, dtype=np.float32)
+
+    @property
+    def nbytes(self):
+        """Approximate size of the postings arrays in bytes"""
+        return self.chunk_ids.nbytes + self.counts.nbytes + self.offsets.nbytes + self.norms.nbytes
+
+    def idf(self, token):
+        """Return the BM25 inverse document frequency of a term, or None if no chunk contains it"""
+        term_id = self.vocabulary.get(token)
+        if term_id is None:
+            return None
+        df = int(self.offsets[term_id + 1] - self.offsets[term_id])
+        return math.log(1 + (self.size - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=10):
+        """
+        Score chunks against a query with BM25.
+
+        Args:
+            query (str): Query text.
+            k (int, optional): Number of results.
+
+        Returns:
+            list: (chunk id, score) pairs, best first; chunks without a query term are left out.
+        """
+        scores = np.zeros(self.size, dtype=np.float32)
+        matched = False
+        for token in set(tokenize(query)):
+            term_id = self.vocabulary.get(token)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            ids = self.chunk_ids[start:end]
+            tf = self.counts[start:end]
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            # Chunk ids are unique within one term's postings, so plain fancy indexing adds correctly
+            scores[ids] += idf * tf * (BM25_K1 + 1) / (tf + self.norms[ids])
+            matched = True
+        if not matched:
+            return []
+
+        k = min(k, self.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Fuses BM25 matches with FAISS similarity search by reciprocal rank.
+
+    Exact terms such as "ICHRA" or "26 CFR 54.9802-4" are found by the lexical
+    stage even when the embedding misses them, and chunks both stages agree on
+    rank first.
+    """
+
+    vectorstore: VectorStore
+    lexical: LexicalIndex
+    chunks: list
+    k: int = 5
+    fetch_k: int = 20
+    lexical_weight: float = 1.0
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, k=5, fetch_k=20, lexical_weight=1.0):
+        """
+        Build the inverted index over every chunk in a FAISS vectorstore.
+
+        Args:
+            vectorstore: FAISS vectorstore, e.g. from chains.indexing.build_vectorstore.
+            k (int, optional): Chunks returned per query.
+            fetch_k (int, optional): Candidates taken from each stage before fusion.
+            lexical_weight (float, optional): Weight of the BM25 ranking relative to the vector ranking.
+
+        Returns:
+            HybridRetriever
+        """
+        chunks = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]) for i in range(vectorstore.index.ntotal)]
+        lexical = LexicalIndex([chunk.page_content for chunk in chunks])
+        return cls(vectorstore=vectorstore, lexical=lexical, chunks=chunks, k=k, fetch_k=fetch_k,
+                   lexical_weight=lexical_weight)
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        fused = {}
+        # FAISS ids equal the docstore positions the lexical index was built from
+        vector = np.asarray([self.vectorstore._embed_query(query)], dtype=np.float32)
+        if getattr(self.vectorstore, "_normalize_L2", False):
+            faiss.normalize_L2(vector)
+        _, ids = self.vectorstore.index.search(vector, min(self.fetch_k, len(self.chunks)))
+        for rank, chunk_id in enumerate(i for i in ids[0] if i >= 0):
+            fused[int(chunk_id)] = 1.0 / (RRF_K + rank + 1)
+        for rank, (chunk_id, _) in enumerate(self.lexical.search(query, self.fetch_k)):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + self.lexical_weight / (RRF_K + rank + 1)
+
+        best = sorted(fused, key=fused.get, reverse=True)[:self.k]
+        return [self.chunks[chunk_id] for chunk_id in best]
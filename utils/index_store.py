@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import shutil
+import uuid
+import faiss
+from langchain.schema import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from utils.document_parser import PARSER_VERSION
+from utils.document_versions import pipeline_key
+from utils.legal_sections import SEGMENTER_VERSION
+from utils.text_normalizer import NORMALIZER_VERSION
+
+# Store lives next to the parse cache at the project root unless overridden
+DEFAULT_STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".index_store")
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+INDEX_NAME = "index.faiss"
+DOCSTORE_NAME = "docstore.json"
+
+# Flat indexes are mapped straight from disk instead of copied into memory
+# (IO_FLAG_MMAP_IFC needs faiss >= 1.8; older versions fall back to IO_FLAG_MMAP)
+MMAP_FLAGS = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+
+
+def get_store_dir():
+    """Return the index store directory from INDEX_STORE_DIR, creating it if needed"""
+    store_dir = os.getenv("INDEX_STORE_DIR", DEFAULT_STORE_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+    return store_dir
+
+
+def get_max_bytes():
+    """Return the size limit of the stored indexes in bytes"""
+    try:
+        return int(os.getenv("INDEX_STORE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def index_key(document_hash, splitter, embeddings):
+    """Identify the index of one document as parsed, split and embedded with the current settings"""
+    versions = f"{PARSER_VERSION}.{NORMALIZER_VERSION}.{SEGMENTER_VERSION}"
+    settings = f"{document_hash}\0{versions}\0{pipeline_key(splitter, embeddings)}"
+    return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+
+def load_index(key, embeddings):
+    """
+    Open a stored index, memory-mapping its vectors.
+
+    Args:
+        key (str): Key from index_key.
+        embeddings: Embeddings object used for queries (same model as the stored index).
+
+    Returns:
+        FAISS vectorstore, or None if the index is not stored.
+    """
+    entry_dir = os.path.join(get_store_dir(), key)
+    index_path = os.path.join(entry_dir, INDEX_NAME)
+    docstore_path = os.path.join(entry_dir, DOCSTORE_NAME)
+    if not os.path.exists(index_path) or not os.path.exists(docstore_path):
+        return None
+    try:
+        try:
+            index = faiss.read_index(index_path, MMAP_FLAGS)
+        except RuntimeError:
+            # Index types that cannot be mapped are read into memory
+            index = faiss.read_index(index_path)
+        with open(docstore_path, "r") as f:
+            stored = json.load(f)
+        # Touch the entry so eviction treats it as recently used
+        os.utime(entry_dir, None)
+    except Exception as e:
+        print(f"Failed to load stored index {key[:12]}: {e}")
+        return None
+
+    if index.ntotal != len(stored):
+        return None
+    docstore = InMemoryDocstore({
+        item["id"]: Document(page_content=item["page_content"], metadata=item["metadata"]) for item in stored
+    })
+    index_to_docstore_id = {i: item["id"] for i, item in enumerate(stored)}
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def save_index(key, vectorstore):
+    """
+    Save a FAISS vectorstore and its docstore under a key, then enforce the size limit.
+
+    Args:
+        key (str): Key from index_key.
+        vectorstore: The FAISS vectorstore to save.
+    """
+    store_dir = get_store_dir()
+    entry_dir = os.path.join(store_dir, key)
+    if os.path.exists(entry_dir):
+        return
+    tmp_dir = os.path.join(store_dir, f".{key}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.makedirs(tmp_dir)
+        faiss.write_index(vectorstore.index, os.path.join(tmp_dir, INDEX_NAME))
+        stored = []
+        for i in range(vectorstore.index.ntotal):
+            doc_id = vectorstore.index_to_docstore_id[i]
+            doc = vectorstore.docstore.search(doc_id)
+            stored.append({"id": doc_id, "page_content": doc.page_content, "metadata": doc.metadata})
+        with open(os.path.join(tmp_dir, DOCSTORE_NAME), "w") as f:
+            json.dump(stored, f)
+        # The entry appears complete or not at all
+        os.rename(tmp_dir, entry_dir)
+    except Exception as e:
+        print(f"Failed to store index {key[:12]}: {e}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return
+    evict_to_size(get_max_bytes())
+
+
+def evict_to_size(max_bytes):
+    """Remove the least recently used indexes until the store fits in max_bytes"""
+    store_dir = get_store_dir()
+    entries = []
+    for name in os.listdir(store_dir):
+        entry_dir = os.path.join(store_dir, name)
+        if name.startswith(".") or not os.path.isdir(entry_dir):
+            continue
+        try:
+            size = sum(os.path.getsize(os.path.join(entry_dir, f)) for f in os.listdir(entry_dir))
+            entries.append((os.stat(entry_dir).st_mtime, size, entry_dir))
+        except OSError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
+    evicted = 0
+    for _, size, entry_dir in sorted(entries):
+        if total <= max_bytes:
+            break
+        # Sessions that already mapped an evicted index keep reading it until they close it
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        total -= size
+        evicted += 1
+    if evicted:
+        print(f"Evicted {evicted} stored indexes")
+
+
+def clear_store():
+    """Delete every stored index"""
+    shutil.rmtree(get_store_dir(), ignore_errors=True)
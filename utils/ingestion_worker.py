@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from utils.document_parser import PDFPageIndex, iter_document_pages, hash_source, is_xml_source
+
+# Documents ingested at the same time across all sessions of this server process
+MAX_WORKERS = 2
+
+# Finished jobs kept around so reruns and other pages can pick up their results
+MAX_JOBS = 32
+
+# Sections or pages shown under "View Extracted Content"
+PREVIEW_SECTIONS = 10
+
+# Share of the progress bar used by parsing; indexing finishes the rest
+PARSE_PROGRESS_SHARE = 0.9
+
+# Module level so jobs survive Streamlit reruns, which re-execute the page script
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingestion")
+_jobs = OrderedDict()
+_lock = threading.Lock()
+
+
+class IngestionJob:
+    """State of one background ingestion, read by the page script on every rerun"""
+
+    def __init__(self, job_id, label):
+        self.job_id = job_id
+        self.label = label
+        self.status = "queued"  # queued -> parsing -> indexing -> ready | failed
+        self.progress = 0.0
+        self.message = "Waiting for a free worker..."
+        self.result = None
+        self.error = None
+        # Parsed sections of XML and pasted text; PDF pages are read from page_index instead
+        self.documents = []
+        self.page_index = None
+        self.normalize_stats = {}
+        self.created = time.time()
+        self.finished = None
+
+    @property
+    def done(self):
+        return self.status in ("ready", "failed")
+
+    @property
+    def ready(self):
+        return self.status == "ready"
+
+    def preview(self, count):
+        """Return the first count sections or pages, reading PDF pages on demand"""
+        if self.page_index is not None:
+            return self.page_index.get_pages(0, count)
+        return self.documents[:count]
+
+    def update(self, status=None, progress=None, message=None):
+        if status is not None:
+            self.status = status
+        if progress is not None:
+            self.progress = progress
+        if message is not None:
+            self.message = message
+
+
+def document_key(source=None, raw_text=None, *settings):
+    """
+    Build a job key from the document content and the settings that shape its index.
+
+    Args:
+        source: The uploaded PDF (path, bytes, BytesIO or UploadedFile), if any.
+        raw_text: Pasted text, if any.
+        *settings: Values that change what gets built, e.g. the page name and reading level.
+
+    Returns:
+        str: Stable key, identical across reruns for the same document and settings.
+    """
+    digest = hashlib.sha256()
+    if source is not None:
+        digest.update(hash_source(source).encode("ascii"))
+    elif raw_text:
+        digest.update(raw_text.encode("utf-8"))
+    for setting in settings:
+        digest.update(b"\0" + repr(setting).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def submit_ingestion(job_key, build_fn, source=None, raw_text=None, label="document", **parse_kwargs):
+    """
+    Parse and index a document on a background thread.
+
+    If a job with the same key is already queued, running or finished, it is
+    returned instead of starting another one, so touching a widget does not
+    restart the work. A failed job is returned too, so a persistent error (e.g.
+    an invalid API key) is shown rather than retried on every rerun; call
+    discard_job to retry it.
+
+    Args:
+        job_key (str): Key from document_key.
+        build_fn (callable): Receives the page stream and the PDFPageIndex of a PDF
+            source (None for XML and pasted text), and returns the ready-to-query
+            handle stored in job.result (e.g. the function returned by build_qa_chain).
+        source: The uploaded PDF, if any.
+        raw_text (str, optional): Pasted text, if no PDF was uploaded.
+        label (str, optional): Name shown in progress messages.
+        **parse_kwargs: Extra arguments for iter_document_pages (e.g. by_section=True).
+
+    Returns:
+        IngestionJob: The job to poll.
+    """
+    with _lock:
+        job = _jobs.get(job_key)
+        if job is not None:
+            _jobs.move_to_end(job_key)
+            return job
+        job = IngestionJob(job_key, label)
+        _jobs[job_key] = job
+        while len(_jobs) > MAX_JOBS:
+            _jobs.popitem(last=False)
+
+    _executor.submit(_run_job, job, build_fn, source, raw_text, parse_kwargs)
+    return job
+
+
+def discard_job(job_key):
+    """Forget a job, so the next submit_ingestion with its key starts over"""
+    with _lock:
+        _jobs.pop(job_key, None)
+
+
+def get_job(job_key):
+    """Return the job for a key, or None if it was never submitted or has been dropped"""
+    with _lock:
+        return _jobs.get(job_key)
+
+
+def _run_job(job, build_fn, source, raw_text, parse_kwargs):
+    try:
+        job.update(status="parsing", message=f"Reading {job.label}...")
+        # XML has no pages to count, so its progress is reported per section
+        xml = source is not None and is_xml_source(source)
+        total_pages = 1
+        if source is not None and not xml:
+            # Opening the index reads only the page tree and outline; page text is extracted on demand
+            job.page_index = PDFPageIndex(source)
+            total_pages = max(1, len(job.page_index))
+
+        pages = iter_document_pages(source, raw_text, collect_into=job.documents if job.page_index is None else None,
+                                    normalize_stats=job.normalize_stats, **parse_kwargs)
+
+        def tracked_pages():
+            for count, doc in enumerate(pages, start=1):
+                if xml:
+                    job.update(message=f"Parsed and indexed {count} sections of {job.label}")
+                    yield doc
+                    continue
+                # Sections report the last page they cover
+                page = doc.metadata.get("page_end", doc.metadata.get("page", 0)) + 1
+                job.update(progress=PARSE_PROGRESS_SHARE * min(page, total_pages) / total_pages,
+                           message=f"Parsed and indexed {min(page, total_pages)} of {total_pages} pages of {job.label}")
+                yield doc
+            job.update(status="indexing", progress=PARSE_PROGRESS_SHARE, message=f"Finishing the index for {job.label}...")
+
+        job.result = build_fn(tracked_pages(), job.page_index)
+        job.update(status="ready", progress=1.0, message=f"{job.label} is ready")
+    except Exception as e:
+        print(f"Ingestion of {job.label} failed: {e}")
+        job.error = str(e)
+        job.update(status="failed", message=f"Could not process {job.label}: {e}")
+    finally:
+        job.finished = time.time()
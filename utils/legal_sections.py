@@ -0,0 +1,119 @@
+import re
+from langchain.schema import Document
+
+# Bump whenever section boundaries or metadata change so stored indexes are rebuilt
+SEGMENTER_VERSION = "1"
+
+# Heading patterns for bills (TITLE / Subtitle / SEC.) and Federal Register
+# regulatory text (PART / §), ordered from the outermost level inwards
+HEADING_PATTERNS = [
+    ("title", re.compile(r"^TITLE\s+([IVXLC]+|\d+)\b[\s.:—–-]*(.*)$")),
+    ("subtitle", re.compile(r"^Subtitle\s+([A-Z])\b[\s.:—–-]*(.*)$")),
+    ("part", re.compile(r"^PART\s+(\d+[A-Z]?)\b[\s.:—–-]*(.*)$")),
+    ("section", re.compile(r"^(?:SEC\.|SECTION)\s+(\d+[A-Za-z]?)\.\s*(.*)$")),
+    # Citations that happen to start a wrapped line are followed by "(" or lowercase text
+    ("section", re.compile(r"^§\s*(\d+\.\d+[\w–-]*)\s+([A-Z].*)$")),
+]
+
+LEVELS = {"title": 0, "subtitle": 1, "part": 2, "section": 3}
+
+ID_PREFIXES = {"title": "TITLE", "subtitle": "Subtitle", "part": "PART", "section": "SEC."}
+
+# Federal Register footnotes: a footnote number followed by a citation
+FOOTNOTE_PATTERN = re.compile(r"^\d{1,3}\s+(?:See\b|Id\.|\d+\s+(?:FR|U\.S\.C\.|CFR)\b|[A-Z][\w.]*\s+(?:Notice|Ruling)\b)")
+
+
+def match_heading(line):
+    """Return (kind, section_id, heading) if the line opens a section, otherwise None"""
+    stripped = line.strip()
+    for kind, pattern in HEADING_PATTERNS:
+        match = pattern.match(stripped)
+        if match:
+            number = match.group(1)
+            section_id = f"§ {number}" if stripped.startswith("§") else f"{ID_PREFIXES[kind]} {number}"
+            return kind, section_id, stripped
+    return None
+
+
+class _Section:
+    def __init__(self, kind, section_id, heading_path, page):
+        self.kind = kind
+        self.section_id = section_id
+        self.heading_path = heading_path
+        self.page_start = page
+        self.page_end = page
+        self.lines = []
+        self.footnotes = []
+
+    def to_documents(self, source):
+        metadata = {
+            "source": source,
+            "section_id": self.section_id,
+            "section_type": self.kind,
+            "heading": self.heading_path[-1] if self.heading_path else "",
+            # Stored as a string so it survives vector store metadata serialization
+            "heading_path": " > ".join(self.heading_path),
+        }
+        # XML sources have no PDF pages
+        if self.page_start is not None:
+            metadata["page_start"] = self.page_start
+            metadata["page_end"] = self.page_end
+        documents = []
+        text = "\n".join(self.lines).strip()
+        if text:
+            documents.append(Document(page_content=text, metadata=metadata))
+        if self.footnotes:
+            documents.append(Document(page_content="\n".join(self.footnotes), metadata={**metadata, "section_type": "footnotes"}))
+        return documents
+
+
+def iter_sections(pages):
+    """
+    Regroup a page stream into one Document per legal section.
+
+    Sections are emitted as soon as the next heading is seen, so this can sit
+    directly on top of iter_document_pages. Text before the first heading is
+    emitted as a "preamble" section and footnotes become separate Documents
+    tagged with the section they appeared in.
+
+    Args:
+        pages: Iterable of page Documents in reading order.
+
+    Yields:
+        Document objects with section_id, section_type, heading, heading_path,
+        page_start and page_end metadata.
+    """
+    stack = []  # (level, heading) of the enclosing headings
+    current = None
+    source = None
+
+    for index, page in enumerate(pages):
+        page_number = page.metadata.get("page", index)
+        source = page.metadata.get("source", source)
+        if current is None:
+            current = _Section("preamble", "preamble", [], page_number)
+
+        for line in page.page_content.splitlines():
+            heading = match_heading(line)
+            if heading:
+                kind, section_id, text = heading
+                yield from current.to_documents(source)
+                level = LEVELS[kind]
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                stack.append((level, text))
+                current = _Section(kind, section_id, [h for _, h in stack], page_number)
+                current.lines.append(text)
+            elif FOOTNOTE_PATTERN.match(line.strip()):
+                current.footnotes.append(line.strip())
+            else:
+                current.lines.append(line)
+                current.page_end = page_number
+
+    if current is not None:
+        yield from current.to_documents(source)
+
+
+def segment_sections(pages):
+    """Return the sections of a list of page Documents (see iter_sections)"""
+    return list(iter_sections(pages))
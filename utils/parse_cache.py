@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+from langchain.schema import Document
+
+# Cache lives next to the other temp_* stores at the project root unless overridden
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), ".parse_cache")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+
+def get_cache_dir():
+    """Return the parse cache directory, creating it if needed"""
+    cache_dir = os.getenv("PARSE_CACHE_DIR", DEFAULT_CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_max_bytes():
+    """Return the size limit of the parse cache in bytes"""
+    try:
+        return int(os.getenv("PARSE_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+    except ValueError:
+        return DEFAULT_MAX_BYTES
+
+
+def hash_bytes(data):
+    """Return the SHA-256 hex digest of raw document bytes"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """Return the SHA-256 hex digest of a file without reading it all at once"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _entry_path(content_hash, parser_version):
+    return os.path.join(get_cache_dir(), f"{content_hash}-v{parser_version}.json")
+
+
+def get_cached_documents(content_hash, parser_version):
+    """Look up previously parsed pages for a document
+
+    Args:
+        content_hash (str): SHA-256 of the document bytes
+        parser_version (str): Version of the parser that produced the entry
+
+    Returns:
+        list: Document objects, or None on a cache miss
+    """
+    path = _entry_path(content_hash, parser_version)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        # Touch the entry so eviction treats it as recently used
+        os.utime(path, None)
+        return [Document(page_content=d["page_content"], metadata=d.get("metadata", {})) for d in data]
+    except Exception as e:
+        print(f"Failed to read parse cache entry {path}: {e}")
+        return None
+
+
+def store_documents(content_hash, parser_version, documents):
+    """Save parsed pages for a document and evict old entries if over the size limit
+
+    Args:
+        content_hash (str): SHA-256 of the document bytes
+        parser_version (str): Version of the parser that produced the pages
+        documents (list): Document objects to cache
+    """
+    path = _entry_path(content_hash, parser_version)
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump([{"page_content": d.page_content, "metadata": d.metadata} for d in documents], f)
+        # Atomic rename so a concurrent reader never sees a half-written entry
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"Failed to write parse cache entry {path}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return
+
+    evict_to_size(get_max_bytes())
+
+
+def evict_to_size(max_bytes):
+    """Remove least recently used entries until the cache fits in max_bytes"""
+    cache_dir = get_cache_dir()
+    entries = []
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return
+
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+            total -= size
+            print(f"Evicted parse cache entry {os.path.basename(path)}")
+        except OSError:
+            pass
+        if total <= max_bytes:
+            break
+
+
+def clear_cache():
+    """Delete every entry in the parse cache"""
+    cache_dir = get_cache_dir()
+    for name in os.listdir(cache_dir):
+        if name.endswith(".json") or name.endswith(".tmp"):
+            os.remove(os.path.join(cache_dir, name))
@@ -0,0 +1,194 @@
+import os
+import threading
+from typing import Any, Optional
+import numpy as np
+from langchain.schema import Document
+from langchain_core.retrievers import BaseRetriever
+from utils.embedding_providers import local_model_available
+from utils.hybrid_search import HybridRetriever, LexicalIndex, tokenize
+
+# Second-stage scorers selectable with RERANKER
+RERANKERS = {
+    "lexical": "Query-term overlap weighted by IDF (no dependencies)",
+    "cross-encoder": "Cross-encoder model on CPU (sentence-transformers)",
+}
+
+# Small passage-ranking model that scores 20 candidates in well under a second on a CPU
+DEFAULT_CROSS_ENCODER = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Chunks passed to the LLM at most, and at least even when none clears the threshold
+RERANK_TOP_K = 3
+RERANK_MIN_K = 2
+# Candidates taken from the first stage
+RERANK_FETCH_K = 20
+
+_models = {}
+_model_lock = threading.Lock()
+
+
+def get_default_reranker():
+    """Return the second-stage scorer from RERANKER (lexical unless set)"""
+    kind = os.getenv("RERANKER", "lexical")
+    return kind if kind in RERANKERS else "lexical"
+
+
+class LexicalScorer:
+    """
+    Scores passages by how much of the query's IDF weight they contain.
+
+    A passage holding every informative query term scores about 0.7, query
+    word pairs found in order add up to 0.15, and the first-stage rank adds up
+    to 0.15, so semantic matches without shared words are not ranked last.
+    Query terms that occur nowhere in the document carry no weight.
+    """
+
+    threshold = 0.45
+    name = "lexical"
+
+    def __init__(self, lexical=None):
+        """
+        Args:
+            lexical (LexicalIndex, optional): Index of the whole document, for IDF
+                weights (default: built from the candidates).
+        """
+        self.lexical = lexical
+
+    def score(self, query, documents):
+        """Return one score between 0 and 1 per document, in the order given"""
+        if not documents:
+            return []
+        texts = [document.page_content for document in documents]
+        lexical = self.lexical or LexicalIndex(texts)
+        query_terms = tokenize(query)
+        weights = {}
+        for term in query_terms:
+            idf = lexical.idf(term)
+            if idf is not None:
+                weights[term] = idf
+        total = sum(weights.values())
+        query_pairs = {pair for pair in zip(query_terms, query_terms[1:]) if pair[0] in weights and pair[1] in weights}
+
+        scores = []
+        for rank, text in enumerate(texts):
+            terms = tokenize(text)
+            present = set(terms)
+            coverage = sum(w for term, w in weights.items() if term in present) / total if total else 0.0
+            pairs = len(query_pairs & set(zip(terms, terms[1:]))) / len(query_pairs) if query_pairs else 0.0
+            prior = 1 - rank / len(texts)
+            scores.append(0.7 * coverage + 0.15 * pairs + 0.15 * prior)
+        return scores
+
+
+class CrossEncoderScorer:
+    """
+    Scores (query, passage) pairs jointly with a cross-encoder run on the CPU.
+
+    The model is downloaded once on first use (or read from a local path) and
+    shared by every chain in the process.
+    """
+
+    threshold = 0.1
+    name = "cross-encoder"
+
+    def __init__(self, model_name=None, batch_size=32):
+        """
+        Args:
+            model_name (str, optional): Model name or path (default from RERANK_MODEL).
+            batch_size (int, optional): Pairs scored per forward pass.
+        """
+        self.model = model_name or os.getenv("RERANK_MODEL", DEFAULT_CROSS_ENCODER)
+        self.batch_size = batch_size
+
+    def _load(self):
+        with _model_lock:
+            if self.model not in _models:
+                try:
+                    from sentence_transformers import CrossEncoder
+                except ImportError:
+                    raise ImportError("The cross-encoder reranker needs sentence-transformers: pip install -r requirements-local.txt") from None
+                print(f"Loading reranking model {self.model}")
+                _models[self.model] = CrossEncoder(self.model, device="cpu")
+            return _models[self.model]
+
+    def score(self, query, documents):
+        """Return one relevance probability per document, in the order given"""
+        if not documents:
+            return []
+        pairs = [(query, document.page_content) for document in documents]
+        scores = np.asarray(self._load().predict(pairs, batch_size=self.batch_size), dtype=np.float32)
+        # Older sentence-transformers versions return raw logits
+        if scores.min() < 0 or scores.max() > 1:
+            scores = 1 / (1 + np.exp(-scores))
+        return scores.tolist()
+
+
+def get_scorer(kind=None, lexical=None):
+    """
+    Create the second-stage scorer.
+
+    Args:
+        kind (str, optional): "lexical" or "cross-encoder" (default from RERANKER).
+        lexical (LexicalIndex, optional): Document index for the lexical scorer's IDF weights.
+
+    Returns:
+        LexicalScorer or CrossEncoderScorer. "cross-encoder" falls back to
+            "lexical" when sentence-transformers is not installed.
+    """
+    kind = kind or get_default_reranker()
+    if kind == "cross-encoder" and not local_model_available():
+        print("sentence-transformers is not installed; reranking by query-term overlap")
+        kind = "lexical"
+    if kind == "cross-encoder":
+        return CrossEncoderScorer()
+    return LexicalScorer(lexical)
+
+
+class RerankRetriever(BaseRetriever):
+    """
+    Over-fetches candidates from a first-stage retriever and keeps the best few.
+
+    Candidates are rescored locally; at most k that clear the scorer's threshold
+    are returned, and never fewer than min_k, so vague questions still get context.
+    """
+
+    retriever: BaseRetriever
+    scorer: Any
+    k: int = RERANK_TOP_K
+    min_k: int = RERANK_MIN_K
+    threshold: Optional[float] = None
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, k=RERANK_TOP_K, fetch_k=RERANK_FETCH_K, scorer=None, min_k=RERANK_MIN_K,
+                         threshold=None):
+        """
+        Rerank hybrid BM25 + vector candidates from a FAISS vectorstore.
+
+        Args:
+            vectorstore: FAISS vectorstore, e.g. from chains.indexing.build_vectorstore.
+            k (int, optional): Most chunks returned.
+            fetch_k (int, optional): Candidates taken from the hybrid retriever.
+            scorer (str, optional): "lexical" or "cross-encoder" (default from RERANKER).
+            min_k (int, optional): Fewest chunks returned.
+            threshold (float, optional): Lowest score kept (default: the scorer's own).
+
+        Returns:
+            RerankRetriever
+        """
+        first_stage = HybridRetriever.from_vectorstore(vectorstore, k=fetch_k, fetch_k=2 * fetch_k)
+        return cls.wrap(first_stage, k=k, scorer=scorer, lexical=first_stage.lexical, min_k=min_k, threshold=threshold)
+
+    @classmethod
+    def wrap(cls, retriever, k=RERANK_TOP_K, scorer=None, lexical=None, min_k=RERANK_MIN_K, threshold=None):
+        """Rerank the results of any retriever, e.g. a ParentChunkRetriever fetching more passages than needed"""
+        return cls(retriever=retriever, scorer=get_scorer(scorer, lexical), k=k, min_k=min_k, threshold=threshold)
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        candidates = self.retriever.invoke(query)
+        scores = self.scorer.score(query, candidates)
+        threshold = self.threshold if self.threshold is not None else self.scorer.threshold
+        ranked = sorted(zip(scores, range(len(candidates))), key=lambda pair: (-pair[0], pair[1]))
+        kept = [(score, i) for score, i in ranked if score >= threshold][:self.k]
+        if len(kept) < self.min_k:
+            kept = ranked[:self.min_k]
+        return [Document(page_content=candidates[i].page_content, metadata=dict(candidates[i].metadata, rerank_score=score))
+                for score, i in kept]
@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from langchain_core.retrievers import BaseRetriever
+from utils.embedding_cache import normalize_query
+
+# Retrieval results kept per process; an entry is dropped once it is this old
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_TTL_SECONDS = 900
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+def get_cache_size():
+    """Return the number of cached retrievals from RETRIEVAL_CACHE_SIZE (0 disables the cache)"""
+    try:
+        return max(0, int(os.getenv("RETRIEVAL_CACHE_SIZE", DEFAULT_CACHE_SIZE)))
+    except ValueError:
+        return DEFAULT_CACHE_SIZE
+
+
+def get_ttl_seconds():
+    """Return the lifetime of a cached retrieval from RETRIEVAL_CACHE_TTL"""
+    try:
+        return max(0.0, float(os.getenv("RETRIEVAL_CACHE_TTL", DEFAULT_TTL_SECONDS)))
+    except ValueError:
+        return DEFAULT_TTL_SECONDS
+
+
+def index_id(vectorstore):
+    """
+    Identify the contents of a FAISS vectorstore.
+
+    Chunk ids are random per build and kept when an index is saved and reopened,
+    so the first id and the chunk count change whenever the indexed chunks do.
+    """
+    count = vectorstore.index.ntotal
+    return f"{vectorstore.index_to_docstore_id[0] if count else ''}:{count}"
+
+
+def cache_key(index, query, k, filters=None):
+    """
+    Build the cache key of one retrieval.
+
+    Args:
+        index (str): Identifies the index and the retriever searching it.
+        query (str): Question text, normalized like query embeddings.
+        k (int): Results returned.
+        filters (dict, optional): Metadata filters of the search.
+
+    Returns:
+        tuple: Hashable key.
+    """
+    return (index, normalize_query(query), k, json.dumps(filters or {}, sort_keys=True, default=str))
+
+
+def lookup(key):
+    """Return the cached results for a key, or None if missing or expired"""
+    now = time.time()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and now - entry[0] > get_ttl_seconds():
+            del _cache[key]
+            entry = None
+        if entry is None:
+            _stats["misses"] += 1
+            return None
+        _cache.move_to_end(key)
+        _stats["hits"] += 1
+        return list(entry[1])
+
+
+def store(key, documents):
+    """Cache the results of a retrieval, evicting the least recently used beyond the size limit"""
+    size = get_cache_size()
+    if not size:
+        return
+    with _lock:
+        _cache[key] = (time.time(), list(documents))
+        _cache.move_to_end(key)
+        while len(_cache) > size:
+            _cache.popitem(last=False)
+
+
+def cache_stats():
+    """Return hits, misses and the number of entries"""
+    with _lock:
+        return dict(_stats, entries=len(_cache))
+
+
+def clear_cache():
+    """Drop every cached retrieval"""
+    with _lock:
+        _cache.clear()
+        _stats["hits"] = _stats["misses"] = 0
+
+
+class CachedRetriever(BaseRetriever):
+    """
+    Returns the earlier results of a repeated question without embedding it or searching.
+
+    Results are keyed by (index id, normalized query, k, filters) and expire
+    after RETRIEVAL_CACHE_TTL seconds.
+    """
+
+    retriever: BaseRetriever
+    index: str
+    k: int
+    filters: Optional[dict] = None
+
+    @classmethod
+    def wrap(cls, retriever, vectorstore, k=None, filters=None):
+        """
+        Cache a retriever over a FAISS vectorstore.
+
+        Args:
+            retriever: Retriever to cache, e.g. a HybridRetriever.
+            vectorstore: The FAISS vectorstore it searches.
+            k (int, optional): Results it returns (default: retriever.k).
+            filters (dict, optional): Filters it applies.
+
+        Returns:
+            CachedRetriever
+        """
+        # The same index is searched differently by each retriever type and depth
+        index = f"{type(retriever).__name__}:{index_id(vectorstore)}"
+        k = k if k is not None else getattr(retriever, "k", 0)
+        return cls(retriever=retriever, index=index, k=k, filters=filters)
+
+    def _get_relevant_documents(self, query, *, run_manager):
+        key = cache_key(self.index, query, self.k, self.filters)
+        documents = lookup(key)
+        if documents is None:
+            documents = self.retriever.invoke(query)
+            store(key, documents)
+        return documents
@@ -0,0 +1,309 @@
+import ctypes
+import ctypes.util
+import gc
+import mmap
+import os
+import resource
+import tempfile
+from langchain.schema import Document
+from utils.document_parser import iter_document_pages
+
+# Default growth in RSS allowed while a document is ingested
+DEFAULT_RSS_BUDGET_MB = 512
+
+# Pages extracted between clears of pypdf's object cache, which otherwise grows with every page
+READER_WINDOW = 64
+
+# Extracted text held in memory before it is written to the spill file
+SPILL_BUFFER_BYTES = 256 * 1024
+
+
+def current_rss_bytes():
+    """Return the resident set size of this process (peak RSS where the current value is unavailable)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+
+
+def release_free_memory():
+    """
+    Hand memory freed by the garbage collector back to the OS.
+
+    glibc keeps freed heap pages mapped, so RSS stays up after gc.collect(); malloc_trim
+    returns them. Elsewhere this is a no-op.
+    """
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"))
+        libc.malloc_trim(0)
+    except (OSError, AttributeError, TypeError):
+        pass
+
+
+class TextView:
+    """Lightweight handle on one span of spilled text; the text is only decoded when asked for"""
+
+    __slots__ = ("store", "offset", "length", "chars", "metadata")
+
+    def __init__(self, store, offset, length, chars, metadata):
+        """
+        Args:
+            store: SpillStore holding the text.
+            offset: Byte offset of the text in the spill file.
+            length: Length of the encoded text in bytes.
+            chars: Length of the text in characters, as len() of the decoded string.
+            metadata: Page metadata.
+        """
+        self.store = store
+        self.offset = offset
+        self.length = length
+        self.chars = chars
+        self.metadata = metadata
+
+    def __len__(self):
+        return self.chars
+
+    def text(self):
+        return self.store._read(self.offset, self.length)
+
+    def __str__(self):
+        return self.text()
+
+    def to_document(self):
+        return Document(page_content=self.text(), metadata=dict(self.metadata))
+
+
+class SpillStore:
+    """
+    Append-only text store that spills extracted pages to a memory-mapped file.
+
+    Only page offsets and metadata stay on the Python heap; page text lives in the
+    file and is paged in by the OS when a view is read, so memory does not grow
+    with the length of the document.
+    """
+
+    def __init__(self, path=None, buffer_bytes=SPILL_BUFFER_BYTES):
+        """
+        Args:
+            path: File to spill to (a temporary file that is deleted on close by default).
+            buffer_bytes: Text buffered in memory before it is written out.
+        """
+        if path is None:
+            handle, path = tempfile.mkstemp(prefix="policy_spill_", suffix=".txt")
+            os.close(handle)
+            self._owns_file = True
+        else:
+            self._owns_file = False
+        self.path = path
+        self._file = open(path, "wb")
+        self._buffer = []
+        self._buffered = 0
+        self._size = 0
+        self._entries = []
+        self._chars = 0
+        self._mmap = None
+        self.buffer_bytes = buffer_bytes
+
+    def __len__(self):
+        return len(self._entries)
+
+    def append(self, text, metadata=None):
+        """Add one page of text and return its index"""
+        data = text.encode("utf-8")
+        # Character counts are kept alongside byte lengths: UTF-8 text such as "§" or curly
+        # quotes takes more bytes than characters, and limits are in characters
+        self._entries.append((self._size + self._buffered, len(data), len(text), metadata or {}))
+        self._chars += len(text)
+        self._buffer.append(data)
+        self._buffered += len(data)
+        if self._buffered >= self.buffer_bytes:
+            self.flush()
+        return len(self._entries) - 1
+
+    def flush(self):
+        """Write buffered text to the spill file"""
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._file.flush()
+            self._size += self._buffered
+            self._buffer = []
+            self._buffered = 0
+            # The mapping is re-created on the next read so it covers the new bytes
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def _read(self, offset, length):
+        if offset + length > self._size:
+            self.flush()
+        if length == 0:
+            return ""
+        if self._mmap is None:
+            with open(self.path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[offset:offset + length].decode("utf-8")
+
+    def view(self, index):
+        """Return the TextView of one page"""
+        offset, length, chars, metadata = self._entries[index]
+        return TextView(self, offset, length, chars, metadata)
+
+    def views(self):
+        """Yield a TextView per page without reading any text"""
+        for index in range(len(self._entries)):
+            yield self.view(index)
+
+    def iter_documents(self):
+        """Yield one Document at a time, e.g. to feed chains.indexing.build_vectorstore"""
+        for view in self.views():
+            yield view.to_document()
+
+    def total_chars(self):
+        """Return the total length of the stored text in characters"""
+        return self._chars
+
+    def total_bytes(self):
+        """Return the size of the stored text in bytes, including text not yet spilled"""
+        return self._size + self._buffered
+
+    def find_terms(self, terms):
+        """
+        Report which terms occur anywhere in the stored text, case-insensitively.
+
+        Text is scanned one page at a time, so the document is never joined into a
+        single string.
+
+        Args:
+            terms: Iterable of search terms.
+
+        Returns:
+            Dict mapping each term to True or False.
+        """
+        return find_terms(self.iter_documents(), terms)
+
+    def close(self):
+        """Release the mapping and delete the spill file if this store created it"""
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        if self._owns_file and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def find_terms(documents, terms):
+    """
+    Report which terms occur in a stream of Documents, case-insensitively.
+
+    Args:
+        documents: Iterable of Document objects.
+        terms: Iterable of search terms.
+
+    Returns:
+        Dict mapping each term to True or False.
+    """
+    remaining = {term.lower() for term in terms if term}
+    found = {term: False for term in terms if term}
+    for doc in documents:
+        text = doc.page_content.lower()
+        for term in list(remaining):
+            if term in text:
+                remaining.discard(term)
+        if not remaining:
+            break
+    for term in found:
+        found[term] = term.lower() not in remaining
+    return found
+
+
+def leading_text(pages, max_chars):
+    """
+    Read the start of a document, one page at a time, up to max_chars.
+
+    Pages past the limit are only measured: a TextView knows its length without
+    decoding its text, so a spilled document is never read in full.
+
+    Args:
+        pages: Iterable of TextViews (e.g. SpillStore.views()) or Documents.
+        max_chars: Most characters returned.
+
+    Returns:
+        Tuple (text, total_length): the leading text and the length of the whole document.
+    """
+    parts = []
+    used = 0
+    total = 0
+    for page in pages:
+        length = len(page) if isinstance(page, TextView) else len(page.page_content)
+        if used < max_chars:
+            text = page.text() if isinstance(page, TextView) else page.page_content
+            # Pages were joined with newlines before
+            if parts:
+                parts.append("\n")
+                used += 1
+            parts.append(text[:max_chars - used])
+            used += len(parts[-1])
+        total += length + (1 if total else 0)
+    return "".join(parts), total
+
+
+def ingest_bounded(source=None, raw_text=None, rss_budget_mb=DEFAULT_RSS_BUDGET_MB, spill_path=None, **parse_kwargs):
+    """
+    Parse a document into a SpillStore while keeping its memory growth within a budget.
+
+    Pages are written to the memory-mapped spill file as they are extracted, and the
+    PDF reader's object cache is dropped every READER_WINDOW pages. The parse cache is bypassed
+    because it keeps every page of a miss in memory. The budget applies to the RSS
+    gained since ingestion started, so memory the app already held does not count.
+    When growth crosses it the buffer is spilled and garbage collected, at most once
+    per spill buffer of new text; if that is not enough a warning is printed, since
+    the remaining memory is not ours to free. pypdf's page tree, about 3 KB per page,
+    stays in memory for the whole parse and counts against the budget.
+
+    Args:
+        source: The PDF as a file path, bytes, a BytesIO or a Streamlit UploadedFile.
+        raw_text: Raw text content.
+        rss_budget_mb: Resident memory the process may gain while ingesting.
+        spill_path: Optional file to spill to instead of a temporary file.
+        **parse_kwargs: Extra arguments for iter_document_pages.
+
+    Returns:
+        SpillStore holding the document; close it when done.
+    """
+    budget = rss_budget_mb * 1024 * 1024
+    baseline = current_rss_bytes()
+    store = SpillStore(spill_path)
+    parse_kwargs.setdefault("use_cache", False)
+    parse_kwargs.setdefault("max_chars", None)
+    parse_kwargs.setdefault("reader_window", READER_WINDOW)
+    over_budget_reported = False
+    next_collection = 0
+    try:
+        for page in iter_document_pages(source, raw_text, **parse_kwargs):
+            store.append(page.page_content, page.metadata)
+            del page
+            # Collecting again before another buffer of text has been spilled frees nothing new
+            if store.total_bytes() >= next_collection and current_rss_bytes() - baseline > budget:
+                store.flush()
+                gc.collect()
+                release_free_memory()
+                next_collection = store.total_bytes() + store.buffer_bytes
+                growth = current_rss_bytes() - baseline
+                if growth > budget and not over_budget_reported:
+                    print(f"Ingestion is above its {rss_budget_mb} MB RSS budget ({growth // (1024 * 1024)} MB gained)")
+                    over_budget_reported = True
+        store.flush()
+    except Exception:
+        store.close()
+        raise
+    print(f"Spilled {len(store)} pages ({store.total_bytes() // 1024} KB) to {store.path}")
+    return store
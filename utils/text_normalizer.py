@@ -0,0 +1,172 @@
+import re
+from collections import Counter
+from langchain.schema import Document
+from utils.token_counter import count_tokens
+
+# Bump whenever normalization output changes so stored indexes are rebuilt
+NORMALIZER_VERSION = "2"
+
+# Lines at the top and bottom of each page that may be running headers or footers
+EDGE_LINES = 3
+
+# A line shape seen in at least this share of pages is treated as a running header
+HEADER_MIN_SHARE = 0.7
+
+# Pages buffered to learn the running headers before the rest of the stream flows through
+HEADER_WINDOW = 20
+
+# Edge lines with this many words, mostly lowercase, are body text even when they repeat
+SENTENCE_MIN_WORDS = 6
+
+HYPHEN_BREAK = re.compile(r"([A-Za-z]+)-[ \t]*\n[ \t]*([a-z]+)")
+# Footnote numbers glued to a word, e.g. "the Order,1 ‘‘Promoting" or "plans.2 "; never after
+# a digit or a closing parenthesis, which would eat "10:30", "1,2", "3:1" or "501(c)3"
+FOOTNOTE_MARKER = re.compile(r"(?:(?<=[a-z”’])|(?<=[a-z][.])|(?<=[A-Za-z”’][,;:]))\d{1,2}(?=\s)")
+# Citations whose number is glued to the prefix the same way, e.g. "p.12", "sec.4", "§12"
+CITATION_PREFIX = re.compile(r"(?:\b(?:p|pp|no|nos|sec|secs|art|ch|cl|para|par|vol|fig|n)\.|[§¶]\s*)$", re.IGNORECASE)
+WORD = re.compile(r"[A-Za-z]+(?:-[A-Za-z]+)*")
+
+
+def _strip_footnote_markers(text):
+    """Remove footnote markers, keeping the numbers of page, section and other citations"""
+    def replace(match):
+        if CITATION_PREFIX.search(text[max(0, match.start() - 6):match.start()]):
+            return match.group(0)
+        return ""
+    return FOOTNOTE_MARKER.sub(replace, text)
+
+
+def _line_shape(line):
+    """Key that matches a running header across pages despite changing page numbers"""
+    return re.sub(r"\d+", "#", line.strip().lower())
+
+
+def _reads_like_sentence(line):
+    """Return True for a line of running prose, which is never stripped as a header"""
+    words = WORD.findall(line)
+    if len(words) < SENTENCE_MIN_WORDS:
+        return False
+    return sum(1 for word in words if word[0].islower()) * 2 >= len(words)
+
+
+def _edge_lines(text):
+    lines = [line for line in text.splitlines() if line.strip()]
+    return lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+
+
+def detect_running_headers(pages):
+    """
+    Find header and footer lines that repeat across nearly every page.
+
+    Lines that read like sentences are left out: repeated boilerplate prose at a
+    page edge is still content.
+
+    Args:
+        pages: List of page Documents.
+
+    Returns:
+        Set of line shapes (see _line_shape) to remove; empty for fewer than 3 pages.
+    """
+    if len(pages) < 3:
+        return set()
+    counts = Counter()
+    for page in pages:
+        counts.update(set(_line_shape(line) for line in _edge_lines(page.page_content) if not _reads_like_sentence(line)))
+    threshold = max(2, int(len(pages) * HEADER_MIN_SHARE + 0.999))
+    return {shape for shape, count in counts.items() if count >= threshold and shape}
+
+
+def _dehyphenate(text, vocabulary):
+    def join(match):
+        head, tail = match.group(1), match.group(2)
+        # Keep the hyphen for compounds the document writes hyphenated elsewhere ("short-term")
+        if f"{head}-{tail}".lower() in vocabulary and f"{head}{tail}".lower() not in vocabulary:
+            return f"{head}-{tail}"
+        return f"{head}{tail}"
+    return HYPHEN_BREAK.sub(join, text)
+
+
+def normalize_text(text, header_shapes=(), vocabulary=()):
+    """
+    Remove running headers, line-break hyphenation, footnote markers and redundant whitespace.
+
+    Line breaks are kept so section headings still start a line for segmentation.
+
+    Args:
+        text: Extracted page text.
+        header_shapes: Running header shapes from detect_running_headers.
+        vocabulary: Lower-cased words of the document, used to tell compounds from word breaks.
+
+    Returns:
+        Tuple of (normalized text, number of header lines removed).
+    """
+    lines = text.splitlines()
+    removed = 0
+    if header_shapes:
+        # Only the page edges hold running headers; identical lines in the body stay
+        content_rows = [i for i, line in enumerate(lines) if line.strip()]
+        edge_rows = set(content_rows[:EDGE_LINES] + content_rows[-EDGE_LINES:])
+        kept = [line for i, line in enumerate(lines) if not (i in edge_rows and _line_shape(line) in header_shapes)]
+        removed = len(lines) - len(kept)
+        lines = kept
+    text = "\n".join(lines)
+
+    text = _dehyphenate(text, vocabulary)
+    text = _strip_footnote_markers(text)
+    text = re.sub(r"[ \t ]+", " ", text)
+    text = re.sub(r" ?\n ?", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip(), removed
+
+
+def iter_normalized_pages(pages, stats=None, window=HEADER_WINDOW):
+    """
+    Normalize a page stream, learning running headers from the first pages.
+
+    The first `window` pages are buffered to detect running headers, after which
+    pages flow through one at a time.
+
+    Args:
+        pages: Iterable of page Documents.
+        stats: Optional dict that receives tokens_before, tokens_after, tokens_saved
+            and header_lines_removed as the stream is consumed.
+        window: Number of leading pages used to detect running headers.
+
+    Yields:
+        New page Documents with normalized page_content.
+    """
+    stats = stats if stats is not None else {}
+    stats.update({"tokens_before": 0, "tokens_after": 0, "tokens_saved": 0, "header_lines_removed": 0})
+    pages = iter(pages)
+
+    buffered = []
+    for page in pages:
+        buffered.append(page)
+        if len(buffered) >= window:
+            break
+    header_shapes = detect_running_headers(buffered)
+    vocabulary = set()
+    for page in buffered:
+        vocabulary.update(word.lower() for word in WORD.findall(page.page_content))
+
+    def normalize(page):
+        # New Documents, so the raw pages the parse cache is about to store stay untouched
+        text, removed = normalize_text(page.page_content, header_shapes, vocabulary)
+        before = count_tokens(page.page_content)
+        after = count_tokens(text)
+        stats["tokens_before"] += before
+        stats["tokens_after"] += after
+        stats["tokens_saved"] = stats["tokens_before"] - stats["tokens_after"]
+        stats["header_lines_removed"] += removed
+        return Document(page_content=text, metadata=dict(page.metadata))
+
+    for page in buffered:
+        yield normalize(page)
+    for page in pages:
+        vocabulary.update(word.lower() for word in WORD.findall(page.page_content))
+        yield normalize(page)
+
+    if stats["tokens_before"]:
+        saved_share = 100 * stats["tokens_saved"] / stats["tokens_before"]
+        print(f"Normalization saved {stats['tokens_saved']} of {stats['tokens_before']} tokens ({saved_share:.1f}%), "
+              f"removed {stats['header_lines_removed']} running header lines")
@@ -0,0 +1,22 @@
+# tiktoken is optional; without it token counts fall back to a 4-characters-per-token estimate
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _encoding = None
+
+
+def count_tokens(text):
+    """Count the tokens of text as the OpenAI embedding and chat models see them
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Number of tokens (estimated when tiktoken is unavailable)
+    """
+    if not text:
+        return 0
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return max(1, len(text) // 4)
@@ -0,0 +1,147 @@
+import math
+import time
+import faiss
+import numpy as np
+
+# Corpus sizes (vectors) up to which each index type is used
+FLAT_MAX_VECTORS = 10000
+HNSW_MAX_VECTORS = 200000
+
+HNSW_NEIGHBORS = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+
+IVF_NPROBE = 32
+PQ_BITS = 8
+# PQ sub-vector width; 4 dimensions per byte keeps recall@10 around 0.85
+PQ_DIMENSIONS_PER_CODE = 4
+# Training points per IVF list; training on every vector is slow and barely better
+TRAIN_POINTS_PER_LIST = 64
+
+# Vectors sampled as queries when measuring recall against exact search
+RECALL_QUERIES = 200
+RECALL_K = 10
+
+INDEX_KINDS = ("flat", "hnsw", "ivfpq")
+
+
+def choose_index_kind(count):
+    """Return the index type for a corpus of count vectors: exact search while it is cheap, then approximate"""
+    if count <= FLAT_MAX_VECTORS:
+        return "flat"
+    if count <= HNSW_MAX_VECTORS:
+        return "hnsw"
+    return "ivfpq"
+
+
+def _pq_subquantizers(dimensions):
+    # Most sub-vectors of at least PQ_DIMENSIONS_PER_CODE dimensions that divide the dimension
+    for m in range(max(1, dimensions // PQ_DIMENSIONS_PER_CODE), 0, -1):
+        if dimensions % m == 0:
+            return m
+    return 1
+
+
+def _ivf_lists(count):
+    # ~2 sqrt(n) lists, with at least 39 training points per list as faiss expects
+    return max(1, min(int(2 * math.sqrt(count)), count // 39))
+
+
+def build_index(vectors, kind=None, dimensions=None, int8=False):
+    """
+    Build a FAISS index sized for the number of vectors.
+
+    Args:
+        vectors (np.ndarray): float32 matrix, one embedding per row.
+        kind (str, optional): "flat", "hnsw" or "ivfpq" (default: chosen by choose_index_kind).
+        dimensions (int, optional): Reduce vectors to this many dimensions with PCA before indexing.
+        int8 (bool, optional): Store vectors as 8-bit scalars (flat and hnsw; ivfpq is already compressed).
+
+    Returns:
+        tuple: (faiss index with the vectors added, dict describing the index)
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count, source_dimensions = vectors.shape
+    kind = kind or choose_index_kind(count)
+    if kind not in INDEX_KINDS:
+        raise ValueError(f"Unknown index kind {kind!r}; expected one of {', '.join(INDEX_KINDS)}")
+    dimensions = dimensions if dimensions and dimensions < source_dimensions else source_dimensions
+
+    if kind == "flat":
+        index = faiss.IndexScalarQuantizer(dimensions, faiss.ScalarQuantizer.QT_8bit) if int8 else faiss.IndexFlatL2(dimensions)
+    elif kind == "hnsw":
+        if int8:
+            index = faiss.IndexHNSWSQ(dimensions, faiss.ScalarQuantizer.QT_8bit, HNSW_NEIGHBORS)
+        else:
+            index = faiss.IndexHNSWFlat(dimensions, HNSW_NEIGHBORS)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    else:
+        quantizer = faiss.IndexFlatL2(dimensions)
+        index = faiss.IndexIVFPQ(quantizer, dimensions, _ivf_lists(count), _pq_subquantizers(dimensions), PQ_BITS)
+        index.nprobe = IVF_NPROBE
+
+    if dimensions < source_dimensions:
+        index = faiss.IndexPreTransform(faiss.PCAMatrix(source_dimensions, dimensions), index)
+
+    start = time.perf_counter()
+    if not index.is_trained:
+        training = vectors
+        if kind == "ivfpq" and count > TRAIN_POINTS_PER_LIST * _ivf_lists(count):
+            rows = np.random.default_rng(0).choice(count, TRAIN_POINTS_PER_LIST * _ivf_lists(count), replace=False)
+            training = vectors[np.sort(rows)]
+        index.train(training)
+    index.add(vectors)
+    info = {
+        "kind": kind,
+        "vectors": count,
+        "dimensions": dimensions,
+        "source_dimensions": source_dimensions,
+        "int8": bool(int8) and kind != "ivfpq",
+        "bytes": index_bytes(index),
+        "build_seconds": time.perf_counter() - start,
+    }
+    return index, info
+
+
+def configure_search(index, kind):
+    """Set the search-time parameters of an index read back from disk"""
+    inner = faiss.downcast_index(index.index) if isinstance(index, faiss.IndexPreTransform) else index
+    if kind == "hnsw":
+        inner.hnsw.efSearch = HNSW_EF_SEARCH
+    elif kind == "ivfpq":
+        faiss.extract_index_ivf(inner).nprobe = IVF_NPROBE
+    return index
+
+
+def index_bytes(index):
+    """Return the serialized size of an index, about what it occupies in memory"""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def recall_at_k(index, vectors, k=RECALL_K, queries=RECALL_QUERIES, seed=0):
+    """
+    Measure how many of the exact k nearest neighbours an index returns.
+
+    Stored vectors are sampled as queries and compared against a brute-force search.
+
+    Args:
+        index: The faiss index to check, holding vectors in the same order.
+        vectors (np.ndarray): The float32 matrix the index was built from.
+        k (int, optional): Neighbours compared per query.
+        queries (int, optional): Number of sampled queries.
+        seed (int, optional): Sampling seed, so repeated reports are comparable.
+
+    Returns:
+        float: Mean recall@k between 0 and 1.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    count = len(vectors)
+    if count == 0:
+        return 1.0
+    k = min(k, count)
+    sample = vectors[np.random.default_rng(seed).choice(count, size=min(queries, count), replace=False)]
+    _, exact = faiss.knn(sample, vectors, k)
+    _, approx = index.search(sample, k)
+    found = sum(len(set(e) & set(a)) for e, a in zip(exact.tolist(), approx.tolist()))
+    return found / (len(sample) * k)
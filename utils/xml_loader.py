@@ -0,0 +1,248 @@
+import re
+import xml.etree.ElementTree as ET
+from utils.legal_sections import LEVELS, ID_PREFIXES, _Section
+
+# Element names per format. USLM (govinfo/uscode XML) and the bill DTD used for
+# congressional bills share structural names but label them with num/heading and
+# enum/header respectively; Federal Register XML is upper case throughout.
+USLM_FORMAT = {
+    "structure": {"title": "title", "subtitle": "subtitle", "part": "part", "section": "section"},
+    "number": {"num", "enum"},
+    "heading": {"heading", "header"},
+    "blocks": {"p", "content", "chapeau", "continuation", "text", "proviso", "quotedContent",
+               "quoted-block", "table", "toc", "preface", "official-title"},
+    "cells": {"td", "th", "entry"},
+    "footnotes": {"footnote", "footnotes"},
+    "markers": {"footnoteRef", "footnote-ref"},
+    "skip": {"meta", "metadata", "form", "attestation", "endorsement"},
+}
+
+FR_FORMAT = {
+    "structure": {"PART": "part", "SECTION": "section"},
+    "number": {"SECTNO"},
+    "heading": {"SUBJECT"},
+    "blocks": {"P", "FP", "AMDPAR", "EXTRACT", "GPOTABLE", "NOTE", "LSTSUB", "AUTH", "SIG",
+               "AGENCY", "SUBAGY", "CFR", "DEPDOC", "RIN", "ACT", "DATES", "FURINF", "ROW"},
+    "cells": {"ENT", "CHED"},
+    "footnotes": {"FTNT"},
+    "markers": {"SU"},
+    "skip": {"FRDOC", "BILCOD", "GPH"},
+}
+
+FR_ROOTS = {"RULE", "PRORULE", "NOTICE", "PRESDOCU", "FEDREG", "RULES", "PRORULES", "NOTICES"}
+
+# Discussion headings in the Federal Register preamble, outermost first
+FR_DISCUSSION_LEVELS = {"HD1": 0, "HD2": 1, "HD3": 2}
+
+WHITESPACE = re.compile(r"[ \t\r\f\v]+")
+
+NUMBER_PREFIX = re.compile(r"^(?:SEC\.|SECTION|TITLE|Subtitle|PART|§)", re.IGNORECASE)
+
+
+def is_xml_document(head):
+    """Return True if the first bytes of a document look like XML rather than PDF"""
+    return head.lstrip(b"\xef\xbb\xbf \t\r\n").startswith(b"<")
+
+
+def _local_name(tag):
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _clean(text):
+    lines = (WHITESPACE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def _element_text(elem, fmt, keep_markers=False):
+    """Text of an element with a line break after every nested block element"""
+    parts = [elem.text or ""]
+    for child in elem:
+        name = _local_name(child.tag)
+        # Footnote reference numbers are noise in body text but identify the footnote itself
+        if keep_markers or name not in fmt["markers"]:
+            parts.append(_element_text(child, fmt, keep_markers))
+            if name in fmt["blocks"] or name in fmt["structure"] or name in fmt["number"] or name in fmt["heading"]:
+                parts.append("\n")
+            elif name in fmt["cells"]:
+                parts.append(" ")
+        parts.append(child.tail or "")
+    return "".join(parts)
+
+
+def _section_id(kind, number):
+    number = number.strip()
+    if number.startswith("§"):
+        return number
+    # "SEC. 2." / "TITLE I—" -> "2" / "I"
+    bare = NUMBER_PREFIX.sub("", number).strip(" .—–-")
+    return f"{ID_PREFIXES[kind]} {bare}" if bare else ID_PREFIXES[kind]
+
+
+class _XmlSectionBuilder:
+    """Tracks the open headings and the section being filled while the XML streams past"""
+
+    def __init__(self, source, fmt):
+        self.source = source
+        self.fmt = fmt
+        self.stack = []  # (level, heading) of the enclosing headings
+        self.current = _Section("preamble", "preamble", [], None)
+        self.current.printed_pages = []
+        self.pending_label = ""
+        self.printed_page = None
+
+    def _documents(self):
+        documents = self.current.to_documents(self.source)
+        for doc in documents:
+            doc.metadata["format"] = "fr" if self.fmt is FR_FORMAT else "uslm"
+            if self.current.printed_pages:
+                doc.metadata["fr_page_start"] = self.current.printed_pages[0]
+                doc.metadata["fr_page_end"] = self.current.printed_pages[-1]
+        return documents
+
+    def open(self, kind, section_id, heading, level):
+        """Finish the current section and start a new one under the given heading"""
+        if self.pending_label:
+            # A run-in heading with nothing after it, e.g. "SUPPLEMENTARY INFORMATION:"
+            self.current.lines.append(self.pending_label)
+            self.pending_label = ""
+        documents = self._documents()
+        while self.stack and self.stack[-1][0] >= level:
+            self.stack.pop()
+        self.stack.append((level, heading))
+        self.current = _Section(kind, section_id, [h for _, h in self.stack], None)
+        self.current.printed_pages = [self.printed_page] if self.printed_page else []
+        if heading:
+            self.current.lines.append(heading)
+        return documents
+
+    def retitle(self, section_id, heading):
+        """Set the number and heading of the section opened by a structural element"""
+        if section_id:
+            self.current.section_id = section_id
+        if heading:
+            self.stack[-1] = (self.stack[-1][0], heading)
+            self.current.heading_path = [h for _, h in self.stack]
+            self.current.lines = [heading]
+
+    def add_line(self, text):
+        text = _clean(text)
+        if self.pending_label:
+            text = f"{self.pending_label} {text}".strip()
+            self.pending_label = ""
+        if text:
+            self.current.lines.append(text)
+
+    def add_footnote(self, text):
+        text = _clean(text)
+        if text:
+            self.current.footnotes.append(text)
+
+    def page_break(self, page):
+        self.printed_page = page
+        if page not in self.current.printed_pages:
+            self.current.printed_pages.append(page)
+
+    def finish(self):
+        return self._documents()
+
+
+def iter_xml_sections(xml_file, source_name):
+    """
+    Stream a USLM, bill DTD or Federal Register XML document into section Documents.
+
+    The file is read with iterparse and every element is dropped once its text has
+    been taken, so memory stays flat however long the document is. Sections carry
+    the same metadata as utils.legal_sections.iter_sections (without PDF page
+    numbers), plus the printed Federal Register pages for rules and notices.
+
+    Args:
+        xml_file: Path or binary file object of the XML document.
+        source_name: Value for the source metadata field.
+
+    Yields:
+        Document objects with section_id, section_type, heading and heading_path metadata.
+    """
+    fmt = None
+    builder = None
+    path = []  # open elements, outermost first
+    labels = {}  # id(structural element) -> [number, heading]
+    in_block = 0
+    in_regtext = False
+
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        name = _local_name(elem.tag)
+        if fmt is None:
+            fmt = FR_FORMAT if name in FR_ROOTS else USLM_FORMAT
+            builder = _XmlSectionBuilder(source_name, fmt)
+
+        if event == "start":
+            path.append(elem)
+            if name in fmt["blocks"] or name in fmt["footnotes"] or name in fmt["skip"]:
+                in_block += 1
+            elif in_block == 0 and name in fmt["structure"]:
+                kind = fmt["structure"][name]
+                labels[id(elem)] = ["", ""]
+                yield from builder.open(kind, ID_PREFIXES[kind], "", LEVELS[kind])
+            elif name == "REGTEXT":
+                # Amendatory regulatory text starts its own heading hierarchy
+                in_regtext = True
+                builder.stack = []
+            continue
+
+        path.pop()
+        parent = path[-1] if path else None
+        parent_name = _local_name(parent.tag) if parent is not None else ""
+
+        if name == "PRTPAGE" and elem.get("P"):
+            builder.page_break(elem.get("P"))
+        elif name in fmt["skip"]:
+            in_block -= 1
+        elif name in fmt["footnotes"]:
+            in_block -= 1
+            if in_block == 0:
+                builder.add_footnote(_element_text(elem, fmt, keep_markers=True))
+        elif name in fmt["blocks"]:
+            in_block -= 1
+            if in_block == 0:
+                builder.add_line(_element_text(elem, fmt))
+        elif in_block:
+            continue
+        elif parent is not None and id(parent) in labels and (name in fmt["number"] or name in fmt["heading"] or (name == "HD" and parent_name == "PART")):
+            # Number and heading of a title, part or section
+            label = labels[id(parent)]
+            text = _clean(_element_text(elem, fmt))
+            if name in fmt["number"]:
+                label[0] = text
+            else:
+                label[1] = text
+            kind = fmt["structure"][parent_name]
+            number = label[0] or (text.split("—")[0] if name == "HD" else "")
+            # The bill DTD numbers sections "1." where USLM and the printed bill say "SEC. 1."
+            shown_number = label[0] if not label[0] or NUMBER_PREFIX.match(label[0]) else f"{ID_PREFIXES[kind]} {label[0]}"
+            heading = " ".join(part for part in (shown_number, label[1]) if part)
+            builder.retitle(_section_id(kind, number) if number else None, heading)
+        elif name in fmt["number"] or name in fmt["heading"]:
+            if fmt is FR_FORMAT:
+                builder.add_line(_element_text(elem, fmt))
+            else:
+                # "(a)" and "In general.—" of a subsection lead into its text
+                builder.pending_label = f"{builder.pending_label} {_clean(_element_text(elem, fmt))}".strip()
+        elif name == "HD":
+            heading = _clean(_element_text(elem, fmt))
+            level = FR_DISCUSSION_LEVELS.get(elem.get("SOURCE"))
+            if level is not None and not in_regtext and heading:
+                yield from builder.open("discussion", heading[:80], heading, level)
+            else:
+                # "AGENCY:", "SUMMARY:" and other run-in headings
+                builder.pending_label = f"{builder.pending_label} {heading}".strip()
+        elif name in fmt["structure"]:
+            labels.pop(id(elem), None)
+        elif name == "REGTEXT":
+            in_regtext = False
+
+        # Drop finished elements so the tree never holds more than the open path
+        if in_block == 0 and parent is not None:
+            parent.remove(elem)
+
+    if builder is not None:
+        yield from builder.finish()